@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+import sys
+import ipaddress
+import inventory_store
+sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Tools")
+import validateIPv4
+
+# Checks the whole address plan in requirements.csv before anything is rendered or pushed:
+# duplicate interface addresses, overlapping (but not identical) interface subnets anywhere
+# in the fleet, and malformed or duplicate entries in the routing network lists.
+# Everything is sorted once and swept, so a large inventory is still O(n log n)
+requirements = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+
+# Routing fields, ';' separated. rip_networks holds classful network addresses without a prefix length
+routing_fields = {
+    "rip_networks": 4,
+    "ospf_networks": 4,
+    "bgp_networks_ipv4": 4,
+    "static_ipv4_network": 4,
+    "bgp_networks_ipv6": 6,
+    "static_ipv6_network": 6,
+}
+
+
+def issue(severity, check, hostname, message):
+    return {"severity": severity, "check": check, "hostname": hostname, "message": message}
+
+
+def parse_interface(value, version):
+    # "10.10.3.1/28" -> IPv4Interface, raises ValueError for anything that isn't a host address with a prefix
+    value = value.strip()
+    if "/" not in value:
+        raise ValueError("missing prefix length")
+    if version == 4 and validateIPv4.parse_address(value) is None:
+        raise ValueError("not a dotted quad with a valid prefix length")
+    interface = ipaddress.ip_interface(value)
+    if interface.version != version:
+        raise ValueError(f"not an IPv{version} address")
+    return interface
+
+
+def interface_issues(hostname, name, interface):
+    # Addresses that can't be used on an interface at all
+    found = []
+    if interface.version == 4:
+        address_class = validateIPv4.classes[validateIPv4.classify_packed([int(interface.ip)])[0]]
+        if address_class != "valid":
+            found.append(issue("error", "address-class", hostname, f"{name} {interface} is a {address_class} address"))
+        network = interface.network
+        if network.prefixlen < 31 and interface.ip in (network.network_address, network.broadcast_address):
+            found.append(issue("error", "host-address", hostname, f"{name} {interface} is the network or broadcast address of {network}"))
+    elif interface.ip.is_multicast or interface.ip.is_loopback or interface.ip.is_unspecified:
+        found.append(issue("error", "address-class", hostname, f"{name} {interface} can't be used on an interface"))
+    return found
+
+
+def collect(rows):
+    # Returns (interface entries [(interface, hostname, label)], {hostname: {field: set of list values}}, issues)
+    interfaces = []
+    routing = {}
+    found = []
+    for line, row in enumerate(rows, start=2):
+        hostname = (row.get("hostname") or "").strip()
+        if not hostname:
+            continue
+        name = (row.get("intf_name") or "").strip() or f"line {line}"
+        for field, version in (("intf_ipv4", 4), ("intf_ipv6", 6)):
+            value = (row.get(field) or "").strip()
+            if not value:
+                continue
+            try:
+                interface = parse_interface(value, version)
+            except ValueError as e:
+                found.append(issue("error", "malformed", hostname, f"{name} {field} '{value}': {e}"))
+                continue
+            found.extend(interface_issues(hostname, name, interface))
+            interfaces.append((interface, hostname, f"{hostname} {name}"))
+        device = routing.setdefault(hostname, {})
+        for field in routing_fields:
+            value = (row.get(field) or "").strip()
+            if value:
+                device.setdefault(field, set()).add(value)
+    return interfaces, routing, found
+
+
+def duplicate_addresses(interfaces):
+    # Same host address on more than one interface, adjacent once sorted by address
+    found = []
+    ordered = sorted(interfaces, key=lambda entry: (entry[0].version, int(entry[0].ip)))
+    start = 0
+    for i in range(1, len(ordered) + 1):
+        if i == len(ordered) or ordered[i][0].ip != ordered[start][0].ip:
+            if i - start > 1:
+                labels = ", ".join(label for _, _, label in ordered[start:i])
+                found.append(issue("error", "duplicate-address", ordered[start][1],
+                                   f"{ordered[start][0].ip} is configured on {labels}"))
+            start = i
+    return found
+
+
+def overlapping_networks(entries):
+    # entries are (network, label). Identical networks are fine (a shared link or a repeated
+    # value) and are returned as groups, a network inside a different one is an overlap.
+    # Sorted by start then by size, each network is checked against the innermost network still
+    # open on the stack, which is the one containing it if any does
+    ordered = sorted(entries, key=lambda entry: (entry[0].version, int(entry[0].network_address), entry[0].prefixlen))
+    groups = []
+    overlaps = []
+    stack = []
+    for network, label in ordered:
+        if groups and groups[-1][0] == network:
+            groups[-1][1].append(label)
+            continue
+        while stack and (stack[-1][0].version != network.version or
+                         int(stack[-1][0].broadcast_address) < int(network.network_address)):
+            stack.pop()
+        group = (network, [label])
+        if stack:
+            overlaps.append((stack[-1], group))
+        stack.append(group)
+        groups.append(group)
+    return groups, overlaps
+
+
+def subnet_issues(interfaces):
+    found = []
+    groups, overlaps = overlapping_networks([(entry[0].network, entry) for entry in interfaces])
+    for (outer, outer_entries), (inner, inner_entries) in overlaps:
+        found.append(issue("error", "overlapping-subnet", inner_entries[0][1],
+                           f"{inner} ({', '.join(e[2] for e in inner_entries)}) overlaps "
+                           f"{outer} ({', '.join(e[2] for e in outer_entries)})"))
+    for network, entries in groups:
+        # A subnet shared between devices is a link, twice on one device is a mistake
+        seen = {}
+        for _, hostname, label in entries:
+            if hostname in seen:
+                found.append(issue("error", "overlapping-subnet", hostname, f"{network} is on both {seen[hostname]} and {label}"))
+            seen.setdefault(hostname, label)
+    return found
+
+
+def parse_route_network(value, field, version):
+    value = value.strip()
+    if field == "rip_networks":
+        # Compared as plain addresses, the classful network is up to the device
+        if "/" in value or validateIPv4.parse_address(value) is None:
+            raise ValueError("not a network address")
+        return ipaddress.ip_network(f"{value}/32")
+    if "/" not in value:
+        raise ValueError("missing prefix length")
+    if version == 4 and validateIPv4.parse_address(value) is None:
+        raise ValueError("not a dotted quad with a valid prefix length")
+    network = ipaddress.ip_network(value)
+    if network.version != version:
+        raise ValueError(f"not an IPv{version} network")
+    return network
+
+
+def routing_issues(routing):
+    # Each device's routing lists must parse, and the same network shouldn't be listed twice
+    found = []
+    for hostname, fields in routing.items():
+        for field, values in fields.items():
+            version = routing_fields[field]
+            entries = []
+            for value in values:
+                for item in (v.strip() for v in value.split(";")):
+                    if not item:
+                        continue
+                    try:
+                        entries.append((parse_route_network(item, field, version), item))
+                    except ValueError as e:
+                        found.append(issue("error", "malformed", hostname, f"{field} '{item}': {e}"))
+            groups, _ = overlapping_networks(entries)
+            for network, items in groups:
+                if len(items) > 1:
+                    found.append(issue("warning", "duplicate-network", hostname, f"{field} lists {network} {len(items)} times"))
+    return found
+
+
+def validate_rows(rows):
+    # All issues for a list of requirements.csv rows, errors first
+    interfaces, routing, found = collect(rows)
+    found.extend(duplicate_addresses(interfaces))
+    found.extend(subnet_issues(interfaces))
+    found.extend(routing_issues(routing))
+    found.sort(key=lambda i: (i["severity"] != "error", i["hostname"], i["check"]))
+    return found
+
+
+def validate_csv(input_csv=requirements):
+    return validate_rows(inventory_store.get_store(input_csv).rows())
+
+
+def errors(issues):
+    return [i for i in issues if i["severity"] == "error"]
+
+
+def print_issues(issues):
+    for i in issues:
+        print(f"{i['severity'].upper():<8}{i['hostname']:<10}{i['check']:<20}{i['message']}")
+
+
+def check_plan(input_csv=requirements):
+    # Prints the issues and returns True when nothing blocks a render/push
+    issues = validate_csv(input_csv)
+    print_issues(issues)
+    if errors(issues):
+        print(f"Address plan has {len(errors(issues))} error(s), nothing was rendered or pushed")
+        return False
+    print(f"Address plan OK ({len(issues)} warning(s))")
+    return True
+
+
+def main():
+    input_csv = sys.argv[sys.argv.index("--csv") + 1] if "--csv" in sys.argv else requirements
+    if not check_plan(input_csv):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
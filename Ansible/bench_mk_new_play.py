@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import os
+import csv
+import time
+import yaml
+import shutil
+import tempfile
+import argparse
+import mk_new_play
+
+# Times mk_new_play's device grouping on a synthetic requirements.csv
+# e.g. ./bench_mk_new_play.py --devices 10000 --interfaces 100000 --legacy
+
+fieldnames = ["device_type","hostname","username","password","vlan_list","intf_name","intf_desc","intf_switchport_mode",
+              "intf_access_vlan","intf_no_switchport","intf_encapsulation","intf_ipv4","intf_ipv6","ospf_process",
+              "intf_ospf_area","bgp_asn","router_id","bgp_neighbors_ipv4","bgp_networks_ipv4","bgp_neighbors_ipv6",
+              "bgp_networks_ipv6","bgp_redistribute_ospf","bgp_redistribute_ospfv3","ospf_default_info",
+              "ospf_redistribute_bgp","ospf_networks","static_ipv4_network","static_ipv4_nexthop","static_ipv6_network",
+              "static_ipv6_nexthop","rip_networks","rip_enabled","netmiko_device_type","management_ip"]
+
+
+def write_synthetic_csv(path, device_count, interface_count):
+    # Interfaces are spread round robin so every device's rows are interleaved like a hand edited file
+    device_types = ["router", "edge_router", "switch"]
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(interface_count):
+            d = i % device_count
+            n = i // device_count
+            writer.writerow({
+                "device_type": device_types[d % 3], "hostname": f"D{d}", "username": "admin", "password": "admin",
+                "vlan_list": "10,20", "intf_name": f"Ethernet{n + 1}", "intf_desc": f"link {n}",
+                "intf_no_switchport": "TRUE", "intf_ipv4": f"10.{d // 256 % 256}.{d % 256}.{n % 254 + 1}/32",
+                "ospf_process": "10", "intf_ospf_area": "0.0.0.0", "router_id": f"1.{d // 65536}.{d // 256 % 256}.{d % 256}",
+                "rip_networks": "10.0.0.0;10.1.0.0", "rip_enabled": "TRUE", "netmiko_device_type": "arista_eos",
+                "management_ip": f"172.{16 + d // 65536}.{d // 256 % 256}.{d % 256}",
+            })
+
+
+def legacy_build_devices(input_csv):
+    # The old grouping, one linear scan of the device list per csv row
+    devices = {"router": [], "edge_router": [], "switch": []}
+    with open(input_csv, newline="") as file:
+        for row in csv.DictReader(file):
+            hostname = row["hostname"].strip()
+            device_type = row["device_type"].strip().lower()
+            existing = next((d for d in devices[device_type] if d["hostname"] == hostname), None)
+            if not existing:
+                existing = mk_new_play.new_device(row, hostname, device_type)
+                devices[device_type].append(existing)
+            if row.get("intf_name"):
+                existing["interfaces"].append(mk_new_play.new_interface(row))
+    return devices
+
+
+def write_vars(devices, workdir):
+    for dtype, dlist in devices.items():
+        with open(os.path.join(workdir, f"{dtype}.yml"), "w") as yamlfile:
+            yaml.dump({"devices": dlist}, yamlfile, Dumper=mk_new_play.Dumper, sort_keys=False)
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28}{time.perf_counter() - start:>10.3f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark requirements.csv -> role vars generation")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--interfaces", type=int, default=100000)
+    parser.add_argument("--legacy", action="store_true", help="also time the old linear scan grouping")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        input_csv = os.path.join(workdir, "requirements.csv")
+        print(f"{args.devices} devices, {args.interfaces} interface rows")
+        timed("write synthetic csv", write_synthetic_csv, input_csv, args.devices, args.interfaces)
+        timed("parse csv (inventory store)", lambda: mk_new_play.inventory_store.get_store(input_csv).rows())
+        devices = timed("build_devices", mk_new_play.build_devices, input_csv)
+        timed("yaml dump", write_vars, devices, workdir)
+        if args.legacy:
+            legacy = timed("legacy build (linear scan)", legacy_build_devices, input_csv)
+            print(f"same output: {legacy == devices}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import gzip
+import json
+import fcntl
+import bisect
+import hashlib
+import threading
+from contextlib import contextmanager
+
+# Content addressed archive for golden configs. Each distinct config is stored once, gzipped,
+# under its sha256 (objects/ab/abcd...gz) and index.json keeps every device's timeline:
+# {"hosts": {hostname: [{"timestamp", "sha", "size", "last_seen"}, ...oldest first]}}
+# Saving a config identical to the device's latest one only moves that entry's last_seen,
+# so unchanged configs cost no new objects or timeline entries
+store_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/config_store"
+archive_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/config_archive"
+golden_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/golden_configs"
+checkout_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/rollback_configs"
+
+# R1_golden_config_2025-10-13_22-21-35.txt
+golden_file_pattern = re.compile(r"(?P<hostname>.+)_golden_config_(?P<timestamp>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.txt$")
+
+
+class ConfigStore:
+    # index.json is shared with other processes (the portal, the CLI, scheduled backups). Reads pick
+    # up changes others saved, and saving re-reads the file under a file lock and merges this
+    # process's new entries into it, so nobody writes a stale copy over someone else's entries
+    def __init__(self, root=store_dir):
+        self.root = root
+        self.index_file = os.path.join(root, "index.json")
+        self._lock = threading.RLock()
+        self._index = None
+        self._signature = None
+        self._pending = []      # (hostname, entry) put since the last save
+
+    @staticmethod
+    def _tmp_name(path):
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "index.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _disk_signature(self):
+        try:
+            stat = os.stat(self.index_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_disk(self):
+        # The saved index with this process's unsaved entries applied on top
+        try:
+            with open(self.index_file) as file:
+                index = json.load(file)
+        except FileNotFoundError:
+            index = {"hosts": {}}
+        for hostname, entry in self._pending:
+            self._add_entry(index["hosts"].setdefault(hostname, []), dict(entry))
+        return index
+
+    def _load(self):
+        signature = self._disk_signature()
+        if self._index is None or signature != self._signature:
+            self._index = self._read_disk()
+            self._signature = signature
+        return self._index
+
+    def save(self):
+        with self._lock, self._file_lock():
+            self._index = self._read_disk()
+            tmp_file = self._tmp_name(self.index_file)
+            with open(tmp_file, "w") as file:
+                json.dump(self._index, file, indent=1, sort_keys=True)
+            os.replace(tmp_file, self.index_file)
+            self._signature = self._disk_signature()
+            self._pending = []
+
+    def object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.gz")
+
+    def put(self, hostname, text, timestamp, save=True):
+        # Stores text as hostname's config at timestamp, returns its sha.
+        # Batches pass save=False and call save() once at the end
+        data = text.encode()
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.object_path(sha)
+        # Objects are immutable and named by content, so they're compressed without holding the
+        # index lock, a concurrent write of the same object just replaces it with identical bytes
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = self._tmp_name(path)
+            with gzip.open(tmp_file, "wb", compresslevel=9) as file:
+                file.write(data)
+            os.replace(tmp_file, path)
+        entry = {"timestamp": timestamp, "sha": sha, "size": len(data), "last_seen": timestamp}
+        with self._lock:
+            self._pending.append((hostname, dict(entry)))
+            self._add_entry(self._load()["hosts"].setdefault(hostname, []), entry)
+            if save:
+                self.save()
+        return sha
+
+    @staticmethod
+    def _add_entry(timeline, entry):
+        # Timelines stay sorted by timestamp, an entry only starts where the content changed
+        position = len(timeline)
+        while position and timeline[position - 1]["timestamp"] > entry["timestamp"]:
+            position -= 1
+        previous = timeline[position - 1] if position else None
+        if previous and previous["sha"] == entry["sha"]:
+            previous["last_seen"] = max(previous["last_seen"], entry["timestamp"])
+            return
+        following = timeline[position] if position < len(timeline) else None
+        if following and following["sha"] == entry["sha"]:
+            # Imported out of order, the same content was already known from a later time
+            following["timestamp"] = entry["timestamp"]
+            return
+        timeline.insert(position, entry)
+
+    def get(self, sha):
+        with gzip.open(self.object_path(sha), "rb") as file:
+            return file.read().decode()
+
+    def hosts(self):
+        with self._lock:
+            return sorted(self._load()["hosts"])
+
+    def history(self, hostname):
+        # [{"timestamp", "sha", "size", "last_seen"}] oldest first
+        with self._lock:
+            return [dict(entry) for entry in self._load()["hosts"].get(hostname, [])]
+
+    def latest(self, hostname):
+        with self._lock:
+            timeline = self._load()["hosts"].get(hostname)
+            return dict(timeline[-1]) if timeline else None
+
+    def at(self, hostname, timestamp=None):
+        # The entry that was current at timestamp (the newest one starting at or before it),
+        # the latest entry when timestamp is None, None if the device has nothing that old
+        if timestamp is None:
+            return self.latest(hostname)
+        timestamp = normalize_timestamp(timestamp)
+        with self._lock:
+            timeline = self._load()["hosts"].get(hostname, [])
+            position = bisect.bisect_right([entry["timestamp"] for entry in timeline], timestamp)
+            return dict(timeline[position - 1]) if position else None
+
+    def checkout(self, hostname, timestamp=None, directory=checkout_dir):
+        # Writes the config current at timestamp to a text file (what Netmiko pushes from), returns its path
+        entry = self.at(hostname, timestamp)
+        if entry is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{hostname}_golden_config_{entry['timestamp']}.txt")
+        # A file left there earlier is only reused when it still holds exactly that config
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                if hashlib.sha256(file.read()).hexdigest() == entry["sha"]:
+                    return path
+        tmp_file = self._tmp_name(path)
+        with open(tmp_file, "w") as file:
+            file.write(self.get(entry["sha"]))
+        os.replace(tmp_file, path)
+        return path
+
+    def import_files(self, paths):
+        # Ingests <hostname>_golden_config_<timestamp>.txt files, returns how many were read
+        count = 0
+        for path in sorted(paths, key=lambda p: golden_file_pattern.search(os.path.basename(p)).group("timestamp")):
+            match = golden_file_pattern.search(os.path.basename(path))
+            with open(path) as file:
+                self.put(match.group("hostname"), file.read(), match.group("timestamp"), save=False)
+            count += 1
+        self.save()
+        return count
+
+    def disk_usage(self):
+        total = 0
+        for directory, _, files in os.walk(os.path.join(self.root, "objects")):
+            total += sum(os.path.getsize(os.path.join(directory, f)) for f in files)
+        return total
+
+
+def normalize_timestamp(timestamp):
+    # Accepts the archive format (2025-10-13_22-21-35) or just a date, which means the end of that day
+    timestamp = timestamp.strip().replace(" ", "_").replace(":", "-")
+    if len(timestamp) == 10:
+        timestamp += "_23-59-59"
+    if not re.fullmatch(r"\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}", timestamp):
+        raise ValueError(f"timestamp '{timestamp}' isn't YYYY-MM-DD or YYYY-MM-DD_HH-MM-SS")
+    return timestamp
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(root=store_dir):
+    # One shared store per directory so every caller sees the same index
+    root = os.path.abspath(root)
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = ConfigStore(root)
+        return _stores[root]
+
+
+def seeded_store(root=store_dir, directory=golden_dir):
+    # The shared store, on first use filled with the golden configs saved before it existed
+    store = get_store(root)
+    if not store.hosts():
+        store.import_files(golden_files(directory))
+    return store
+
+
+def golden_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, f) for f in os.listdir(directory) if golden_file_pattern.search(f)]
+
+
+def import_archive(directories=(archive_dir, golden_dir), root=store_dir):
+    # One off import of the old text archive (and the current golden configs) into the store
+    store = get_store(root)
+    paths = [path for directory in directories for path in golden_files(directory)]
+    raw = sum(os.path.getsize(path) for path in paths)
+    count = store.import_files(paths)
+    entries = sum(len(store.history(h)) for h in store.hosts())
+    print(f"Imported {count} files for {len(store.hosts())} devices into {store.root}")
+    print(f"{entries} timeline entries, {raw} bytes of text stored in {store.disk_usage()} bytes")
+    return count
+
+
+def main():
+    if "--import" in sys.argv:
+        directories = sys.argv[sys.argv.index("--import") + 1:] or [archive_dir, golden_dir]
+        import_archive(directories)
+        return
+    store = get_store()
+    hostnames = sys.argv[1:] or store.hosts()
+    for hostname in hostnames:
+        for entry in store.history(hostname):
+            print(f"{hostname:<10}{entry['timestamp']:<22}{entry['last_seen']:<22}{entry['sha'][:12]}  {entry['size']}")
+
+
+if __name__ == "__main__":
+    main()
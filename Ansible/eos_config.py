@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+import re
+import sys
+import hashlib
+import warnings
+import ipaddress
+
+# crypt is only used to check plain text candidate secrets against the sha512 hashes EOS shows
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import crypt
+except ImportError:
+    crypt = None
+
+# Helpers for comparing EOS style configs block by block. A config is parsed into a tree
+# of {line: {child line: {...}}} where the nesting follows the indentation
+
+
+# EOS accepts abbreviations in candidates but always shows the full form in show run
+abbreviations = {"no shut": "no shutdown", "shut": "shutdown"}
+
+# Default settings show run never displays: {default line: start of the lines that replace it}.
+# A default counts as present on a side that has nothing replacing it
+hidden_defaults = {"switchport mode access": "switchport mode ", "no shutdown": "shutdown"}
+
+
+def normalize_line(line):
+    line = " ".join(line.split())
+    # "network 10.10.3.1/28" is stored by the device as "network 10.10.3.0/28"
+    match = re.fullmatch(r"network (\S+/\d+)(.*)", line)
+    if match:
+        try:
+            line = f"network {ipaddress.ip_network(match.group(1), strict=False)}{match.group(2)}"
+        except ValueError:
+            pass
+    return abbreviations.get(line, line)
+
+
+def _skip(line):
+    return not line or line == "end" or line.startswith("!")
+
+
+def parse_config(text):
+    # Builds the nested dict tree, children are keyed under their parent so the same line in two
+    # sections (redistribute under router bgp and under an address-family) stays separate.
+    # Repeated headers in the same place (e.g. "ip routing" twice) are merged
+    tree = {}
+    stack = [(-1, tree)]
+    family = None   # indent of an open address-family header
+    for raw in text.splitlines():
+        line = normalize_line(raw)
+        if _skip(line):
+            # Candidate templates write address-family children at the header's own indent and
+            # end the block with a blank line
+            family = None
+            continue
+        indent = len(raw) - len(raw.lstrip(" "))
+        if family is not None:
+            if indent < family or line.startswith("address-family "):
+                family = None
+            elif indent == family:
+                indent = family + 1
+        while stack[-1][0] >= indent:
+            stack.pop()
+        children = stack[-1][1].setdefault(line, {})
+        stack.append((indent, children))
+        if line.startswith("address-family "):
+            family = indent
+    return expand_vlans(tree)
+
+
+def expand_vlans(tree):
+    # show run collapses "vlan 10" ... "vlan 50" into "vlan 10,20,30,40,50", split them back out
+    expanded = {}
+    for line, children in tree.items():
+        match = re.fullmatch(r"vlan ([\d,\-]+)", line)
+        if not match:
+            expanded.setdefault(line, {}).update(children)
+            continue
+        for part in match.group(1).split(","):
+            if "-" in part:
+                low, high = part.split("-")
+                vlans = range(int(low), int(high) + 1)
+            else:
+                vlans = [int(part)]
+            for vlan in vlans:
+                expanded.setdefault(f"vlan {vlan}", {}).update(children)
+    return expanded
+
+
+def _secret_matches(line, running):
+    # Returns None when the line has no plain text secret, otherwise whether the device's
+    # hashed secret for that user matches it
+    match = re.fullmatch(r"username (\S+) (?:.* )?secret (?!sha512 |5 |7 )(?:0 )?(\S+)", line)
+    if not match:
+        return None
+    name, plain = match.groups()
+    for other in running:
+        hashed = re.fullmatch(rf"username {re.escape(name)} (?:.* )?secret sha512 (\S+)", other)
+        if hashed:
+            return crypt is not None and crypt.crypt(plain, hashed.group(1)) == hashed.group(1)
+    return False
+
+
+def _hashed_line(line, other):
+    # The other side's username line when line's plain text secret matches its hash, else line
+    if _secret_matches(line, other):
+        name = line.split()[1]
+        return next(o for o in other if o.startswith(f"username {name} ") and " secret sha512 " in o)
+    return line
+
+
+def _hidden_default(line, lines):
+    override = hidden_defaults.get(line)
+    return override is not None and not any(other.startswith(override) for other in lines)
+
+
+def _drop_defaults(tree, other):
+    # tree without the hidden defaults other doesn't show, since other has them implicitly
+    result = {}
+    for line, children in tree.items():
+        if not children and line not in other and _hidden_default(line, other):
+            continue
+        result[line] = _drop_defaults(children, other[line]) if line in other else children
+    return result
+
+
+def normalize_pair(old, new):
+    # Aligns two parsed configs on what show run hides or rewrites, so only real differences remain:
+    # hidden defaults only one side lists are dropped from it (in both directions), and a plain text
+    # username secret that matches the other side's sha512 hash is replaced by that hashed line.
+    # Used by config_delta, restore_commands and section_diff alike
+    old = {_hashed_line(line, new): children for line, children in old.items()}
+    new = {_hashed_line(line, old): children for line, children in new.items()}
+    return _drop_defaults(old, new), _drop_defaults(new, old)
+
+
+def mask_secret(line):
+    # For diffs shown to people, never for pushed commands
+    return re.sub(r"( secret (?:sha512 |5 |7 |0 )?)\S+", r"\1*****", line)
+
+
+def block_in_sync(line, children, running):
+    # True when line and everything below it is on the device, compared level by level so a
+    # child only matches the same child under the same parent. Both sides are normalize_pair'ed
+    if line not in running:
+        return False
+    return all(block_in_sync(child, grandchildren, running[line]) for child, grandchildren in children.items())
+
+
+def format_block(line, children, depth=0):
+    lines = ["   " * depth + line]
+    for child, grandchildren in children.items():
+        lines += format_block(child, grandchildren, depth + 1)
+    return lines
+
+
+def changed_blocks(candidate_text, running_text):
+    # Top level candidate blocks (header + children) that aren't fully present on the device
+    running, candidate = normalize_pair(parse_config(running_text), parse_config(candidate_text))
+    return {line: children for line, children in candidate.items() if not block_in_sync(line, children, running)}
+
+
+def config_delta(candidate_text, running_text):
+    # The lines to send so the device matches the candidate: whole changed blocks, nothing else
+    lines = []
+    for line, children in changed_blocks(candidate_text, running_text).items():
+        lines += format_block(line, children)
+    return lines
+
+
+def restore_commands(target_text, running_text):
+    # Commands that make the device match target exactly: missing blocks are sent whole and lines
+    # only the device has are negated. Unlike config_delta this also removes extra config
+    running, target = normalize_pair(parse_config(running_text), parse_config(target_text))
+    return _restore(target, running, 0)
+
+
+# Commands that hold one value, setting a new value replaces the old one so the old line must
+# not be negated afterwards ("no description old" would clear the new description)
+single_value_commands = ["hostname", "description", "ip address", "router-id", "snmp-server location",
+                         "snmp-server contact", "spanning-tree mode", "encapsulation dot1q vlan",
+                         "switchport mode", "switchport access vlan", "mtu"]
+
+
+def _setting(line):
+    # The setting a single value command changes ("ip address", "username admin"), None for anything else
+    words = line.split()
+    if words[0] == "username" and len(words) > 1:
+        return f"username {words[1]}"
+    if line.startswith("ip address ") and line.endswith(" secondary"):
+        return None
+    return next((command for command in single_value_commands if line == command or line.startswith(command + " ")), None)
+
+
+def _restore(target, running, depth):
+    # Negations come before additions at every level, so nothing just set gets removed again
+    replaced = {_setting(line) for line in target} - {None}
+    negations = []
+    for line in running:
+        # Negated lines on the device are defaults coming back, there is nothing to undo
+        if line in target or line.startswith("no ") or line in hidden_defaults:
+            continue
+        if _setting(line) in replaced or f"no {line}" in target:
+            continue
+        negations.append("   " * depth + "no " + line)
+    additions = []
+    for line, children in target.items():
+        if line not in running:
+            additions += format_block(line, children, depth)
+        else:
+            below = _restore(children, running[line], depth + 1)
+            if below:
+                additions += ["   " * depth + line] + below
+    return negations + additions
+
+
+def config_hash(text):
+    # sha256 of the parsed config, so comments, the show run banner, whitespace and
+    # abbreviations don't count as a change
+    lines = []
+    for line, children in parse_config(text).items():
+        lines += format_block(line, children)
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def _diff_children(old, new, depth):
+    # Lines under one section that differ, with the unchanged headers above them kept for context
+    lines = []
+    for line, children in new.items():
+        if line not in old:
+            lines += ["+ " + entry for entry in format_block(line, children, depth)]
+        else:
+            below = _diff_children(old[line], children, depth + 1)
+            if below:
+                lines += ["  " + "   " * depth + line] + below
+    for line, children in old.items():
+        if line not in new:
+            lines += ["- " + entry for entry in format_block(line, children, depth)]
+    return lines
+
+
+def section_diff(old_text, new_text):
+    # Section level diff of two configs, one entry per top level block that differs:
+    # [{"section": header, "status": "added" | "removed" | "changed", "lines": ["+ ...", "- ...", "  ..."]}]
+    # in the order the sections appear in new_text, removed sections last. Secrets are masked
+    old, new = normalize_pair(parse_config(old_text), parse_config(new_text))
+    sections = []
+    for line, children in new.items():
+        if line not in old:
+            sections.append({"section": line, "status": "added", "lines": ["+ " + entry for entry in format_block(line, children)]})
+            continue
+        below = _diff_children(old[line], children, 1)
+        if below:
+            sections.append({"section": line, "status": "changed", "lines": ["  " + line] + below})
+    for line, children in old.items():
+        if line not in new:
+            sections.append({"section": line, "status": "removed", "lines": ["- " + entry for entry in format_block(line, children)]})
+    for section in sections:
+        section["section"] = mask_secret(section["section"])
+        section["lines"] = [mask_secret(line) for line in section["lines"]]
+    return sections
+
+
+def main():
+    if "--diff" in sys.argv and len(sys.argv) == 4:
+        # eos_config.py --diff <old config> <new config>
+        with open(sys.argv[2]) as file:
+            old = file.read()
+        with open(sys.argv[3]) as file:
+            new = file.read()
+        sections = section_diff(old, new)
+        for section in sections:
+            print("\n".join(section["lines"]))
+        print(f"{len(sections)} section(s) differ" if sections else "No differences")
+        return
+    if len(sys.argv) != 3:
+        print("Usage: eos_config.py <candidate config> <running config>")
+        print("       eos_config.py --diff <old config> <new config>")
+        return
+    with open(sys.argv[1]) as file:
+        candidate = file.read()
+    with open(sys.argv[2]) as file:
+        running = file.read()
+    print("\n".join(config_delta(candidate, running)) or "No changes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import hashlib
+import threading
+import collections
+import multiprocessing
+import concurrent.futures as cf
+import config_store
+import eos_config
+import inventory_store
+
+# Section level diffs for the whole fleet between two config sources:
+#   candidate                  candidate_configs/<host>.txt
+#   golden                     newest golden config in the config store
+#   golden@2025-10-13_22-30    golden config each device had at that time (or date)
+# Diffs are cached by the sha256 of both sides, so re-running a review only diffs what changed
+requirements = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+candidate_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs"
+cache_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/diff_cache.json"
+
+# Below this many uncached diffs a process pool costs more to start than it saves
+parallel_threshold = 16
+
+# One pool per process, built on first use. The portal calls diff_fleet from threaded request
+# handlers, so workers are started with forkserver instead of forking a process that holds locks
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(max_workers=None):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = cf.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("forkserver"))
+        return _pool
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class DiffCache:
+    # {"<old sha>:<new sha>": sections} kept in insertion order, the oldest are dropped past max_entries
+    def __init__(self, path=cache_file, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = collections.OrderedDict()
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path) as file:
+                        self._entries.update(json.load(file))
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable diff cache {self.path}: {e}")
+        return self._entries
+
+    def get(self, old_sha, new_sha):
+        with self._lock:
+            return self._load().get(f"{old_sha}:{new_sha}")
+
+    def put(self, old_sha, new_sha, sections):
+        with self._lock:
+            entries = self._load()
+            entries[f"{old_sha}:{new_sha}"] = sections
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            tmp_file = f"{self.path}.tmp"
+            with open(tmp_file, "w") as file:
+                json.dump(self._load(), file)
+            os.replace(tmp_file, self.path)
+
+
+_cache = DiffCache()
+
+
+def load_config(hostname, source):
+    # Config text for a device from a source spec, None when there isn't one
+    if source == "candidate":
+        path = os.path.join(candidate_dir, f"{hostname}.txt")
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return file.read()
+    if source == "golden" or source.startswith("golden@"):
+        timestamp = source.partition("@")[2] or None
+        store = config_store.seeded_store()
+        entry = store.at(hostname, timestamp)
+        return store.get(entry["sha"]) if entry else None
+    raise ValueError(f"Unknown config source '{source}', use candidate, golden or golden@<timestamp>")
+
+
+def _diff(pair):
+    return eos_config.section_diff(*pair)
+
+
+def diff_fleet(hostnames, old_source="golden", new_source="candidate", max_workers=None, cache=_cache):
+    # Returns one result per device, in hostname order:
+    # {"hostname", "status": "changed" | "unchanged" | "missing", "sections", "added", "removed", "cached"}
+    if old_source.startswith("golden@"):
+        config_store.normalize_timestamp(old_source.partition("@")[2])
+    if new_source.startswith("golden@"):
+        config_store.normalize_timestamp(new_source.partition("@")[2])
+    results = {}
+    pending = {}    # hostname -> (old sha, new sha, old text, new text)
+    for hostname in sorted(hostnames):
+        old = load_config(hostname, old_source)
+        new = load_config(hostname, new_source)
+        result = {"hostname": hostname, "status": "missing", "sections": [], "added": 0, "removed": 0, "cached": False}
+        results[hostname] = result
+        if old is None or new is None:
+            result["missing"] = old_source if old is None else new_source
+            continue
+        old_sha, new_sha = sha256(old), sha256(new)
+        sections = [] if old_sha == new_sha else cache.get(old_sha, new_sha)
+        if sections is None:
+            pending[hostname] = (old_sha, new_sha, old, new)
+        else:
+            _fill(result, sections)
+            result["cached"] = True
+
+    # Identical pairs (same change on many devices) are only diffed once
+    unique = {}
+    for old_sha, new_sha, old, new in pending.values():
+        unique.setdefault((old_sha, new_sha), (old, new))
+    keys = list(unique)
+    if len(keys) >= parallel_threshold:
+        diffs = list(get_pool(max_workers).map(_diff, (unique[k] for k in keys), chunksize=max(1, len(keys) // 64)))
+    else:
+        diffs = [_diff(unique[k]) for k in keys]
+    computed = dict(zip(keys, diffs))
+    for key, sections in computed.items():
+        cache.put(key[0], key[1], sections)
+    for hostname, (old_sha, new_sha, _, _) in pending.items():
+        _fill(results[hostname], computed[(old_sha, new_sha)])
+    if computed:
+        cache.save()
+    return list(results.values())
+
+
+def _fill(result, sections):
+    result["sections"] = sections
+    result["status"] = "changed" if sections else "unchanged"
+    result["added"] = sum(1 for s in sections for line in s["lines"] if line.startswith("+"))
+    result["removed"] = sum(1 for s in sections for line in s["lines"] if line.startswith("-"))
+
+
+def print_results(results, summary_only=False):
+    for result in results:
+        if result["status"] == "missing":
+            print(f"{result['hostname']:<10}missing ({result['missing']} config not found)")
+            continue
+        print(f"{result['hostname']:<10}{result['status']:<10}{len(result['sections'])} section(s) +{result['added']} -{result['removed']}")
+        if not summary_only:
+            for section in result["sections"]:
+                print("\n".join("    " + line for line in section["lines"]))
+    changed = sum(1 for r in results if r["status"] == "changed")
+    print(f"{changed} of {len(results)} devices differ")
+
+
+# value that follows a command line flag
+def get_arg(flag, default=None):
+    if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(flag) + 1]
+    return default
+
+
+def main():
+    # fleet_diff.py [--old golden] [--new candidate] [--hosts R1,R2] [--workers N] [--summary]
+    hosts = get_arg("--hosts")
+    hostnames = hosts.split(",") if hosts else inventory_store.get_store(requirements).hostnames()
+    workers = int(get_arg("--workers", 0)) or None
+    try:
+        results = diff_fleet(hostnames, get_arg("--old", "golden"), get_arg("--new", "candidate"), workers)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print_results(results, "--summary" in sys.argv)
+
+
+if __name__ == "__main__":
+    main()
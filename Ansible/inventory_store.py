@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import csv
+import os
+import threading
+
+# Parsed, indexed copy of requirements.csv shared by the FrontEnd and Ansible code.
+# The file is only re-read when its mtime or size changes, every other call is a dict lookup.
+requirements = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+
+
+class InventoryStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._fieldnames = None
+        self._rows = []
+        self._by_hostname = {}   # hostname -> [rows] in file order
+        self._by_type = {}       # device_type -> [hostnames]
+        self._by_mgmt_ip = {}    # management_ip -> hostname
+        self._mgmt_ips = {}      # hostname -> management_ip
+        self._creds = {}         # hostname -> {"username", "password"}
+        self._devices = []       # [{"hostname", "device_type", "management_ip", "site"}] in file order
+
+    def _current_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        signature = self._current_signature()
+        if signature == self._signature and signature is not None:
+            return
+        with self._lock:
+            if signature == self._signature and signature is not None:
+                return
+            self._load(signature)
+
+    def _load(self, signature):
+        fieldnames, rows = None, []
+        if signature is not None:
+            with open(self.path, newline="") as file:
+                reader = csv.DictReader(file)
+                rows = list(reader)
+                fieldnames = reader.fieldnames
+
+        by_hostname, by_type, by_mgmt_ip, mgmt_ips, creds = {}, {}, {}, {}, {}
+        for row in rows:
+            hostname = (row.get("hostname") or "").strip()
+            if not hostname:
+                continue
+            if hostname not in by_hostname:
+                by_hostname[hostname] = []
+                device_type = (row.get("device_type") or "").strip().lower()
+                by_type.setdefault(device_type, []).append(hostname)
+            by_hostname[hostname].append(row)
+            # Later rows win, the same as the old per-call csv readers
+            mgmt_ip = (row.get("management_ip") or "").strip()
+            if mgmt_ip:
+                mgmt_ips[hostname] = mgmt_ip
+                by_mgmt_ip[mgmt_ip] = hostname
+            username = (row.get("username") or "").strip()
+            password = (row.get("password") or "").strip()
+            if username and password:
+                creds[hostname] = {"username": username, "password": password}
+
+        self._fieldnames = fieldnames
+        self._rows = rows
+        self._by_hostname = by_hostname
+        self._by_type = by_type
+        self._by_mgmt_ip = by_mgmt_ip
+        self._mgmt_ips = mgmt_ips
+        self._creds = creds
+        # One summary per device for the portal's device pickers. site is only filled in when
+        # the inventory has a site column
+        self._devices = [{
+            "hostname": hostname,
+            "device_type": (device_rows[0].get("device_type") or "").strip().lower(),
+            "management_ip": mgmt_ips.get(hostname, ""),
+            "site": next((r["site"].strip() for r in device_rows if (r.get("site") or "").strip()), ""),
+        } for hostname, device_rows in by_hostname.items()]
+        self._signature = signature
+
+    def invalidate(self):
+        # Forces a re-read on the next call, used right after this process rewrites the file
+        with self._lock:
+            self._signature = None
+
+    def fieldnames(self):
+        self._refresh()
+        return list(self._fieldnames) if self._fieldnames is not None else None
+
+    def rows(self):
+        # Copies like device_rows(), a caller editing a row must not change it for everyone else
+        self._refresh()
+        return [dict(row) for row in self._rows]
+
+    def hostnames(self):
+        self._refresh()
+        return list(self._by_hostname)
+
+    def device_rows(self, hostname):
+        self._refresh()
+        return [dict(row) for row in self._by_hostname.get(hostname, [])]
+
+    def hostnames_by_type(self, device_type):
+        self._refresh()
+        return list(self._by_type.get(device_type.lower(), []))
+
+    def device_types(self):
+        self._refresh()
+        return {device_type: list(hosts) for device_type, hosts in self._by_type.items()}
+
+    def hostname_for_ip(self, mgmt_ip):
+        self._refresh()
+        return self._by_mgmt_ip.get(mgmt_ip)
+
+    def management_ips(self):
+        # {hostname: management_ip}
+        self._refresh()
+        return dict(self._mgmt_ips)
+
+    def management_ip(self, hostname):
+        self._refresh()
+        return self._mgmt_ips.get(hostname)
+
+    def devices(self):
+        # [{"hostname", "device_type", "management_ip", "site"}], a copy callers are free to change
+        self._refresh()
+        return [dict(device) for device in self._devices]
+
+    def credentials(self):
+        # {hostname: {"username": ..., "password": ...}}, a copy like devices()
+        self._refresh()
+        return {hostname: dict(creds) for hostname, creds in self._creds.items()}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=requirements):
+    # One store per csv path for the whole process
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = InventoryStore(path)
+        return _stores[path]
@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 
 import os
-import csv
+import re
 import sys
-import glob
+import json
 import subprocess
+import address_plan
+import config_store
+import eos_config
+import inventory_store
 import mk_new_play
+import render
+import render_manifest
+import scheduler
 from netmiko import ConnectHandler
-import concurrent.futures as cf
 
 
 site_yml_location = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/site.yml"
@@ -56,6 +62,7 @@ router_tasks_yml_content = """
     dest: "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs/{{item.hostname}}.txt"
   loop: "{{ devices | default([]) }}"
   when: devices is defined
+  run_once: true
 """
 switch_tasks_yml_content = """
 ---
@@ -69,6 +76,7 @@ switch_tasks_yml_content = """
     dest: "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs/{{item.hostname}}.txt"
   loop: "{{ devices | default([]) }}"
   when: devices is defined
+  run_once: true
 """
 edge_router_tasks_yml_content = """
 ---
@@ -82,11 +90,13 @@ edge_router_tasks_yml_content = """
     dest: "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs/{{item.hostname}}.txt"
   loop: "{{ devices | default([]) }}"
   when: devices is defined
+  run_once: true
 """
 
 
 # this function sets up the ansible files needed for template creation. It will create a site.yml and then a main.yml in the tasks folder for each role
-def mk_playbook_files():
+# hostnames limits the role vars files to those devices so only they get re-rendered
+def mk_playbook_files(hostnames=None):
     with open(site_yml_location, "w") as site_file:
         site_file.write(site_yml_content)
     print("Created site.yml")
@@ -105,23 +115,62 @@ def mk_playbook_files():
 
     # runs the mk_new_play.py script that creates a yml file with the formatted info from requirements.csv
     mk_new_play.build_inventory(requirements, inventory)
-    mk_new_play.yaml_file_creator(requirements)
+    mk_new_play.yaml_file_creator(requirements, hostnames)
 
 
 
-# runs the ansible playbook
-def mk_play_run():
+# runs the ansible playbook, limited to the given hostnames when there are any
+def mk_play_run(hostnames=None):
     print("Running ansible-playbook")
-    run = subprocess.run(["ansible-playbook", "-i", "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/inventory.yml", "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/site.yml"], stdout=subprocess.PIPE, text=True)
+    command = ["ansible-playbook", "-i", "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/inventory.yml", "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/site.yml"]
+    if hostnames:
+        command += ["--limit", ",".join(hostnames)]
+    run = subprocess.run(command, stdout=subprocess.PIPE, text=True)
     print(run.stdout)
     if run.returncode == 0:
         print("Playbook completed")
+    return run.returncode == 0
+
+
+# only regenerates candidate configs for devices whose csv rows or role template changed since
+# the last successful run, pass --full to re-render everything
+# templates are rendered in-process by render.py, pass --engine ansible to use ansible-playbook instead
+def generate_configs():
+    changed, hashes = render_manifest.changed_devices(requirements)
+    if "--full" in sys.argv:
+        changed = list(hashes)
+    if not changed:
+        print("No device changes detected, candidate configs are up to date")
+        return
+    print(f"Rendering candidate configs for {len(changed)} of {len(hashes)} devices: {', '.join(changed)}")
+
+    if get_arg("--engine") == "ansible":
+        mk_playbook_files(changed)
+        if mk_play_run(changed):
+            render_manifest.save_manifest(hashes)
+        return
+
+    results = render.render_candidates(requirements, changed, candidate_dir)
+    for hostname, status in results.items():
+        print(f"{hostname}: {status}")
+    # Failed devices are left out of the manifest so the next run tries them again
+    failed = [hostname for hostname, status in results.items() if status.startswith("failed")]
+    render_manifest.save_manifest({hostname: digest for hostname, digest in hashes.items() if hostname not in failed})
 
 
 
 # basic function to use netmiko to configure a device
-def Config(man_ip, config_file, username="admin", password="admin"): 
+# push_mode "diff" only sends the candidate blocks that differ from the device, compared against
+# its running config or, when baseline_file is given, a saved golden config (no login needed if nothing changed).
+# push_mode "restore" also negates whatever the device has beyond config_file, used to undo drift
+def Config(man_ip, config_file, username="admin", password="admin", push_mode="full", baseline_file=None): 
     try:
+        delta = None
+        if push_mode == "diff" and baseline_file:
+            delta = diff_against(config_file, baseline_file)
+            if not delta:
+                print(f"{man_ip} matches {os.path.basename(baseline_file)}, nothing to push")
+                return
 
         login = {
                 "device_type": "arista_eos",
@@ -133,107 +182,283 @@ def Config(man_ip, config_file, username="admin", password="admin"):
         with ConnectHandler(**login) as net_connect:
             print(f"Logged in to {man_ip}")
             net_connect.enable()
-            output = net_connect.send_config_from_file(config_file)
-            print(f"{man_ip} configured")
+            if push_mode in ("diff", "restore"):
+                if delta is None:
+                    build = eos_config.restore_commands if push_mode == "restore" else eos_config.config_delta
+                    with open(config_file) as file:
+                        delta = build(file.read(), net_connect.send_command("show running-config"))
+                if not delta:
+                    print(f"{man_ip} running config already matches {os.path.basename(config_file)}, nothing to push")
+                    return
+                output = net_connect.send_config_set(delta)
+                print(f"{man_ip} configured ({len(delta)} changed lines)")
+            else:
+                output = net_connect.send_config_from_file(config_file)
+                print(f"{man_ip} configured")
     except KeyboardInterrupt:
         print("Exiting")
 
 
+def diff_against(config_file, baseline_file):
+    with open(config_file) as file:
+        candidate = file.read()
+    with open(baseline_file) as file:
+        baseline = file.read()
+    return eos_config.config_delta(candidate, baseline)
+
+
+# Golden config file for a device from the config store index, the newest one or the one that
+# was current at timestamp. None if the store has nothing for the device
+def latest_golden(hostname, timestamp=None):
+    return config_store.seeded_store(directory=golden_dir).checkout(hostname, timestamp)
+
+
 def parse_devices_from_csv(csv_file=requirements):
     # Parse the CSV and return a dictionary {hostname: management_ip}
     devices = {}
     try:
-        with open(csv_file, newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                hostname = row.get("hostname", "").strip()
-                mgmt_ip = row.get("management_ip", "").strip()
-                if hostname and mgmt_ip:
-                    devices[hostname] = mgmt_ip
+        devices = inventory_store.get_store(csv_file).management_ips()
         print(f"Parsed {len(devices)} unique devices from {csv_file}")
     except Exception as e:
         print(f"Something went wrong trying to parse {csv_file}: {e}")
     return devices
 
 
+# Role and site for each device so the scheduler can order and limit the pushes
+# {hostname: {"role": device_type, "site": site}}, site comes from an optional "site" column
+def parse_device_roles(csv_file=requirements):
+    roles = {}
+    try:
+        store = inventory_store.get_store(csv_file)
+        for hostname in store.hostnames():
+            row = store.device_rows(hostname)[0]
+            roles[hostname] = {"role": (row.get("device_type") or "").strip().lower(), "site": (row.get("site") or "").strip() or "default"}
+    except Exception as e:
+        print(f"Something went wrong trying to parse {csv_file}: {e}")
+    return roles
+
+
+# Scheduler options from the command line:
+# --workers N, --role-limit switch=2,router=4, --site-limit lab=4, --role-order switch,router,edge_router,
+# --retries N and --backoff seconds
+def scheduler_args():
+    args = {
+        "max_workers": int(get_arg("--workers", 0)) or None,
+        "role_limits": scheduler.parse_limits(get_arg("--role-limit")),
+        "site_limits": scheduler.parse_limits(get_arg("--site-limit")),
+        "retries": int(get_arg("--retries", 2)),
+        "backoff": float(get_arg("--backoff", 2.0)),
+    }
+    if get_arg("--role-order"):
+        args["role_order"] = get_arg("--role-order").split(",")
+    return args
+
+
 def topology_config():
     # Configure all devices in parallel using candidate configs.
+    # --push-mode diff only sends changed blocks, --baseline golden diffs against the latest golden
+    # config instead of fetching each device's running config
+    push_mode = get_arg("--push-mode", "full")
+    baseline = get_arg("--baseline", "running")
     devices = parse_devices_from_csv()
     creds = get_device_credentials()
+    roles = parse_device_roles()
     if not devices:
         print("No devices found to configure.")
         return
 
-    with cf.ThreadPoolExecutor(max_workers=4) as executor:
-        futures = []
-        for hostname, mgmt_ip in devices.items():
-            config_path = os.path.join(candidate_dir, f"{hostname}.txt")
-            if not os.path.exists(config_path):
-                print(f"No candidate config found for {hostname} ({config_path})")
-                continue
-            futures.append(executor.submit(Config, man_ip=mgmt_ip, config_file=config_path, username=creds[hostname]["username"], password=creds[hostname]["password"]))
+    jobs = []
+    for hostname, mgmt_ip in devices.items():
+        config_path = os.path.join(candidate_dir, f"{hostname}.txt")
+        if not os.path.exists(config_path):
+            print(f"No candidate config found for {hostname} ({config_path})")
+            continue
+        baseline_file = latest_golden(hostname) if push_mode == "diff" and baseline == "golden" else None
+        jobs.append({"hostname": hostname, **roles.get(hostname, {}), "func": Config,
+                     "kwargs": {"man_ip": mgmt_ip, "config_file": config_path, "username": creds[hostname]["username"], "password": creds[hostname]["password"], "push_mode": push_mode, "baseline_file": baseline_file}})
 
-        for future in cf.as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                print(f"Thread execution error: {e}")
+    report = scheduler.run_jobs(jobs, **scheduler_args())
+    scheduler.print_report(report)
+    return report
 
 
 def rollback_config():
-    # Rolls back each device to the most recent golden configuration file.
+    # Rolls back each device to the most recent golden configuration, or with
+    # --timestamp 2025-10-13_22-30-00 (or a date) to the one each device had at that time
+    timestamp = get_arg("--timestamp")
+    if timestamp:
+        try:
+            timestamp = config_store.normalize_timestamp(timestamp)
+        except ValueError as e:
+            print(e)
+            return
     devices = parse_devices_from_csv()
     creds = get_device_credentials()
+    roles = parse_device_roles()
     if not devices:
         print("No devices found for rollback")
         return
 
-    with cf.ThreadPoolExecutor(max_workers=4) as executor:
-        futures = []
-        for hostname, mgmt_ip in devices.items():
-            rollback_matches = glob.glob(os.path.join(golden_dir, f"{hostname}_*.txt"))
-            if not rollback_matches:
-                print(f"No rollback file found for {hostname}")
-                continue
+    jobs = []
+    for hostname, mgmt_ip in devices.items():
+        rollback_file = latest_golden(hostname, timestamp)
+        if not rollback_file:
+            print(f"No golden config found for {hostname}" + (f" at {timestamp}" if timestamp else ""))
+            continue
+        print(f"Rolling back {hostname} to {os.path.basename(rollback_file)}")
+        jobs.append({"hostname": hostname, **roles.get(hostname, {}), "func": Config,
+                     "kwargs": {"man_ip": mgmt_ip, "config_file": rollback_file, "username": creds[hostname]["username"], "password": creds[hostname]["password"]}})
+
+    report = scheduler.run_jobs(jobs, **scheduler_args())
+    scheduler.print_report(report)
+    return report
+
+
+# Sha256 of the running config computed on the device, so an unchanged device costs 64 characters
+# instead of its whole config. The "! Time:" line some EOS versions print is left out
+running_digest_command = "bash timeout 10 FastCli -p 15 -c 'show running-config' | grep -v '^! Time:' | sha256sum"
+# {hostname: {"digest": device side sha256, "hash": config_hash of that config}} from the last sweep
+drift_cache_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/drift_cache.json"
+
+
+def running_digest(net_connect):
+    # None when the device can't run the bash command, the caller then reads the whole config
+    match = re.search(r"\b[0-9a-f]{64}\b", net_connect.send_command(running_digest_command))
+    return match.group(0) if match else None
+
+
+# Only the hash of each running config is kept. The device side digest is checked first and the full
+# show running-config is only transferred when it differs from the last sweep's: the golden hashes are
+# of the normalized config, which only the parsed text gives, so a changed device still sends it once
+def fetch_config_hash(man_ip, username, password, hostname, results, cache):
+    login = {"device_type": "arista_eos", "host": man_ip, "username": username, "password": password}
+    with ConnectHandler(**login) as net_connect:
+        net_connect.enable()
+        digest = running_digest(net_connect)
+        known = cache.get(hostname)
+        if digest and known and known["digest"] == digest:
+            results[hostname] = known["hash"]
+            return
+        results[hostname] = eos_config.config_hash(net_connect.send_command("show running-config"))
+        # Only remember the pair if nothing changed while the config was being read
+        if digest and running_digest(net_connect) == digest:
+            cache[hostname] = {"digest": digest, "hash": results[hostname]}
+        else:
+            cache.pop(hostname, None)
+
+
+def load_drift_cache(path=drift_cache_file):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Ignoring unreadable drift cache {path}: {e}")
+        return {}
+
+
+def save_drift_cache(cache, path=drift_cache_file):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def drift_check():
+    # Compares every device's running config with its latest golden config by normalized hash.
+    # Reports in-sync/drifted devices, with --remediate the drifted devices (and nothing else) are put
+    # back to their golden config, extra lines included
+    devices = parse_devices_from_csv()
+    creds = get_device_credentials()
+    roles = parse_device_roles()
+    store = config_store.seeded_store(directory=golden_dir)
+    if not devices:
+        print("No devices found to check")
+        return
 
-            rollback_file = max(rollback_matches, key=os.path.getmtime)
-            futures.append(executor.submit(Config, man_ip=mgmt_ip, config_file=rollback_file, username=creds[hostname]["username"], password=creds[hostname]["password"]))
-        for future in cf.as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                print(f"Rollback error: {e}")
+    golden = {hostname: store.latest(hostname) for hostname in devices}
+    # Hash of the normalized golden text, identical golden configs are only parsed once
+    golden_hashes = {}
+    for entry in golden.values():
+        if entry and entry["sha"] not in golden_hashes:
+            golden_hashes[entry["sha"]] = eos_config.config_hash(store.get(entry["sha"]))
+
+    hashes = {}
+    cache = load_drift_cache()
+    jobs = [{"hostname": hostname, **roles.get(hostname, {}), "func": fetch_config_hash,
+             "kwargs": {"man_ip": mgmt_ip, "username": creds[hostname]["username"], "password": creds[hostname]["password"],
+                        "hostname": hostname, "results": hashes, "cache": cache}}
+            for hostname, mgmt_ip in devices.items() if golden[hostname]]
+    # Same staging, limits and retries as a push, so --role-limit/--site-limit/--role-order apply here too
+    options = scheduler_args()
+    fetched = {entry["hostname"]: entry for entry in scheduler.run_jobs(jobs, **options)}
+    save_drift_cache(cache)
+
+    report = []
+    for hostname in sorted(devices):
+        entry = {"hostname": hostname, "golden": golden[hostname]["timestamp"] if golden[hostname] else "", "status": "", "error": ""}
+        if not golden[hostname]:
+            entry["status"] = "no-golden"
+        elif fetched[hostname]["status"] != "ok":
+            entry["status"] = "failed"
+            entry["error"] = fetched[hostname]["error"]
+        elif hashes[hostname] == golden_hashes[golden[hostname]["sha"]]:
+            entry["status"] = "in-sync"
+        else:
+            entry["status"] = "drifted"
+        report.append(entry)
+
+    print(f"{'Device':<12}{'Golden':<22}{'Status':<10}")
+    for entry in report:
+        print(f"{entry['hostname']:<12}{entry['golden']:<22}{entry['status']:<10}{entry['error']}")
+    drifted = [entry["hostname"] for entry in report if entry["status"] == "drifted"]
+    print(f"{len(drifted)} of {len(report)} devices drifted from their golden config" + (f": {', '.join(drifted)}" if drifted else ""))
+
+    if "--remediate" in sys.argv and drifted:
+        print(f"Restoring the golden config on {len(drifted)} drifted devices")
+        push_jobs = [{"hostname": hostname, **roles.get(hostname, {}), "func": Config,
+                      "kwargs": {"man_ip": devices[hostname], "config_file": store.checkout(hostname), "username": creds[hostname]["username"],
+                                 "password": creds[hostname]["password"], "push_mode": "restore"}}
+                     for hostname in drifted]
+        scheduler.print_report(scheduler.run_jobs(push_jobs, **options))
+    return report
 
 
 def get_device_credentials():
     # Reads credentials for each device from requirements.csv
     creds = {}
     try:
-        with open(requirements, newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                hostname = row.get("hostname", "").strip()
-                username = row.get("username", "").strip()
-                password = row.get("password", "").strip()
-                if hostname and username and password:
-                    creds[hostname] = {"username": username, "password": password}
+        creds = inventory_store.get_store(requirements).credentials()
     except Exception as e:
         print(f"Error reading credentials: {e}")
     return creds
 
 
 
+# value that follows a command line flag, e.g. get_arg("--push-mode", "full")
+def get_arg(flag, default=None):
+    if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(flag) + 1]
+    return default
+
+
 # main function 
 def main():
-    if "--action" in sys.argv:
-        action = sys.argv[sys.argv.index("--action") + 1]
-        actions = {"rollback_config": rollback_config, "topology_config": topology_config}
+    action = sys.argv[sys.argv.index("--action") + 1] if "--action" in sys.argv else None
+    # Anything built from requirements.csv is only rendered/pushed once the address plan checks out,
+    # a rollback or drift check works from the golden configs so it doesn't depend on the csv addresses
+    if action not in ("rollback_config", "drift_check") and "--skip-validation" not in sys.argv:
+        if not address_plan.check_plan(requirements):
+            sys.exit(1)
+    if action:
+        actions = {"rollback_config": rollback_config, "topology_config": topology_config, "generate_configs": generate_configs,
+                   "drift_check": drift_check}
         if action in actions:
             print(f"Running action: {action}")
             actions[action]()
     else:
-        mk_playbook_files()
-        mk_play_run()
+        generate_configs()
         topology_config()
 
 
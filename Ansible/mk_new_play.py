@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
-import csv
 import yaml
+import inventory_store
 
 # Input/Output
 input_csv_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
 inventory_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/inventory.yml"
 
+# libyaml's dumper writes the same YAML as the pure python one, just much faster on big inventories
+Dumper = getattr(yaml, "CDumper", yaml.Dumper)
+
 def normalize_value(val):
     if val is None:
         return None
@@ -19,89 +22,102 @@ def normalize_value(val):
 def build_inventory(input_csv_file, inventory_file):
     # Create a minimal inventory with hostnames per device type
     inventory = {"all": {"children": {}}}
-    with open(input_csv_file, newline='') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            hostname = row["hostname"].strip()
-            device_type = row["device_type"].strip().lower()
-            if not hostname:
-                continue
-            if device_type not in inventory["all"]["children"]:
-                inventory["all"]["children"][device_type] = {"hosts": {}}
-            inventory["all"]["children"][device_type]["hosts"][hostname] = ""
+    for device_type, hostnames in inventory_store.get_store(input_csv_file).device_types().items():
+        inventory["all"]["children"][device_type] = {"hosts": {hostname: "" for hostname in hostnames}}
     with open(inventory_file, "w") as outfile:
         yaml.dump(inventory, outfile, sort_keys=False)
     print(f"Converted {input_csv_file} --> {inventory_file}")
 
 
-def yaml_file_creator(input_csv):
+# Routing fields copied from a device's first csv row
+routing_fields = [
+    "rip_enabled","rip_networks","router_id","ospf_process",
+    "bgp_asn","bgp_router_id","bgp_neighbors_ipv4","bgp_networks_ipv4",
+    "bgp_neighbors_ipv6","bgp_networks_ipv6","bgp_redistribute_ospf",
+    "bgp_redistribute_ospfv3","ospf_router_id",
+    "ospf_default_info","ospf_redistribute_bgp",
+    "static_ipv4_network","static_ipv4_nexthop",
+    "static_ipv6_network","static_ipv6_nexthop"
+]
+
+
+def new_device(row, hostname, device_type):
+    device = {
+        "device_type": device_type,
+        "hostname": hostname,
+        "username": row.get("username"),
+        "password": row.get("password"),
+        "vlan_list": row["vlan_list"].split(",") if row.get("vlan_list") else [],
+        "interfaces": [],
+        "routing": {}
+    }
+    device["routing"] = {k: normalize_value(row[k]) for k in routing_fields if row.get(k)}
+    rip_networks_str = row.get("rip_networks", "")
+    bgp_networks_v6 = row.get("bgp_networks_ipv6", "")
+    bgp_networks_v4 = row.get("bgp_networks_ipv4", "")
+    if rip_networks_str:
+        device["routing"]["rip_networks"] = rip_networks_str.split(";")
+    if bgp_networks_v6:
+        device["routing"]["bgp_networks_ipv6"] = bgp_networks_v6.split(";")
+    if bgp_networks_v4:
+        device["routing"]["bgp_networks_ipv4"] = bgp_networks_v4.split(";")
+    return device
+
+
+def new_interface(row):
+    iface = {
+        "name": row.get("intf_name"),
+        "description": row.get("intf_desc") or None,
+        "mode": row.get("intf_switchport_mode") or None,
+        "access_vlan": row.get("intf_access_vlan") or None,
+        "no_switchport": True if row.get("intf_no_switchport") == "TRUE" else False,
+        "encapsulation": row.get("intf_encapsulation") or None,
+        "ipv4": row.get("intf_ipv4") or None,
+        "ipv6": row.get("intf_ipv6") or None,
+        "ospf_area": row.get("intf_ospf_area") or None,
+    }
+    # Remove empty keys
+    return {k: v for k, v in iface.items() if v not in [None, "", "FALSE"]}
+
+
+# Groups the csv rows into the per device type data the role templates expect
+# hostnames (optional) restricts the result to just those devices
+# Single pass over the rows, each device is found through a hostname index instead of a list scan
+def build_devices(input_csv, hostnames=None):
     devices = {"router": [], "edge_router": [], "switch": []}
-    with open(input_csv, newline='') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            hostname = row["hostname"].strip()
-            if not hostname:
-                continue
-            device_type = row["device_type"].strip().lower()
-            if device_type not in devices:
-                continue
-            # Check if device already exists
-            existing = next((d for d in devices[device_type] if d["hostname"] == hostname), None)
-            if not existing:
-                # Initialize device
-                existing = {
-                    "device_type": device_type,
-                    "hostname": hostname,
-                    "username": row.get("username"),
-                    "password": row.get("password"),
-                    "vlan_list": row["vlan_list"].split(",") if row.get("vlan_list") else [],
-                    "interfaces": [],
-                    "routing": {}
-                }
-                # Routing fields
-                routing_fields = [
-                    "rip_enabled","rip_networks","router_id","ospf_process",
-                    "bgp_asn","bgp_router_id","bgp_neighbors_ipv4","bgp_networks_ipv4",
-                    "bgp_neighbors_ipv6","bgp_networks_ipv6","bgp_redistribute_ospf",
-                    "bgp_redistribute_ospfv3","ospf_router_id",
-                    "ospf_default_info","ospf_redistribute_bgp",
-                    "static_ipv4_network","static_ipv4_nexthop",
-                    "static_ipv6_network","static_ipv6_nexthop"
-                ]
-                existing["routing"] = {k: normalize_value(row[k]) for k in routing_fields if row.get(k)}
-                rip_networks_str = row.get("rip_networks", "")
-                bgp_networks_v6 = row.get("bgp_networks_ipv6", "")
-                bgp_networks_v4 = row.get("bgp_networks_ipv4", "")
-                if rip_networks_str:
-                    existing["routing"]["rip_networks"] = rip_networks_str.split(";")
-                if bgp_networks_v6:
-                    existing["routing"]["bgp_networks_ipv6"] = bgp_networks_v6.split(";")
-                if bgp_networks_v4:
-                    existing["routing"]["bgp_networks_ipv4"] = bgp_networks_v4.split(";")
-                devices[device_type].append(existing)
-            # Interfaces
-            if row.get("intf_name"):
-                iface = {
-                    "name": row.get("intf_name"),
-                    "description": row.get("intf_desc") or None,
-                    "mode": row.get("intf_switchport_mode") or None,
-                    "access_vlan": row.get("intf_access_vlan") or None,
-                    "no_switchport": True if row.get("intf_no_switchport") == "TRUE" else False,
-                    "encapsulation": row.get("intf_encapsulation") or None,
-                    "ipv4": row.get("intf_ipv4") or None,
-                    "ipv6": row.get("intf_ipv6") or None,
-                    "ospf_area": row.get("intf_ospf_area") or None,
-                }
-                # Remove empty keys
-                iface = {k: v for k, v in iface.items() if v not in [None, "", "FALSE"]}
-                existing["interfaces"].append(iface)
+    index = {}  # (device_type, hostname) -> device
+    if hostnames is not None:
+        hostnames = set(hostnames)
+    for row in inventory_store.get_store(input_csv).rows():
+        hostname = row["hostname"].strip()
+        if not hostname:
+            continue
+        if hostnames is not None and hostname not in hostnames:
+            continue
+        device_type = row["device_type"].strip().lower()
+        if device_type not in devices:
+            continue
+        existing = index.get((device_type, hostname))
+        if not existing:
+            existing = new_device(row, hostname, device_type)
+            index[(device_type, hostname)] = existing
+            devices[device_type].append(existing)
+        # Interfaces
+        if row.get("intf_name"):
+            existing["interfaces"].append(new_interface(row))
+    return devices
+
+
+# hostnames (optional) restricts the vars files to just those devices
+def yaml_file_creator(input_csv, hostnames=None):
+    devices = build_devices(input_csv, hostnames)
 
     # Dump YAML per device type
     for dtype, dlist in devices.items():
         if dlist:
             filename = f"/home/student/CSCI5840-Advanced-Network-Automation/Ansible/roles/{dtype}/vars/{dtype}.yml"
             with open(filename, "w") as yamlfile:
-                yaml.dump({"devices": dlist}, yamlfile, sort_keys=False)
+                yaml.dump({"devices": dlist}, yamlfile, Dumper=Dumper, sort_keys=False)
             print(f"Converted {input_csv} --> {dtype}.yml")
 
 
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import mk_new_play
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+# Renders the role templates in-process instead of going through ansible-playbook.
+# The jinja settings mirror what the ansible template module uses so the candidate
+# configs come out byte for byte the same as the playbook run
+input_csv_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+roles_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/roles"
+candidate_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs"
+
+# Compiled templates per role, reloaded only when the .j2 file changes on disk
+_templates = {}
+_environments = {}
+
+
+def _environment(roles):
+    # ansible: trim_blocks on, lstrip_blocks off, undefined variables are an error, None renders as ''
+    if roles not in _environments:
+        _environments[roles] = Environment(
+            loader=FileSystemLoader(roles),
+            trim_blocks=True,
+            lstrip_blocks=False,
+            keep_trailing_newline=False,
+            undefined=StrictUndefined,
+            finalize=lambda value: "" if value is None else value,
+            auto_reload=False,
+        )
+    return _environments[roles]
+
+
+def get_template(role, roles=roles_dir):
+    path = os.path.join(roles, role, "templates", f"{role}.j2")
+    mtime = os.stat(path).st_mtime_ns
+    cached = _templates.get((roles, role))
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    with open(path) as file:
+        source = file.read()
+    template = _environment(roles).from_string(source)
+    _templates[(roles, role)] = (mtime, template, source)
+    return template, source
+
+
+def _count_trailing_newlines(text):
+    return len(text) - len(text.rstrip("\n"))
+
+
+def render_device(device, roles=roles_dir):
+    # Same as the playbook: the template sees the device as `item`, and any trailing
+    # newlines jinja drops from the end of the template are added back like ansible does
+    template, source = get_template(device["device_type"], roles)
+    output = template.render(item=device)
+    missing = _count_trailing_newlines(source) - _count_trailing_newlines(output)
+    if missing > 0:
+        output += "\n" * missing
+    return output
+
+
+def render_candidates(input_csv=input_csv_file, hostnames=None, output_dir=candidate_dir, roles=roles_dir):
+    # Renders candidate configs straight from requirements.csv, returns {hostname: "changed"|"ok"|error}
+    # Files are only rewritten when the rendered text differs from what is on disk
+    devices = mk_new_play.build_devices(input_csv, hostnames)
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    for dlist in devices.values():
+        for device in dlist:
+            hostname = device["hostname"]
+            try:
+                output = render_device(device, roles)
+                path = os.path.join(output_dir, f"{hostname}.txt")
+                current = None
+                if os.path.exists(path):
+                    with open(path, newline="") as file:
+                        current = file.read()
+                if current == output:
+                    results[hostname] = "ok"
+                else:
+                    with open(path, "w", newline="") as file:
+                        file.write(output)
+                    results[hostname] = "changed"
+            except Exception as e:
+                results[hostname] = f"failed: {e}"
+                print(f"Failed to render {hostname}: {e}")
+    return results
+
+
+def main():
+    hostnames = sys.argv[1:] or None
+    start = time.perf_counter()
+    results = render_candidates(hostnames=hostnames)
+    elapsed = (time.perf_counter() - start) * 1000
+    for hostname, status in results.items():
+        print(f"{hostname}: {status}")
+    print(f"Rendered {len(results)} devices in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
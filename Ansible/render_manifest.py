@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+import inventory_store
+
+# Keeps a content hash per device (its requirements.csv rows + the hash of its role template)
+# so config generation only re-renders the devices that actually changed
+input_csv_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+roles_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/roles"
+candidate_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs"
+manifest_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/render_manifest.json"
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def template_hashes(roles=roles_dir):
+    # {role: hash of roles/<role>/templates/<role>.j2}
+    hashes = {}
+    for role in sorted(os.listdir(roles)):
+        template = os.path.join(roles, role, "templates", f"{role}.j2")
+        if os.path.exists(template):
+            with open(template, "rb") as file:
+                hashes[role] = sha256(file.read())
+    return hashes
+
+
+def device_hashes(input_csv=input_csv_file, roles=roles_dir):
+    # {hostname: hash of the device's csv rows (in file order) and its role template}
+    store = inventory_store.get_store(input_csv)
+    templates = template_hashes(roles)
+    hashes = {}
+    for hostname in store.hostnames():
+        rows = store.device_rows(hostname)
+        device_type = (rows[0].get("device_type") or "").strip().lower()
+        content = json.dumps({"rows": rows, "template": templates.get(device_type, "")}, sort_keys=True)
+        hashes[hostname] = sha256(content.encode())
+    return hashes
+
+
+def load_manifest(manifest=manifest_file):
+    if not os.path.exists(manifest):
+        return {}
+    try:
+        with open(manifest) as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {manifest}: {e}")
+        return {}
+
+
+def save_manifest(hashes, manifest=manifest_file):
+    tmp_file = f"{manifest}.tmp"
+    with open(tmp_file, "w") as file:
+        json.dump(hashes, file, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest)
+
+
+def changed_devices(input_csv=input_csv_file, manifest=manifest_file, candidates=candidate_dir, roles=roles_dir):
+    # Returns (changed hostnames, current hashes). A device counts as changed when its hash
+    # differs from the last successful render or its candidate file is missing
+    hashes = device_hashes(input_csv, roles)
+    previous = load_manifest(manifest)
+    changed = []
+    for hostname, digest in hashes.items():
+        candidate = os.path.join(candidates, f"{hostname}.txt")
+        if previous.get(hostname) != digest or not os.path.exists(candidate):
+            changed.append(hostname)
+    return changed, hashes
+
+
+def main():
+    changed, hashes = changed_devices()
+    print(f"{len(changed)} of {len(hashes)} devices need new candidate configs: {', '.join(changed)}")
+
+
+if __name__ == "__main__":
+    main()
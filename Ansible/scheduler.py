@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import time
+import random
+import threading
+import concurrent.futures as cf
+from netmiko.exceptions import NetmikoTimeoutException, ReadTimeout
+
+# Runs one job per device for bulk pushes. Jobs run in role stages (switches first, then
+# routers, then edge routers) so the access layer is up before the routing layer changes,
+# with a global worker limit plus optional per role and per site limits. Transient SSH
+# failures are retried with exponential backoff and every device gets a timing entry.
+#
+# A job is a dict: {"hostname": "R1", "role": "router", "site": "default", "func": Config, "kwargs": {...}}
+
+default_role_order = ["switch", "router", "edge_router"]
+
+# Errors worth retrying, authentication failures and config errors are not
+transient_errors = (NetmikoTimeoutException, ReadTimeout, OSError, EOFError)
+
+
+def parse_limits(value):
+    # "switch=2,router=4" -> {"switch": 2, "router": 4}
+    limits = {}
+    if value:
+        for item in value.split(","):
+            name, limit = item.split("=")
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+def order_stages(jobs, role_order=default_role_order):
+    # Groups jobs by role in the given order, roles not in the list run last in their own stages
+    stages = {}
+    for job in jobs:
+        stages.setdefault(job.get("role", ""), []).append(job)
+    ordered = [role for role in role_order if role in stages]
+    ordered += sorted(role for role in stages if role not in role_order)
+    return [(role, stages[role]) for role in ordered]
+
+
+def run_job(job, limits, retries, backoff):
+    entry = {"hostname": job["hostname"], "role": job.get("role", ""), "site": job.get("site", ""),
+             "status": "ok", "attempts": 0, "seconds": 0.0, "error": ""}
+    # Hold a slot in every limit that applies to this device while it runs
+    semaphores = [s for s in (limits["role"].get(entry["role"]), limits["site"].get(entry["site"])) if s]
+    for semaphore in semaphores:
+        semaphore.acquire()
+    start = time.monotonic()
+    try:
+        while True:
+            entry["attempts"] += 1
+            try:
+                job["func"](**job.get("kwargs", {}))
+                break
+            except transient_errors as e:
+                if entry["attempts"] > retries:
+                    entry["status"] = "failed"
+                    entry["error"] = str(e)
+                    break
+                delay = backoff * 2 ** (entry["attempts"] - 1) + random.uniform(0, backoff)
+                print(f"{job['hostname']}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                break
+    finally:
+        for semaphore in reversed(semaphores):
+            semaphore.release()
+    entry["seconds"] = round(time.monotonic() - start, 2)
+    return entry
+
+
+def run_jobs(jobs, max_workers=None, role_limits=None, site_limits=None, role_order=default_role_order, retries=2, backoff=2.0):
+    # Returns a list of per device results: hostname, role, site, status, attempts, seconds, error
+    if not jobs:
+        return []
+    # With no explicit limit every device in a stage gets its own worker, capped to keep the ssh load sane
+    max_workers = max_workers or min(64, len(jobs))
+    limits = {
+        "role": {name: threading.Semaphore(n) for name, n in (role_limits or {}).items()},
+        "site": {name: threading.Semaphore(n) for name, n in (site_limits or {}).items()},
+    }
+
+    report = []
+    for role, stage_jobs in order_stages(jobs, role_order):
+        print(f"Stage {role or 'unknown'}: {len(stage_jobs)} devices")
+        with cf.ThreadPoolExecutor(max_workers=min(max_workers, len(stage_jobs))) as executor:
+            futures = [executor.submit(run_job, job, limits, retries, backoff) for job in stage_jobs]
+            for future in cf.as_completed(futures):
+                entry = future.result()
+                report.append(entry)
+                if entry["status"] == "ok":
+                    print(f"{entry['hostname']} done in {entry['seconds']}s")
+                else:
+                    print(f"{entry['hostname']} failed after {entry['attempts']} attempts: {entry['error']}")
+    return report
+
+
+def print_report(report):
+    print(f"{'Device':<12}{'Role':<14}{'Site':<12}{'Status':<8}{'Tries':<7}{'Seconds':<8}")
+    for entry in sorted(report, key=lambda e: e["hostname"]):
+        print(f"{entry['hostname']:<12}{entry['role']:<14}{entry['site']:<12}{entry['status']:<8}{entry['attempts']:<7}{entry['seconds']:<8}")
+    failed = [entry["hostname"] for entry in report if entry["status"] != "ok"]
+    print(f"{len(report) - len(failed)} of {len(report)} devices succeeded")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
@@ -1,11 +1,46 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort, Response
 import subprocess
+import json
 import functions
+import jobs
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "key"
 
 config_gen_script = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/main.py"
+unit_test_script = "/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd/unit_test_v2.py"
+
+# Devices shown in the health check form before anything is typed in its search box
+device_page_size = 50
+
+# Background workers for the slow actions so one user's backup doesn't block everyone else
+job_queue = jobs.JobQueue(max_workers=2)
+
+
+# Job bodies, each gets the Job as its first argument
+# Each output line becomes a progress message as soon as the script prints it, nothing is buffered.
+# A nonzero exit code fails the job
+def run_script_job(job, command):
+    job.report(f"Running {' '.join(command)}")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        job.report(line.rstrip())
+    returncode = process.wait()
+    job.report(f"Finished with exit code {returncode}")
+    if returncode != 0:
+        raise jobs.JobFailed(f"{' '.join(command)} exited with code {returncode}")
+    return returncode
+
+
+def golden_configs_job(job, workers):
+    job.report(f"Collecting golden configs with {workers} workers")
+    return functions.get_golden_configs(max_workers=workers, progress=job.report)
+
+
+# Looks up the ?job= argument, None if missing or already evicted
+def requested_job():
+    job_id = request.args.get("job")
+    return job_queue.get(job_id) if job_id else None
 
 @app.route("/")
 def index():
@@ -21,22 +56,38 @@ def chronograf():
 
 @app.route('/get_golden_configs')
 def get_golden_configs():
-    saved_files, timestamp = functions.get_golden_configs()
-    return render_template('golden_configs.html', files=saved_files, timestamp=timestamp)
+    # Only a plain visit starts a backup, an old ?job= link must not log in to every device again
+    if "job" not in request.args:
+        workers = request.args.get("workers", 20, type=int)
+        job = job_queue.submit("Golden config backup", golden_configs_job, workers)
+        return redirect(url_for("get_golden_configs", job=job.id))
+    job = requested_job()
+    if job is None:
+        return render_template("job_expired.html", name="Golden config backup", restart=url_for("get_golden_configs")), 404
+    if job.status != "done":
+        return render_template("job.html", job=job)
+    saved_files, timestamp, report = job.result
+    return render_template('golden_configs.html', files=saved_files, timestamp=timestamp, report=report)
 
 @app.route("/configure", methods=["GET", "POST"])
 def configure():
     if request.method == "POST":
         form_data = functions.clean_form_data(request.form)
         operation = form_data.get("operation", "update")
-        functions.write_to_csv(form_data, operation)
         try:
-            subprocess.run(["python3", config_gen_script])
-            flash("Configuration saved and templates generated", "success")
+            functions.write_to_csv(form_data, operation)
+            # Full config push unless the diff push was ticked
+            command = ["python3", "-u", config_gen_script]
+            if request.form.get("push_diff"):
+                command += ["--push-mode", "diff"]
+            job = job_queue.submit("Config generation and push", run_script_job, command)
+            flash("Configuration saved, templates are being generated and pushed", "success")
+            return redirect(url_for("configure", job=job.id))
+        except ValueError as e:
+            flash(str(e), "danger")
         except:
             flash("Something went wrong", "danger")
-    return render_template("configure.html")
-
+    return render_template("configure.html", job=requested_job())
 
 @app.route("/run_test", methods=["GET", "POST"])
 def run_test():
@@ -44,43 +95,163 @@ def run_test():
         device_name = request.form["device"]
         test_type = request.form["test_type"]
         param = request.form.get("param", "")
-        device = functions.get_device_ip(device_name)
+        # Identical checks within the last 30 seconds are answered from the cache unless "fresh" is ticked
+        output, age = functions.health_check(device_name, test_type, param, fresh=bool(request.form.get("fresh")))
+        return render_template("test_results.html", output=output, age=age)
 
-        if test_type == "connectivity":
-            output = functions.connectivity_check(device_name, device, param)
-        elif test_type == "bgp":
-            output = functions.bgp_neighbors(device_name, device)
-        elif test_type == "route":
-            output = functions.route_finder(device_name, device, param)
-        else:
-            output = "Unknown test selected."
+    # First page of devices from the inventory, the form's search box asks /api/devices for the rest
+    devices, total = functions.search_devices(limit=device_page_size)
+    return render_template("test_form.html", devices=devices, total=total, filters=functions.get_device_filters())
 
-        return render_template("test_results.html", output=output)
 
-    # Get form info for device selection
-    devices = ["R1", "R2", "R3", "R4", "S1", "S2", "S3", "S4"]
-    return render_template("test_form.html", devices=devices)
+# Device list for search as you type, e.g. /api/devices?q=r1&type=router&site=denver&limit=50
+@app.route("/api/devices")
+def api_devices():
+    limit = min(max(request.args.get("limit", device_page_size, type=int), 1), 500)
+    devices, total = functions.search_devices(request.args.get("q", ""), request.args.get("type", ""),
+                                              request.args.get("site", ""), limit)
+    return jsonify({"devices": devices, "total": total})
 
 @app.route("/unit_tests", methods=["GET", "POST"])
 def unit_tests():
     """
     Run unit tests and display documentation about how they work.
     """
-    coverage_output = ""
     if request.method == "POST":
-        # Execute the unit_test.py script and capture its stdout
+        # Execute the unit_test.py script in the background and capture its stdout
+        job = job_queue.submit("Unit tests", run_script_job, ["python3", "-u", unit_test_script])
+        flash("Unit tests started.", "success")
+        return redirect(url_for("unit_tests", job=job.id))
+
+    job = requested_job()
+    coverage_output = "\n".join(job.progress) if job and job.done else ""
+    return render_template("unit_tests.html", coverage_output=coverage_output, job=job)
+
+
+# BGP neighbors across the fleet as JSON, ?state=down for sessions that aren't established,
+# ?refresh=1 to skip the cache
+@app.route("/api/bgp")
+def api_bgp():
+    max_age = 0 if request.args.get("refresh") else None
+    sweep = functions.bgp_sweep(max_age=max_age)
+    if request.args.get("state") == "down":
+        neighbors = [n.to_dict() for n in functions.bgp_down_sessions(sweep)]
+    else:
+        neighbors = [n.to_dict() for found in sweep.values() if isinstance(found, list) for n in found]
+    errors = {hostname: found for hostname, found in sweep.items() if not isinstance(found, list)}
+    return jsonify({"neighbors": neighbors, "errors": errors})
+
+
+# Which devices route an address or prefix and how, e.g. /api/routes?target=10.10.4.0/24,
+# answered from the route index. ?hosts=R1,R2 limits the devices, ?refresh=1 has the background
+# refresher re-check the tables now and waits up to functions.route_refresh_wait seconds for it
+@app.route("/api/routes")
+def api_routes():
+    target = request.args.get("target", "")
+    hosts = request.args.get("hosts")
+    refreshed = functions.request_route_refresh() if request.args.get("refresh") else None
+    try:
+        found = functions.route_lookup(target, hosts.split(",") if hosts else None, request.args.get("vrf", "default"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # complete is false while the first fleet-wide read is still running and some devices are missing
+    # refreshed is false when ?refresh=1 timed out and the answer comes from the previous tables
+    return jsonify({"target": target, "routes": [r.to_dict() for r in found], "errors": functions.route_errors,
+                    "complete": functions.route_index_ready.is_set(), "refreshed": refreshed})
+
+
+# Ping matrix between devices, sources down the side and targets across the top.
+# Targets are device names (their loopback) or addresses, blank means every loopback
+@app.route("/reachability", methods=["GET", "POST"])
+def reachability_matrix():
+    devices = functions.get_all_devices()
+    sources = request.form.getlist("sources") or devices
+    target_text = request.form.get("targets", "")
+    matrix = {}
+    summary = None
+    targets = []
+    if request.method == "POST":
         try:
-            result = subprocess.run(
-                ["python3", "/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd/unit_test_v2.py"],
-                capture_output=True, text=True
-            )
-            coverage_output = result.stdout
-            flash("Unit tests executed successfully.", "success")
-        except Exception as e:
-            coverage_output = f"Error running unit tests: {e}"
-            flash("Error executing tests.", "danger")
-
-    return render_template("unit_tests.html", coverage_output=coverage_output)
+            targets = functions.parse_targets(target_text)
+            matrix = functions.reachability_matrix(sources, targets)
+            summary = functions.reachability.summarize(matrix)
+        except ValueError as e:
+            flash(str(e), "danger")
+    return render_template("reachability.html", devices=devices, sources=sources, target_text=target_text,
+                           targets=[label for label, _ in targets], matrix=matrix, summary=summary)
+
+
+# Same as JSON, e.g. /api/reachability?sources=R1,R2&targets=R3,10.10.4.1
+@app.route("/api/reachability")
+def api_reachability():
+    sources = request.args.get("sources")
+    try:
+        targets = functions.parse_targets(request.args.get("targets", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    matrix = functions.reachability_matrix(sources.split(",") if sources else None, targets)
+    return jsonify({
+        "results": {source: {target: r.to_dict() for target, r in row.items()} for source, row in matrix.items()},
+        "summary": functions.reachability.summarize(matrix),
+    })
+
+
+# Fleet diff between two config sources, e.g. /config_diff?old=golden@2025-10-13&new=candidate
+@app.route("/config_diff")
+def config_diff():
+    old = request.args.get("old", "golden")
+    new = request.args.get("new", "candidate")
+    try:
+        results = functions.get_config_diffs(old, new)
+    except ValueError as e:
+        flash(str(e), "danger")
+        results = []
+    return render_template("config_diff.html", results=results, old=old, new=new)
+
+
+# Trap counts from the trap monitor (Scripts/Monitoring/capture.py)
+@app.route("/traps")
+def traps():
+    return render_template("traps.html", counts=functions.get_trap_counts())
+
+@app.route("/api/traps")
+def api_traps():
+    return jsonify(functions.get_trap_counts())
+
+
+# Job status for the polling pages
+@app.route("/jobs")
+def job_list():
+    return jsonify([job.to_dict(include_result=False) for job in job_queue.list()])
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+# Server-Sent Events: one "data" event per progress message starting at ?since=, then a "done" event
+@app.route("/jobs/<job_id>/stream")
+def job_stream(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    since = request.args.get("since", 0, type=int)
+
+    def events(index):
+        while True:
+            finished = job.done
+            messages, index = job.progress_since(index)
+            for message in messages:
+                yield f"data: {json.dumps(message)}\n\n"
+            if finished:
+                yield f"event: done\ndata: {json.dumps(job.status)}\n\n"
+                return
+            if not messages:
+                job.wait(index)
+
+    return Response(events(since), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import re
+import json
+import time
+import threading
+from dataclasses import dataclass, asdict
+
+# Structured BGP neighbor state read from "show ip bgp summary | json" (plain text output as a
+# fallback), cached per device for a short time so repeated portal queries don't log in again
+
+
+@dataclass(frozen=True)
+class BgpNeighbor:
+    hostname: str
+    vrf: str
+    peer: str
+    asn: str
+    state: str
+    up_down: str            # how long the session has been in its current state
+    prefixes_received: int
+    prefixes_accepted: int
+
+    @property
+    def established(self):
+        return self.state.lower().startswith("estab")
+
+    def to_dict(self):
+        info = asdict(self)
+        info["established"] = self.established
+        return info
+
+
+def format_duration(seconds):
+    seconds = int(max(seconds, 0))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{days}d{hours:02d}h" if days else f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def parse_bgp_json(hostname, data, now=None):
+    # {"vrfs": {"default": {"peers": {"10.10.3.2": {"peerState", "asn", "upDownTime", "prefixReceived", ...}}}}}
+    # upDownTime is the epoch time of the last state change
+    now = time.time() if now is None else now
+    neighbors = []
+    for vrf, vrf_data in (data.get("vrfs") or {}).items():
+        for peer, info in (vrf_data.get("peers") or {}).items():
+            changed = info.get("upDownTime")
+            neighbors.append(BgpNeighbor(
+                hostname=hostname, vrf=vrf, peer=peer, asn=str(info.get("asn", "")),
+                state=info.get("peerState", ""),
+                up_down=format_duration(now - changed) if changed else "",
+                prefixes_received=int(info.get("prefixReceived") or 0),
+                prefixes_accepted=int(info.get("prefixAccepted") or 0),
+            ))
+    return neighbors
+
+
+vrf_pattern = re.compile(r"BGP summary information for VRF (\S+)")
+# Neighbor  V  AS  MsgRcvd  MsgSent  InQ  OutQ  Up/Down  State  [PfxRcd  PfxAcc]
+neighbor_pattern = re.compile(r"^\s*(?:[a-zA-Z]\s+)?([0-9a-fA-F.:]+)\s+\d+\s+(\S+)\s+\d+\s+\d+\s+\d+\s+\d+\s+(\S+)\s+(\S+)(?:\s+(\d+)\s+(\d+))?\s*$")
+
+
+def parse_bgp_text(hostname, output):
+    vrf = "default"
+    neighbors = []
+    for line in output.splitlines():
+        match = vrf_pattern.search(line)
+        if match:
+            vrf = match.group(1)
+            continue
+        match = neighbor_pattern.match(line)
+        if match and ("." in match.group(1) or ":" in match.group(1)):
+            peer, asn, up_down, state, received, accepted = match.groups()
+            neighbors.append(BgpNeighbor(hostname, vrf, peer, asn, state, up_down, int(received or 0), int(accepted or 0)))
+    return neighbors
+
+
+def read_neighbors(net_connect, hostname):
+    # JSON first, EOS versions or devices without it fall back to the text table
+    output = net_connect.send_command("show ip bgp summary | json")
+    try:
+        data = json.loads(output)
+        if isinstance(data, dict) and "vrfs" in data:
+            return parse_bgp_json(hostname, data)
+    except ValueError:
+        pass
+    return parse_bgp_text(hostname, net_connect.send_command("show ip bgp summary"))
+
+
+class NeighborCache:
+    # {hostname: (fetched at, neighbors)}. Requests for the same device while a fetch is running
+    # wait for that fetch instead of opening another session
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, hostname, fetch, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._entries.get(hostname)
+        if entry and time.monotonic() - entry[0] <= max_age:
+            return entry[1]
+        with self._lock:
+            device_lock = self._locks.setdefault(hostname, threading.Lock())
+        with device_lock:
+            entry = self._entries.get(hostname)
+            if entry and time.monotonic() - entry[0] <= max_age:
+                return entry[1]
+            neighbors = fetch()
+            self._entries[hostname] = (time.monotonic(), neighbors)
+            return neighbors
+
+    def invalidate(self, hostname=None):
+        with self._lock:
+            if hostname is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(hostname, None)
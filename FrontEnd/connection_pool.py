@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from contextlib import contextmanager
+from netmiko import ConnectHandler
+
+
+class PoolTimeoutError(Exception):
+    '''Raised when every session for a host stays busy longer than the wait timeout'''
+    pass
+
+
+# Keeps warm netmiko sessions per device so repeated health checks skip the
+# TCP + SSH handshake, auth and enable on every request
+class ConnectionPool:
+    def __init__(self, max_per_host=2, idle_timeout=300, keepalive=30, probe_interval=15, wait_timeout=30):
+        self.max_per_host = max_per_host      # max open sessions per device
+        self.idle_timeout = idle_timeout      # seconds an unused session is kept
+        self.keepalive = keepalive            # ssh keepalive interval sent by paramiko
+        self.probe_interval = probe_interval  # re-check a session with is_alive() if idle longer than this
+        self.wait_timeout = wait_timeout      # how long to wait for a busy host before giving up
+        self._idle = {}                       # key -> list of [connection, last_used]
+        self._open = {}                       # key -> number of sessions open (idle + in use)
+        self._cond = threading.Condition()
+        self._reaper = None
+
+    # Sessions are shared per host/user so different credentials never reuse each other's login
+    def _key(self, device):
+        return (device.get("host") or device.get("ip"), device.get("username"), device.get("device_type"))
+
+    def _connect(self, device):
+        connection = ConnectHandler(**device, keepalive=self.keepalive)
+        connection.enable()
+        return connection
+
+    def _close(self, connection):
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+
+    def _start_reaper(self):
+        # Background thread so idle sessions get closed even when the portal is quiet
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(max(self.probe_interval, 1))
+            self.evict_idle()
+
+    def evict_idle(self):
+        # Closes any session that has sat unused longer than idle_timeout
+        expired = []
+        now = time.monotonic()
+        with self._cond:
+            for key, sessions in self._idle.items():
+                for session in list(sessions):
+                    if now - session[1] > self.idle_timeout:
+                        sessions.remove(session)
+                        self._open[key] -= 1
+                        expired.append(session[0])
+            if expired:
+                self._cond.notify_all()
+        for connection in expired:
+            self._close(connection)
+        return len(expired)
+
+    def _acquire(self, device):
+        key = self._key(device)
+        deadline = time.monotonic() + self.wait_timeout
+        self._start_reaper()
+        while True:
+            with self._cond:
+                sessions = self._idle.setdefault(key, [])
+                self._open.setdefault(key, 0)
+                if sessions:
+                    connection, last_used = sessions.pop()
+                elif self._open[key] < self.max_per_host:
+                    self._open[key] += 1
+                    connection, last_used = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"No free session for {key[0]} after {self.wait_timeout}s")
+                    self._cond.wait(remaining)
+                    continue
+
+            # Opening and probing happen outside the lock so one slow device doesn't block the rest
+            if connection is None:
+                try:
+                    return self._connect(device)
+                except Exception:
+                    self._discard(key)
+                    raise
+
+            if time.monotonic() - last_used < self.probe_interval:
+                return connection
+            try:
+                if connection.is_alive():
+                    return connection
+            except Exception:
+                pass
+            # Stale session, drop it and loop around to grab or open another one
+            self._close(connection)
+            self._discard(key)
+
+    def _release(self, device, connection):
+        key = self._key(device)
+        with self._cond:
+            self._idle.setdefault(key, []).append([connection, time.monotonic()])
+            self._cond.notify()
+
+    def _discard(self, key):
+        with self._cond:
+            self._open[key] -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, device):
+        # Usage: with pool.connection(device) as net_connect: net_connect.send_command(...)
+        connection = self._acquire(device)
+        try:
+            yield connection
+        except Exception:
+            # The session may be half way through a command, never hand it to the next caller
+            self._close(connection)
+            self._discard(self._key(device))
+            raise
+        else:
+            self._release(device, connection)
+
+    def close_all(self):
+        with self._cond:
+            sessions = [s for host_sessions in self._idle.values() for s in host_sessions]
+            for key, host_sessions in self._idle.items():
+                self._open[key] -= len(host_sessions)
+                host_sessions.clear()
+            self._cond.notify_all()
+        for connection, _ in sessions:
+            self._close(connection)
+
+    def stats(self):
+        with self._cond:
+            return {key[0]: {"open": self._open.get(key, 0), "idle": len(sessions)} for key, sessions in self._idle.items()}
@@ -1,32 +1,43 @@
 import csv
 import os
-import re
+import json
 import sys
 import pytz
-import subprocess
+import time
+import connection_pool
+import bgp_state
+import route_index
+import reachability
+import result_cache
+import ipaddress
+import threading
+import concurrent.futures as cf
 from datetime import datetime
 from netmiko import ConnectHandler
+sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Ansible")
+import inventory_store
+import address_plan
+import config_store
+import fleet_diff
 
 
 requirements = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+trap_snapshot = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/trap_counts.json"
+
+# requirements.csv is parsed once and cached, it's only re-read after the file changes
+inventory = inventory_store.get_store(requirements)
 
 # Define headers once so writer knows the correct fields
 def get_fieldnames():
-    if os.path.exists(requirements):
-        with open(requirements, "r", newline="") as file:
-            data = csv.DictReader(file)
-            fieldnames = data.fieldnames
-            return fieldnames
+    return inventory.fieldnames()
 
 fieldnames = get_fieldnames()
 
 # Read requirements.csv for configuration and template generation functions
 def read_csv():
     """Read CSV into list of dictionaries"""
-    if not os.path.exists(requirements):
-        return []
-    with open(requirements, "r", newline="") as file:
-        return list(csv.DictReader(file))
+    # rows() hands out copies, callers are free to change them
+    return inventory.rows()
 
 
 def write_csv(rows):
@@ -35,6 +46,7 @@ def write_csv(rows):
         writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(rows)
+    inventory.invalidate()
 
 
 def form_to_rows(form_data):
@@ -120,6 +132,10 @@ def write_to_csv(form_data, operation):
     existing = read_csv()
     new_rows = form_to_rows(form_data)
     merged = merge_rows(existing, new_rows, operation)
+    # Rejected before it's saved, so a bad address never reaches the render/push job
+    problems = address_plan.errors(address_plan.validate_rows(merged))
+    if problems:
+        raise ValueError("Address plan errors: " + "; ".join(f"{p['hostname']}: {p['message']}" for p in problems))
     write_csv(merged)
 
 
@@ -144,50 +160,242 @@ def clean_form_data(raw_form):
 
 
 # Health check portal functions
-def connectivity_check(hostname, man_ip, target_ip):
+# All health checks borrow a warm SSH session from the shared pool instead of logging in every time
+pool = connection_pool.ConnectionPool()
+
+def device_params(hostname, man_ip):
     creds = get_device_credentials()
-    router = {
+    return {
         "device_type": "arista_eos",
-        "ip": f"{man_ip}",
+        "host": f"{man_ip}",
         "username": creds[hostname]["username"],
         "password": creds[hostname]["password"],
     }
+
+def connectivity_check(hostname, man_ip, target_ip):
     try:
-        with ConnectHandler(**router) as net_connect:
-            net_connect.enable()
+        with pool.connection(device_params(hostname, man_ip)) as net_connect:
             output = net_connect.send_command(f"ping {target_ip}")
             return output
     except Exception as e:
         return f"Error: {e}"
 
+# Loopback address of each device from the inventory: {hostname: "10.0.0.1"}
+def get_loopbacks():
+    loopbacks = {}
+    for row in inventory.rows():
+        if (row.get("intf_name") or "").lower().startswith("loopback") and row.get("intf_ipv4"):
+            loopbacks.setdefault(row["hostname"], row["intf_ipv4"].split("/")[0])
+    return loopbacks
+
+# "R1, 10.10.4.1" -> [("R1", "<R1 loopback>"), ("10.10.4.1", "10.10.4.1")], empty means every loopback.
+# Anything that isn't a device with a loopback or an IP address raises ValueError
+def parse_targets(text):
+    loopbacks = get_loopbacks()
+    targets = []
+    for item in (t.strip() for t in (text or "").replace("\n", ",").split(",")):
+        if not item:
+            continue
+        if item in loopbacks:
+            targets.append((item, loopbacks[item]))
+            continue
+        try:
+            targets.append((item, str(ipaddress.ip_address(item))))
+        except ValueError:
+            raise ValueError(f"'{item}' isn't a device with a loopback or an IP address")
+    return targets or list(loopbacks.items())
+
+# Pings every target from every source at once, each source pings its targets over one pooled session.
+# Returns {source: {target label: PingResult}}, sources and targets default to every device / loopback
+def reachability_matrix(sources=None, targets=None, count=2, timeout=1, max_workers=20):
+    management = get_devices()
+    sources = sources or list(management)
+    targets = targets if targets is not None else list(get_loopbacks().items())
+
+    def run(source):
+        if source not in management:
+            return [reachability.PingResult(source, label, address, error="not in inventory") for label, address in targets]
+        try:
+            with pool.connection(device_params(source, management[source])) as net_connect:
+                return reachability.ping_targets(net_connect, source, targets, count, timeout)
+        except Exception as e:
+            return [reachability.PingResult(source, label, address, error=f"Error: {e}") for label, address in targets]
+
+    matrix = {}
+    if sources and targets:
+        with cf.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as executor:
+            for source, results in zip(sources, executor.map(run, sources)):
+                matrix[source] = {result.target: result for result in results}
+    return matrix
+
+# BGP neighbor records per device, reused for bgp_cache.ttl seconds
+bgp_cache = bgp_state.NeighborCache(ttl=30)
+
+def get_bgp_neighbors(hostname, man_ip, max_age=None):
+    def fetch():
+        with pool.connection(device_params(hostname, man_ip)) as net_connect:
+            return bgp_state.read_neighbors(net_connect, hostname)
+    return bgp_cache.get(hostname, fetch, max_age)
+
 def bgp_neighbors(hostname, man_ip):
-    creds = get_device_credentials()
-    router = {
-        "device_type": "arista_eos",
-        "ip": f"{man_ip}",
-        "username": creds[hostname]["username"],
-        "password": creds[hostname]["password"],
-    }
     try:
-        with ConnectHandler(**router) as net_connect:
-            output = net_connect.send_command("show ip bgp summ")
-            if not output:
-                return f"no bgp configuration found"
-            neighbors = re.findall(r"(\d+\.\d+\.\d+\.\d+)", output)
-            return(f"BGP neighbors: {neighbors[1:]}")
+        neighbors = get_bgp_neighbors(hostname, man_ip)
+        if not neighbors:
+            return f"no bgp configuration found"
+        lines = [f"{'Neighbor':<40}{'VRF':<10}{'AS':<10}{'State':<14}{'Up/Down':<12}{'PfxRcd':<8}{'PfxAcc':<8}"]
+        for n in neighbors:
+            lines.append(f"{n.peer:<40}{n.vrf:<10}{n.asn:<10}{n.state:<14}{n.up_down:<12}{n.prefixes_received:<8}{n.prefixes_accepted:<8}")
+        return "\n".join(lines)
     except Exception as e:
         return f"Error: {e}"
 
+# Every device's BGP neighbors at once: {hostname: [BgpNeighbor] or "Error: ..."}.
+# max_age=0 forces a fresh read, otherwise cached records are used while they're young enough
+def bgp_sweep(max_workers=20, max_age=None):
+    targets = get_devices()
+    results = {}
+    with cf.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as executor:
+        futures = {executor.submit(get_bgp_neighbors, hostname, ip, max_age): hostname for hostname, ip in targets.items()}
+        for future in cf.as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = f"Error: {e}"
+    return dict(sorted(results.items()))
+
+# Sessions that aren't established anywhere in the fleet, from a bgp_sweep() result
+def bgp_down_sessions(sweep):
+    down = []
+    for hostname, neighbors in sweep.items():
+        if isinstance(neighbors, list):
+            down += [n for n in neighbors if not n.established]
+    return down
+
+# Every device's routing table, refreshed in the background every route_refresh_interval seconds.
+# Each device is asked for a digest of its table first and the table is only read when that changed
+routes = route_index.RouteIndex()
+route_refresh_interval = 60
+route_refresh_wait = 10                 # seconds /api/routes?refresh=1 waits for the refresher
+route_errors = {}
+route_digests = {}                      # hostname -> device side digest of the indexed table
+route_index_ready = threading.Event()   # set once the first full refresh has finished
+_route_refresher = None
+_route_refresher_lock = threading.Lock()
+_route_refresh_requested = threading.Event()
+_route_refresh_done = threading.Condition()
+_route_refreshes = {"started": 0, "finished": 0}
+
+def fetch_routes(hostname, man_ip, known_digest=None):
+    # (digest, [Route]), the routes are None when the digest still matches known_digest.
+    # The digest is taken before the read, so a table changing in between is read again next time
+    with pool.connection(device_params(hostname, man_ip)) as net_connect:
+        digest = route_index.table_digest(net_connect)
+        if digest and digest == known_digest:
+            return digest, None
+        return digest, route_index.read_routes(net_connect, hostname)
+
+# Reads every device's table (or just hostnames') concurrently, unchanged tables aren't downloaded and
+# only tables that changed are re-indexed.
+# Returns {"changed": [hostnames], "errors": {hostname: "Error: ..."}}, a failed device keeps its last table
+def refresh_route_index(max_workers=20, hostnames=None):
+    targets = get_devices()
+    if hostnames is not None:
+        targets = {hostname: ip for hostname, ip in targets.items() if hostname in hostnames}
+    indexed = set(routes.hostnames())
+    changed = []
+    errors = {}
+    if targets:
+        with cf.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as executor:
+            futures = {executor.submit(fetch_routes, hostname, ip, route_digests.get(hostname) if hostname in indexed else None): hostname
+                       for hostname, ip in targets.items()}
+            for future in cf.as_completed(futures):
+                hostname = futures[future]
+                try:
+                    digest, found = future.result()
+                    if found is None:
+                        routes.touch(hostname)
+                    elif routes.update(hostname, found):
+                        changed.append(hostname)
+                    route_digests[hostname] = digest
+                    route_errors.pop(hostname, None)
+                except Exception as e:
+                    errors[hostname] = f"Error: {e}"
+    if hostnames is None:
+        # Devices removed from the inventory
+        for hostname in routes.hostnames():
+            if hostname not in targets:
+                routes.drop(hostname)
+                route_errors.pop(hostname, None)
+                route_digests.pop(hostname, None)
+    route_errors.update(errors)
+    return {"changed": sorted(changed), "errors": dict(sorted(errors.items()))}
+
+def _refresh_routes_forever(interval):
+    while True:
+        # Cleared with the count under the lock, so a request either counts this refresh or sets it again
+        with _route_refresh_done:
+            _route_refreshes["started"] += 1
+            _route_refresh_requested.clear()
+        try:
+            refresh_route_index()
+        except Exception as e:
+            print(f"Route index refresh failed: {e}")
+        route_index_ready.set()
+        with _route_refresh_done:
+            _route_refreshes["finished"] += 1
+            _route_refresh_done.notify_all()
+        _route_refresh_requested.wait(interval)
+
+# Starts the background refresh on first use, the first full read happens on that thread too
+def start_route_refresh(interval=route_refresh_interval):
+    global _route_refresher
+    with _route_refresher_lock:
+        if _route_refresher is None:
+            _route_refresher = threading.Thread(target=_refresh_routes_forever, args=(interval,), daemon=True)
+            _route_refresher.start()
+
+# Has the background refresher start a refresh now instead of at its next interval and waits up to
+# timeout seconds for it. Returns False if it didn't finish in time, the index then still has the
+# previous tables and the refresh carries on in the background
+def request_route_refresh(timeout=route_refresh_wait):
+    start_route_refresh()
+    with _route_refresh_done:
+        # A refresh already running may have read some devices before this request, wait for the next one
+        wanted = _route_refreshes["started"] + 1
+        _route_refresh_requested.set()
+        return _route_refresh_done.wait_for(lambda: _route_refreshes["finished"] >= wanted, timeout)
+
+# Longest prefix match for an address or prefix on every device (or just hostnames): [Route].
+# Until the first full refresh is done, requested devices that aren't indexed yet are read on their own
+def route_lookup(target, hostnames=None, vrf="default"):
+    start_route_refresh()
+    if hostnames is not None and not route_index_ready.is_set():
+        missing = [hostname for hostname in hostnames if hostname not in routes.hostnames()]
+        if missing:
+            refresh_route_index(hostnames=missing)
+    return routes.lookup(target, vrf, hostnames)
+
+def format_routes(found):
+    lines = [f"{'Device':<10}{'VRF':<10}{'Prefix':<20}{'Protocol':<16}Next hops"]
+    for r in found:
+        hops = ", ".join(f"via {address}, {interface}" if address else f"directly connected, {interface}" for address, interface in r.next_hops)
+        lines.append(f"{r.hostname:<10}{r.vrf:<10}{r.prefix:<20}{r.protocol:<16}{hops}")
+    return "\n".join(lines)
+
 def route_finder(hostname, man_ip, search_term):
-    creds = get_device_credentials()
-    router = {
-        "device_type": "arista_eos",
-        "ip": f"{man_ip}",
-        "username": creds[hostname]["username"],
-        "password": creds[hostname]["password"],
-    }
     try:
-        with ConnectHandler(**router) as net_connect:
+        # Addresses and prefixes are answered from the index, anything else is still grepped on the device
+        try:
+            found = route_lookup(search_term, [hostname]) if search_term else None
+        except ValueError:
+            found = None
+        if found is not None:
+            if found:
+                return format_routes(found)
+            if hostname in route_errors:
+                return route_errors[hostname]
+            return f"No route to {search_term} on {hostname}"
+        with pool.connection(device_params(hostname, man_ip)) as net_connect:
             if search_term:
                 output = net_connect.send_command(f"show ip route | inc {search_term}")
             else:
@@ -196,100 +404,202 @@ def route_finder(hostname, man_ip, search_term):
     except Exception as e:
         return f"Error: {e}"
 
+# /run_test results shared between operators for 30 seconds, errors are never kept
+health_cache = result_cache.ResultCache(ttl=30, max_entries=256, cacheable=lambda output: not str(output).startswith("Error"))
+
+def run_check(hostname, man_ip, test_type, param):
+    if test_type == "connectivity":
+        return connectivity_check(hostname, man_ip, param)
+    if test_type == "bgp":
+        return bgp_neighbors(hostname, man_ip)
+    if test_type == "route":
+        return route_finder(hostname, man_ip, param)
+    return "Unknown test selected."
+
+# Returns (output, seconds since it was read from the device). fresh=True skips a cached result
+def health_check(hostname, test_type, param="", fresh=False):
+    param = (param or "").strip()
+    if test_type == "bgp":
+        param = ""
+    man_ip = get_device_ip(hostname)
+    return health_cache.get((hostname, test_type, param), lambda: run_check(hostname, man_ip, test_type, param), bypass=fresh)
+
 # Device selection for health check portal
 def get_devices():
     # Reads hostname/mgmt IP for each device from requirements.csv
-    devices = {}
     try:
-        with open(requirements, newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                hostname = row.get("hostname", "").strip()
-                management_ip = row.get("management_ip", "").strip()
-                if hostname and management_ip:
-                    devices[hostname] = management_ip
+        return inventory.management_ips()
     except Exception as e:
         print(f"Error reading management info: {e}")
-    return devices
-devices = get_devices()
+        return {}
 
+# Both read the inventory on every call, it's only re-parsed after requirements.csv changes
 def get_all_devices():
-    return list(devices.keys())
+    return list(get_devices().keys())
 
 def get_device_ip(name):
-    return devices.get(name)
-    
-
-def get_golden_configs():
-    # Pulls 'golden' configs from all managed devices via SSH using Netmiko
+    return inventory.management_ip(name)
+
+# Devices for the portal's pickers, filtered by type, site and a case insensitive hostname/IP search.
+# Returns (first limit matches, total number of matches)
+def search_devices(query="", device_type="", site="", limit=50):
+    query = (query or "").strip().lower()
+    device_type = (device_type or "").strip().lower()
+    site = (site or "").strip().lower()
+    matches = [d for d in inventory.devices()
+               if d["management_ip"]
+               and (not device_type or d["device_type"] == device_type)
+               and (not site or d["site"].lower() == site)
+               and (not query or query in d["hostname"].lower() or d["management_ip"].startswith(query))]
+    return matches[:limit], len(matches)
+
+def get_device_filters():
+    # {"types": [...], "sites": [...]} for the filter dropdowns
+    found = [d for d in inventory.devices() if d["management_ip"]]
+    return {"types": sorted({d["device_type"] for d in found if d["device_type"]}),
+            "sites": sorted({d["site"] for d in found if d["site"]})}
+
+
+# Logs in to one device and returns the output of a show command, used by the fleet collectors
+def fetch_command(hostname, ip, creds, command="show run", timeout=60):
+    device = {
+        "device_type": "arista_eos",
+        "host": ip,
+        "username": creds[hostname]["username"],
+        "password": creds[hostname]["password"],
+        "conn_timeout": timeout,
+    }
+    connection = ConnectHandler(**device)
+    try:
+        connection.enable()
+        return connection.send_command(command, read_timeout=timeout)
+    finally:
+        connection.disconnect()
+
+
+def collect_configs(device_list, creds, command="show run", max_workers=20, timeout=60, on_result=None):
+    # Runs a show command on every device in parallel, so the total time follows the slowest
+    # device instead of the sum of all of them. Returns a per-device report:
+    # {hostname: {"ip", "status", "output", "error", "seconds"}}
+    report = {}
+    if not device_list:
+        return report
+
+    def worker(hostname, ip):
+        start = time.monotonic()
+        try:
+            output = fetch_command(hostname, ip, creds, command, timeout)
+            return {"ip": ip, "status": "ok", "output": output, "error": "", "seconds": round(time.monotonic() - start, 2)}
+        except Exception as e:
+            return {"ip": ip, "status": "failed", "output": "", "error": str(e), "seconds": round(time.monotonic() - start, 2)}
+
+    with cf.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(device_list)))) as executor:
+        futures = {executor.submit(worker, hostname, ip): hostname for hostname, ip in device_list.items()}
+        for future in cf.as_completed(futures):
+            hostname = futures[future]
+            report[hostname] = future.result()
+            if on_result:
+                on_result(hostname, report[hostname])
+    return report
+
+
+# progress (optional) is called with a message as each device finishes
+def get_golden_configs(max_workers=20, timeout=60, progress=print):
+    # Pulls 'golden' configs from all managed devices via SSH using Netmiko.
+    # Every config goes into the content addressed store, golden_configs/ only keeps a plain text
+    # copy of each device's newest one
     save_path = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/golden_configs/"
-    archive_path = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/config_archive/"
     creds = get_device_credentials()
+    store = config_store.get_store()
     os.makedirs(save_path, exist_ok=True)
-    os.makedirs(archive_path, exist_ok=True)
-    subprocess.run(f"mv {save_path}* {archive_path}", shell=True)
-    
+    # Whatever is still in golden_configs is archived first, already stored content costs nothing
+    previous = config_store.golden_files(save_path)
+    store.import_files(previous)
+
     mountain_tz = pytz.timezone("America/Denver")
     timestamp = datetime.now(mountain_tz).strftime("%Y-%m-%d_%H-%M-%S")
 
+    devices = get_devices()
     saved_files = []
-    
-    for hostname, ip in devices.items():
-        device = {
-            "device_type": "arista_eos",
-            "host": ip,
-            "username": creds[hostname]["username"],
-            "password": creds[hostname]["password"],
-        }
-
-        try:
-            print(f"Connecting to {hostname} ({ip})...")
-            connection = ConnectHandler(**device)
-            connection.enable()
-            config_output = connection.send_command("show run")
-            connection.disconnect()
+    report = []
 
+    # Write each file as soon as its device answers
+    def save_result(hostname, result):
+        entry = {"hostname": hostname, "ip": result["ip"], "status": result["status"], "file": "", "sha": "", "error": result["error"], "seconds": result["seconds"]}
+        if result["status"] == "ok":
             filename = f"{hostname}_golden_config_{timestamp}.txt"
             filepath = os.path.join(save_path, filename)
+            try:
+                entry["sha"] = store.put(hostname, result["output"], timestamp, save=False)
+                with open(filepath, "w") as file:
+                    file.write(result["output"])
+                for old_file in previous:
+                    match = config_store.golden_file_pattern.search(os.path.basename(old_file))
+                    if match.group("hostname") == hostname and old_file != filepath:
+                        os.remove(old_file)
+                saved_files.append(filename)
+                entry["file"] = filename
+                progress(f"Saved config from {hostname} ({result['seconds']}s)")
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+        if entry["status"] != "ok":
+            progress(f"Failed to get config from {hostname}: {entry['error']}")
+        report.append(entry)
+
+    progress(f"Collecting configs from {len(devices)} devices with {max_workers} workers")
+    collect_configs(devices, creds, "show run", max_workers, timeout, on_result=save_result)
+    store.save()
+
+    saved_files.sort()
+    report.sort(key=lambda entry: entry["hostname"])
+    return saved_files, timestamp, report
+
+
+# Trap counts written by Scripts/Monitoring/capture.py, empty until the trap monitor has run
+def get_trap_counts(path=trap_snapshot):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Error reading trap counts: {e}")
+        return {"generated": None, "window": 0, "received": 0, "duplicates": 0, "errors": 0, "traps": []}
 
-            with open(filepath, "w") as file:
-                file.write(config_output)
-
-            saved_files.append(filename)
-
-        except Exception as e:
-            print(f"Failed to get config from {hostname}: {e}")
 
-    return saved_files, timestamp
+# Section level diff of every device between two config sources (see fleet_diff.load_config)
+def get_config_diffs(old_source="golden", new_source="candidate"):
+    return fleet_diff.diff_fleet(inventory.hostnames(), old_source, new_source)
 
 
 def get_device_credentials():
     # Reads credentials for each device from requirements.csv
-    creds = {}
     try:
-        with open(requirements, newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                hostname = row.get("hostname", "").strip()
-                username = row.get("username", "").strip()
-                password = row.get("password", "").strip()
-                if hostname and username and password:
-                    creds[hostname] = {"username": username, "password": password}
+        return inventory.credentials()
     except Exception as e:
         print(f"Error reading credentials: {e}")
-    return creds
+        return {}
+
+
+# Optional --workers and --timeout flags for the fleet collection
+def collection_args():
+    args = {}
+    if "--workers" in sys.argv:
+        args["max_workers"] = int(sys.argv[sys.argv.index("--workers") + 1])
+    if "--timeout" in sys.argv:
+        args["timeout"] = int(sys.argv[sys.argv.index("--timeout") + 1])
+    return args
 
 
 # main function 
 def main():
     if "--action" in sys.argv:
         action = sys.argv[sys.argv.index("--action") + 1]
-        actions = {"get_golden_configs": get_golden_configs}
+        actions = {"get_golden_configs": lambda: get_golden_configs(**collection_args()), "import_archive": config_store.import_archive}
         if action in actions:
             print(f"Running action: {action}")
             actions[action]()
     else:
-        get_golden_configs()
+        get_golden_configs(**collection_args())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import time
+import uuid
+import itertools
+import collections
+import threading
+import traceback
+import concurrent.futures as cf
+
+
+class JobFailed(Exception):
+    '''Raised by a job body for an expected failure, recorded as the job's error without a traceback'''
+    pass
+
+
+# Long running portal actions (config generation, golden config backups, unit tests) run here
+# in the background so the request returns straight away and the page polls for the result
+class Job:
+    def __init__(self, name, max_progress=5000):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.status = "queued"      # queued -> running -> done | failed
+        # Only the newest progress messages are kept so a chatty job can't grow without bound,
+        # progress_count is the total ever reported so streams can resume where they left off
+        self._progress = collections.deque(maxlen=max_progress)
+        self.progress_count = 0
+        self.result = None
+        self.error = ""
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Condition()
+
+    def report(self, message):
+        # Called from inside the job to record progress
+        with self._lock:
+            self._progress.append(message)
+            self.progress_count += 1
+            self._lock.notify_all()
+
+    @property
+    def progress(self):
+        with self._lock:
+            return list(self._progress)
+
+    def progress_since(self, index):
+        # Returns (messages reported from index on that are still kept, index to ask for next time)
+        with self._lock:
+            first = self.progress_count - len(self._progress)
+            start = max(index, first)
+            return list(itertools.islice(self._progress, start - first, None)), self.progress_count
+
+    def progress_snapshot(self):
+        # (kept messages, progress_count, done) read together, so a page that shows the messages and
+        # then streams from progress_count neither repeats nor skips a message reported in between
+        with self._lock:
+            return list(self._progress), self.progress_count, self.done
+
+    def wait(self, index, timeout=1.0):
+        # Blocks until there is progress past index or the job finishes, used by the event stream
+        with self._lock:
+            self._lock.wait_for(lambda: self.progress_count > index or self.done, timeout)
+
+    def _finish(self, status):
+        with self._lock:
+            self.status = status
+            self.finished = time.time()
+            self._lock.notify_all()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self, include_result=True):
+        messages, count, _ = self.progress_snapshot()
+        info = {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "progress": messages,
+            "progress_count": count,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if include_result:
+            info["result"] = self.result
+        return info
+
+
+class JobQueue:
+    def __init__(self, max_workers=2, max_jobs=50, retention=3600):
+        self.max_jobs = max_jobs        # finished jobs kept at most
+        self.retention = retention      # seconds a finished job is kept
+        self._executor = cf.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, *args, **kwargs):
+        # func is called as func(job, *args, **kwargs), its return value becomes job.result
+        job = Job(name)
+        with self._lock:
+            self._evict(room=1)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job._finish("done")
+        except JobFailed as e:
+            job.error = str(e)
+            job._finish("failed")
+        except Exception as e:
+            job.error = f"{e}\n{traceback.format_exc()}"
+            job._finish("failed")
+
+    def _evict(self, room=0):
+        # Drops expired finished jobs, then the oldest finished ones until there is room for new ones
+        now = time.time()
+        finished = sorted((j for j in self._jobs.values() if j.done), key=lambda j: j.finished)
+        for job in finished:
+            if now - job.finished > self.retention or len(self._jobs) + room > self.max_jobs:
+                del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            self._evict()
+            return sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
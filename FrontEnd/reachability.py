@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import re
+from dataclasses import dataclass, asdict
+
+# Ping results between devices, one PingResult per (source device, target) pair.
+# All of a source's targets are pinged over the same SSH session
+
+
+@dataclass(frozen=True)
+class PingResult:
+    source: str
+    target: str             # label shown in the matrix, the hostname for loopbacks
+    address: str
+    sent: int = 0
+    received: int = 0
+    loss: float = 100.0     # percent
+    rtt_min: float = None   # ms
+    rtt_avg: float = None
+    rtt_max: float = None
+    error: str = ""
+
+    @property
+    def reachable(self):
+        return not self.error and self.received > 0
+
+    @property
+    def status(self):
+        if self.error:
+            return "error"
+        if self.received == 0:
+            return "unreachable"
+        return "reachable" if self.received == self.sent else "partial"
+
+    def to_dict(self):
+        info = asdict(self)
+        info["status"] = self.status
+        return info
+
+
+# 5 packets transmitted, 5 received, 0% packet loss, time 4ms
+stats_pattern = re.compile(r"(\d+) packets transmitted, (\d+) (?:packets )?received,.*?([\d.]+)% packet loss")
+# rtt min/avg/max/mdev = 0.045/0.066/0.123/0.028 ms
+rtt_pattern = re.compile(r"min/avg/max\S* = ([\d.]+)/([\d.]+)/([\d.]+)")
+
+
+def parse_ping(source, target, address, output):
+    stats = stats_pattern.search(output)
+    if not stats:
+        # "% Invalid input", "ping: unknown host", "connect: Network is unreachable"
+        lines = [line.strip() for line in output.splitlines() if line.strip()]
+        return PingResult(source, target, address, error=lines[-1] if lines else "no output")
+    sent, received, loss = int(stats.group(1)), int(stats.group(2)), float(stats.group(3))
+    rtt = rtt_pattern.search(output)
+    if rtt:
+        return PingResult(source, target, address, sent, received, loss, *(float(v) for v in rtt.groups()))
+    return PingResult(source, target, address, sent, received, loss)
+
+
+def ping_command(address, count=2, timeout=1):
+    return f"ping {address} repeat {count} timeout {timeout}"
+
+
+def ping_targets(net_connect, source, targets, count=2, timeout=1):
+    # targets is [(label, address)], pinged one after another on the open session
+    results = []
+    for label, address in targets:
+        try:
+            output = net_connect.send_command(ping_command(address, count, timeout), read_timeout=count * (timeout + 1) + 10)
+        except Exception as e:
+            results.append(PingResult(source, label, address, error=str(e)))
+            continue
+        results.append(parse_ping(source, label, address, output))
+    return results
+
+
+def summarize(matrix):
+    # {"pairs", "reachable", "partial", "unreachable", "error"} over {source: {target: PingResult}}
+    summary = {"pairs": 0, "reachable": 0, "partial": 0, "unreachable": 0, "error": 0}
+    for row in matrix.values():
+        for result in row.values():
+            summary["pairs"] += 1
+            summary[result.status] += 1
+    return summary
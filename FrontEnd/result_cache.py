@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+import collections
+import concurrent.futures as cf
+
+# Short lived cache for health check results so operators asking the same question at the same
+# time (an incident) don't each log into the device. Entries expire after ttl seconds and the
+# least recently used ones are dropped past max_entries. Identical requests that arrive while
+# one is already running wait for it instead of sending the command again
+
+
+class ResultCache:
+    def __init__(self, ttl=30.0, max_entries=256, cacheable=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable or (lambda result: True)    # results failing this are shared but not kept
+        self._entries = collections.OrderedDict()              # key -> (stored at, result)
+        self._inflight = {}                                     # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, compute, bypass=False):
+        # Returns (result, age in seconds), age is 0 for a result computed by this call.
+        # bypass skips the stored result but still joins a call that's already running
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and not bypass:
+                age = time.monotonic() - entry[0]
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], age
+                del self._entries[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = cf.Future()
+                self._inflight[key] = future
+                self.misses += 1
+                owner = True
+        if not owner:
+            return future.result(), 0.0
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if self.cacheable(result):
+                self._entries[key] = (time.monotonic(), result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(result)
+        return result, 0.0
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import re
+import json
+import time
+import hashlib
+import threading
+import ipaddress
+from dataclasses import dataclass, asdict
+
+# In memory longest prefix match index over every device's routing table. All devices share one
+# binary trie per (vrf, ip version), each node holds {hostname: Route} for the prefixes ending
+# there, so a single walk down the trie answers a lookup for the whole fleet.
+# Tables are hashed when they're read and only the ones whose hash changed touch the trie
+
+
+@dataclass(frozen=True)
+class Route:
+    hostname: str
+    vrf: str
+    prefix: str
+    protocol: str
+    next_hops: tuple        # ((next hop address or "", interface), ...)
+
+    def to_dict(self):
+        info = asdict(self)
+        info["next_hops"] = [{"address": address, "interface": interface} for address, interface in self.next_hops]
+        return info
+
+
+def parse_routes_json(hostname, data):
+    # {"vrfs": {"default": {"routes": {"10.10.4.0/24": {"routeType", "vias": [{"nexthopAddr", "interface"}]}}}}}
+    routes = []
+    for vrf, vrf_data in (data.get("vrfs") or {}).items():
+        for prefix, info in (vrf_data.get("routes") or {}).items():
+            next_hops = tuple((via.get("nexthopAddr", ""), via.get("interface", "")) for via in info.get("vias") or [])
+            routes.append(Route(hostname, vrf, prefix, info.get("routeType", ""), next_hops))
+    return routes
+
+
+vrf_pattern = re.compile(r"^VRF:?\s+(\S+)")
+#  O E2     10.10.4.0/24 [110/20] via 10.10.3.2, Ethernet1
+#  C        10.10.3.0/28 is directly connected, Ethernet1
+route_pattern = re.compile(r"^\s*([A-Z][A-Za-z0-9]*(?: [A-Za-z0-9]+)*)\s+([0-9a-fA-F.:]+/\d+)\s+(.*)$")
+# ECMP paths continue on the next lines:                    via 10.10.3.6, Ethernet2
+via_pattern = re.compile(r"via ([0-9a-fA-F.:]+),\s*(\S+)")
+connected_pattern = re.compile(r"directly connected,\s*(\S+)")
+
+
+def parse_routes_text(hostname, output):
+    vrf = "default"
+    routes = []
+    current = None
+    for line in output.splitlines():
+        match = vrf_pattern.match(line)
+        if match:
+            vrf = match.group(1)
+            continue
+        match = route_pattern.match(line)
+        if match:
+            codes, prefix, rest = match.groups()
+            connected = connected_pattern.search(rest)
+            next_hops = [("", connected.group(1))] if connected else via_pattern.findall(rest)
+            current = [vrf, prefix, codes, next_hops]
+            routes.append(current)
+            continue
+        match = via_pattern.search(line)
+        if current and match and line.lstrip().startswith("via"):
+            current[3].append(match.groups())
+        else:
+            current = None
+    return [Route(hostname, vrf, prefix, codes, tuple(tuple(hop) for hop in next_hops)) for vrf, prefix, codes, next_hops in routes]
+
+
+# Sha256 of the table computed on the device, so checking an unchanged device transfers 64 characters
+# instead of the whole table
+digest_command = "bash timeout 10 FastCli -p 15 -c 'show ip route' | sha256sum"
+
+
+def table_digest(net_connect):
+    # None when the device can't run the bash command, the table is then always read in full
+    match = re.search(r"\b[0-9a-f]{64}\b", net_connect.send_command(digest_command))
+    return match.group(0) if match else None
+
+
+def read_routes(net_connect, hostname):
+    # JSON first, devices without it fall back to the text table
+    output = net_connect.send_command("show ip route | json")
+    try:
+        data = json.loads(output)
+        if isinstance(data, dict) and "vrfs" in data:
+            return parse_routes_json(hostname, data)
+    except ValueError:
+        pass
+    return parse_routes_text(hostname, net_connect.send_command("show ip route"))
+
+
+def table_hash(routes):
+    lines = sorted(f"{r.vrf} {r.prefix} {r.protocol} {r.next_hops}" for r in routes)
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def _key_bits(network):
+    # The network's prefix as an int of prefixlen bits, walked most significant bit first
+    return int(network.network_address) >> (network.max_prefixlen - network.prefixlen), network.prefixlen
+
+
+class RouteIndex:
+    def __init__(self):
+        self._roots = {}        # (vrf, version) -> [child 0, child 1, {hostname: Route} or None]
+        self._tables = {}       # hostname -> {"hash", "updated", "routes": {(vrf, network): Route}}
+        self._lock = threading.Lock()
+
+    def _insert(self, vrf, network, route):
+        node = self._roots.setdefault((vrf, network.version), [None, None, None])
+        bits, length = _key_bits(network)
+        for i in range(length - 1, -1, -1):
+            bit = (bits >> i) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            node[2] = {}
+        node[2][route.hostname] = route
+
+    def _remove(self, vrf, network, hostname):
+        node = self._roots.get((vrf, network.version))
+        path = []
+        bits, length = _key_bits(network)
+        for i in range(length - 1, -1, -1):
+            if node is None:
+                return
+            bit = (bits >> i) & 1
+            path.append((node, bit))
+            node = node[bit]
+        if node is None or not node[2]:
+            return
+        node[2].pop(hostname, None)
+        if not node[2]:
+            node[2] = None
+        # Drop the branch back up to the last node still in use
+        for parent, bit in reversed(path):
+            child = parent[bit]
+            if child[0] is None and child[1] is None and child[2] is None:
+                parent[bit] = None
+            else:
+                break
+
+    def update(self, hostname, routes):
+        # Replaces hostname's table, returns False without touching the trie when nothing changed
+        digest = table_hash(routes)
+        new = {}
+        for route in routes:
+            try:
+                new[(route.vrf, ipaddress.ip_network(route.prefix, strict=False))] = route
+            except ValueError:
+                continue
+        with self._lock:
+            table = self._tables.get(hostname)
+            if table and table["hash"] == digest:
+                table["updated"] = time.time()
+                return False
+            old = table["routes"] if table else {}
+            for key in old.keys() - new.keys():
+                self._remove(key[0], key[1], hostname)
+            for key, route in new.items():
+                if old.get(key) != route:
+                    self._insert(key[0], key[1], route)
+            self._tables[hostname] = {"hash": digest, "updated": time.time(), "routes": new}
+            return True
+
+    def touch(self, hostname):
+        # Marks hostname's table as checked without reading it again, False if it isn't indexed
+        with self._lock:
+            table = self._tables.get(hostname)
+            if table:
+                table["updated"] = time.time()
+            return table is not None
+
+    def drop(self, hostname):
+        with self._lock:
+            table = self._tables.pop(hostname, None)
+            for vrf, network in (table["routes"] if table else {}):
+                self._remove(vrf, network, hostname)
+
+    def hostnames(self):
+        with self._lock:
+            return sorted(self._tables)
+
+    def status(self):
+        # {hostname: {"routes", "updated", "hash"}}
+        with self._lock:
+            return {h: {"routes": len(t["routes"]), "updated": t["updated"], "hash": t["hash"]} for h, t in sorted(self._tables.items())}
+
+    def lookup(self, target, vrf="default", hostnames=None):
+        # Longest matching route on every device for an address or a prefix (the most specific
+        # route covering all of it), sorted by hostname. Raises ValueError for a bad target
+        network = ipaddress.ip_network(target.strip(), strict=False)
+        bits, length = _key_bits(network)
+        best = {}
+        with self._lock:
+            node = self._roots.get((vrf, network.version))
+            for i in range(length, -1, -1):
+                if node is None:
+                    break
+                if node[2]:
+                    best.update(node[2])
+                if i:
+                    node = node[(bits >> (i - 1)) & 1]
+        if hostnames is not None:
+            best = {h: r for h, r in best.items() if h in hostnames}
+        return [best[h] for h in sorted(best)]
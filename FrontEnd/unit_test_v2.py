@@ -3,9 +3,16 @@ import sys
 import os
 sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Ansible")
 sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd")
+sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring")
+sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Tools")
 
 import csv
+import asyncio
 import tempfile
+import time
+import threading
+import contextlib
+import struct
 import unittest
 import yaml
 import importlib.util
@@ -18,12 +25,40 @@ playbook_gen = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/mk_ne
 functions_file = "/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd/functions.py"
 config_gen = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/main.py"
 frontend = "/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd/app.py"
+eos_config_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/eos_config.py"
+candidate_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/candidate_configs"
+golden_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/golden_configs"
+monitoring_file = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/monitoring.py"
+render_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/render.py"
+requirements_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+roles_dir = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/roles"
+scheduler_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/scheduler.py"
+inventory_store_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/inventory_store.py"
+jobs_file = "/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd/jobs.py"
+capture_file = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/capture.py"
+trap_pcapng = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/packet_capture.pcap"
+validate_file = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Tools/validateIPv4.py"
+address_plan_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/address_plan.py"
+config_store_file = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/config_store.py"
+result_cache_file = "/home/student/CSCI5840-Advanced-Network-Automation/FrontEnd/result_cache.py"
 
 # Coverage counters
 mk_count = 0
 func_count = 0
 config_count = 0
 frontend_count = 0
+eos_count = 0
+monitoring_count = 0
+influx_count = 0
+render_count = 0
+scheduler_count = 0
+inventory_count = 0
+jobs_count = 0
+capture_count = 0
+validate_count = 0
+address_plan_count = 0
+config_store_count = 0
+result_cache_count = 0
 
 
 # Import all modules
@@ -37,6 +72,19 @@ mk_new_play = load_module("mk_new_play", playbook_gen)
 functions = load_module("functions", functions_file)
 config_gen_module = load_module("config_gen", config_gen)
 frontend_module = load_module("frontend", frontend)
+eos_config = load_module("eos_config", eos_config_file)
+monitoring = load_module("monitoring", monitoring_file)
+snmp_codec = monitoring.snmp_codec
+influx_writer = monitoring.influx_writer
+render = load_module("render", render_file)
+scheduler = load_module("scheduler", scheduler_file)
+inventory_store = load_module("inventory_store", inventory_store_file)
+jobs = load_module("jobs", jobs_file)
+capture = load_module("capture", capture_file)
+validateIPv4 = load_module("validateIPv4", validate_file)
+address_plan = load_module("address_plan", address_plan_file)
+config_store = load_module("config_store", config_store_file)
+result_cache = load_module("result_cache", result_cache_file)
 
 # =============================================================
 #                 Unit Tests for mk_new_play.py
@@ -228,6 +276,631 @@ class TestFrontend(unittest.TestCase):
         global frontend_count; frontend_count += 1
         self.assertTrue(callable(frontend_module.get_golden_configs))
 
+# =============================================================
+#                 Unit Tests for eos_config.py
+# =============================================================
+class TestEosConfig(unittest.TestCase):
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    # Builds R3's full delta against an empty device, the address-family ipv6 redistribute must
+    # be kept under its address-family and not merged into the router bgp one
+    def test_config_delta_keeps_address_family(self):
+        global eos_count; eos_count += 1
+        delta = eos_config.config_delta(self.read(f"{candidate_dir}/R3.txt"), "")
+        start = delta.index("   address-family ipv6")
+        self.assertIn("      redistribute ospfv3", delta[start:])
+        self.assertIn("   redistribute ospfv3", delta[:start])
+
+    # Diffs R3's golden config against its candidate, only the real differences should show up:
+    # no hidden "no shutdown", no address-family churn, no plain text vs hashed secret
+    def test_section_diff_golden_candidate(self):
+        global eos_count; eos_count += 1
+        golden = self.read(f"{golden_dir}/R3_golden_config_2025-10-20_16-20-24.txt")
+        candidate = self.read(f"{candidate_dir}/R3.txt")
+        sections = eos_config.section_diff(golden, candidate)
+        self.assertEqual({s["section"] for s in sections},
+                         {"router bgp 65030", "router ospf 10", "no aaa root",
+                          "transceiver qsfp default-mode 4x10G", "service routing protocols model ribd"})
+        lines = [line for s in sections for line in s["lines"]]
+        self.assertFalse([line for line in lines if "shutdown" in line or "redistribute" in line or "address-family" in line])
+        self.assertEqual(eos_config.config_delta(candidate, golden), [])
+
+    # Restores a config whose hostname, description and admin secret changed, the old values must
+    # never be negated after the new ones are set and removals must come first
+    def test_restore_commands_replaces_single_values(self):
+        global eos_count; eos_count += 1
+        target = "hostname R1\nusername admin secret newpass\ninterface Ethernet1\n  description uplink\n"
+        running = ("hostname R1-old\nusername admin role network-admin secret sha512 OLDHASH\nlogging host 10.10.4.254\n"
+                   "interface Ethernet1\n   description old\n")
+        commands = eos_config.restore_commands(target, running)
+        self.assertEqual(commands, ["no logging host 10.10.4.254", "hostname R1", "username admin secret newpass",
+                                    "interface Ethernet1", "   description uplink"])
+
+# =============================================================
+#                 Unit Tests for monitoring.py
+# =============================================================
+def oid_key(oid):
+    return tuple(int(part) for part in oid.split("."))
+
+# Answers a GETBULK the way an agent does: every OID in the response is the next one after the
+# requested OID, once for the non-repeaters and up to max-repetitions times for the rest
+def bulk_response(request, mib):
+    _, body, _ = snmp_codec.decode_tlv(request)
+    items = snmp_codec.decode_sequence(body)
+    fields = snmp_codec.decode_sequence(items[2][1])
+    request_id = snmp_codec.decode_integer(fields[0][1])
+    non_repeaters = snmp_codec.decode_integer(fields[1][1])
+    max_repetitions = snmp_codec.decode_integer(fields[2][1])
+    asked = [oid for oid, _ in snmp_codec.decode_varbinds(fields[3][1])]
+    walk = sorted(mib, key=oid_key)
+
+    def next_oid(oid):
+        return next((o for o in walk if oid_key(o) > oid_key(oid)), None)
+
+    varbinds = []
+    for index, oid in enumerate(asked):
+        for _ in range(1 if index < non_repeaters else max_repetitions):
+            oid = next_oid(oid)
+            if oid is None:
+                break
+            tag, value = mib[oid]
+            varbinds.append(snmp_codec.encode_oid(oid) + snmp_codec.encode_integer(value, tag))
+    varbind_list = b"".join(snmp_codec.encode_tlv(snmp_codec.SEQUENCE, vb) for vb in varbinds)
+    pdu = (snmp_codec.encode_integer(request_id) + snmp_codec.encode_integer(0) + snmp_codec.encode_integer(0)
+           + snmp_codec.encode_tlv(snmp_codec.SEQUENCE, varbind_list))
+    return snmp_codec.encode_tlv(snmp_codec.SEQUENCE, snmp_codec.encode_integer(1) + snmp_codec.encode_tlv(snmp_codec.OCTET_STRING, b"public")
+                                 + snmp_codec.encode_tlv(snmp_codec.GET_RESPONSE, pdu))
+
+class FakeSnmpClient:
+    def __init__(self, mib):
+        self.mib = mib
+
+    async def request(self, ip, packet_builder, timeout=2.0, retries=1, port=161):
+        return snmp_codec.decode_message(bulk_response(packet_builder(1234), self.mib))
+
+class TestMonitoring(unittest.TestCase):
+    mib = {
+        "1.3.6.1.2.1.1.1.0": (snmp_codec.OCTET_STRING, 0),
+        "1.3.6.1.2.1.1.3.0": (snmp_codec.TIMETICKS, 123456),
+        "1.3.6.1.2.1.1.4.0": (snmp_codec.INTEGER, 7),
+        "1.3.6.1.2.1.25.3.3.1.2.1": (snmp_codec.INTEGER, 10),
+        "1.3.6.1.2.1.25.3.3.1.2.2": (snmp_codec.INTEGER, 30),
+        "1.3.6.1.2.1.25.3.4.1.1.1": (snmp_codec.INTEGER, 99),
+    }
+
+    # Encodes a GETBULK, decodes it back and checks the fields survive the round trip
+    def test_request_round_trip(self):
+        global monitoring_count; monitoring_count += 1
+        packet = snmp_codec.encode_request("public", 4242, ["1.3.6.1.2.1.1.3", "1.3.6.1.2.1.25.3.3.1.2"],
+                                           snmp_codec.GET_BULK_REQUEST, 1, 16)
+        message = snmp_codec.decode_message(packet)
+        self.assertEqual(message["community"], "public")
+        self.assertEqual(message["pdu_type"], snmp_codec.GET_BULK_REQUEST)
+        self.assertEqual(message["request_id"], 4242)
+        self.assertEqual((message["error_status"], message["error_index"]), (1, 16))
+        self.assertEqual(message["varbinds"], [("1.3.6.1.2.1.1.3", None), ("1.3.6.1.2.1.25.3.3.1.2", None)])
+
+    # Polls a fake agent with GETBULK semantics, sysUpTime must come back even though the agent
+    # answers with the OID after the requested one, and only the CPU column's rows are averaged
+    def test_poll_device_uptime_and_cpu(self):
+        global monitoring_count; monitoring_count += 1
+        sample = asyncio.run(monitoring.poll_device(FakeSnmpClient(self.mib), "R1", "10.0.0.1"))
+        self.assertEqual(sample["error"], "")
+        self.assertEqual(sample["uptime"], 123456)
+        self.assertEqual(sample["cpu"], 20.0)
+        self.assertEqual(sample["cpu_count"], 2)
+
+# =============================================================
+#                 Unit Tests for influx_writer.py
+# =============================================================
+class TestInfluxWriter(unittest.TestCase):
+    # A sample polled from the fake agent must produce a point carrying every field, uptime included
+    def test_sample_to_point_fields(self):
+        global influx_count; influx_count += 1
+        sample = asyncio.run(monitoring.poll_device(FakeSnmpClient(TestMonitoring.mib), "R1", "10.0.0.1"))
+        sample["time"] = 1700000000.5
+        point = influx_writer.sample_to_point(sample)
+        self.assertEqual(point, "device,hostname=R1,ip=10.0.0.1 up=true,cpu=20.0,cpu_count=2i,uptime=123456i 1700000000500000000")
+
+    # A failed poll is still written, as up=false without the other fields
+    def test_failed_sample_to_point(self):
+        global influx_count; influx_count += 1
+        sample = {"hostname": "R2", "ip": "10.0.0.2", "time": 1.0, "error": "no SNMP response from 10.0.0.2"}
+        self.assertEqual(influx_writer.sample_to_point(sample), "device,hostname=R2,ip=10.0.0.2 up=false 1000000000")
+
+# =============================================================
+#                 Unit Tests for render.py
+# =============================================================
+class TestRender(unittest.TestCase):
+    # Renders every device from requirements.csv into a temp dir, each file must be byte for byte
+    # the committed candidate config the ansible playbook produced
+    def test_render_matches_candidates(self):
+        global render_count; render_count += 1
+        output_dir = tempfile.mkdtemp()
+        results = render.render_candidates(requirements_file, output_dir=output_dir, roles=roles_dir)
+        self.assertTrue(results)
+        for hostname, status in results.items():
+            self.assertEqual(status, "changed")
+            with open(os.path.join(output_dir, f"{hostname}.txt"), "rb") as f:
+                rendered = f.read()
+            with open(os.path.join(candidate_dir, f"{hostname}.txt"), "rb") as f:
+                self.assertEqual(rendered, f.read(), hostname)
+
+    # Rendering into a dir that is already up to date rewrites nothing
+    def test_render_unchanged_is_ok(self):
+        global render_count; render_count += 1
+        output_dir = tempfile.mkdtemp()
+        render.render_candidates(requirements_file, ["R1", "S1"], output_dir, roles_dir)
+        results = render.render_candidates(requirements_file, ["R1", "S1"], output_dir, roles_dir)
+        self.assertEqual(results, {"R1": "ok", "S1": "ok"})
+
+# =============================================================
+#                 Unit Tests for scheduler.py
+# =============================================================
+class TestScheduler(unittest.TestCase):
+    # Roles run in the given order, roles that aren't listed run last sorted by name
+    def test_order_stages(self):
+        global scheduler_count; scheduler_count += 1
+        jobs = [{"hostname": "R1", "role": "router"}, {"hostname": "X1", "role": "firewall"},
+                {"hostname": "S1", "role": "switch"}, {"hostname": "E1", "role": "edge_router"},
+                {"hostname": "R2", "role": "router"}, {"hostname": "A1", "role": "ap"}]
+        stages = scheduler.order_stages(jobs)
+        self.assertEqual([role for role, _ in stages], ["switch", "router", "edge_router", "ap", "firewall"])
+        self.assertEqual([job["hostname"] for job in stages[1][1]], ["R1", "R2"])
+
+    # Transient errors are retried until the job succeeds, each try counted
+    def test_run_job_retries_transient(self):
+        global scheduler_count; scheduler_count += 1
+        calls = []
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OSError("connection reset")
+        entry = scheduler.run_job({"hostname": "R1", "func": flaky}, {"role": {}, "site": {}}, retries=2, backoff=0)
+        self.assertEqual((entry["status"], entry["attempts"], entry["error"]), ("ok", 3, ""))
+
+    # A job still failing after the last retry is failed, anything not transient isn't retried at all
+    def test_run_job_gives_up(self):
+        global scheduler_count; scheduler_count += 1
+        def down():
+            raise OSError("no route to host")
+        def broken():
+            raise ValueError("bad config")
+        entry = scheduler.run_job({"hostname": "R1", "func": down}, {"role": {}, "site": {}}, retries=1, backoff=0)
+        self.assertEqual((entry["status"], entry["attempts"], entry["error"]), ("failed", 2, "no route to host"))
+        entry = scheduler.run_job({"hostname": "R2", "func": broken}, {"role": {}, "site": {}}, retries=3, backoff=0)
+        self.assertEqual((entry["status"], entry["attempts"], entry["error"]), ("failed", 1, "bad config"))
+
+    # A stage only starts once every device of the previous one is done
+    def test_run_jobs_stage_order(self):
+        global scheduler_count; scheduler_count += 1
+        finished = []
+        def push(hostname):
+            finished.append(hostname)
+        jobs = [{"hostname": h, "role": role, "func": push, "kwargs": {"hostname": h}}
+                for h, role in [("R1", "router"), ("S1", "switch"), ("E1", "edge_router"), ("S2", "switch")]]
+        report = scheduler.run_jobs(jobs, role_limits={"switch": 1}, retries=0, backoff=0)
+        self.assertEqual(sorted(finished[:2]), ["S1", "S2"])
+        self.assertEqual(finished[2:], ["R1", "E1"])
+        self.assertTrue(all(entry["status"] == "ok" for entry in report))
+
+# =============================================================
+#                 Unit Tests for inventory_store.py
+# =============================================================
+class TestInventoryStore(unittest.TestCase):
+    fieldnames = ["hostname", "device_type", "management_ip", "username", "password"]
+
+    def write_csv(self, path, rows, mtime):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.utime(path, ns=(mtime, mtime))
+
+    # Builds the indexes from the csv, a device's later rows add to it instead of starting a new one
+    def test_indexes(self):
+        global inventory_count; inventory_count += 1
+        path = tempfile.NamedTemporaryFile(delete=False, suffix=".csv").name
+        self.write_csv(path, [{"hostname": "R1", "device_type": "Router", "management_ip": "10.0.0.1", "username": "admin", "password": "pw"},
+                              {"hostname": "R1"},
+                              {"hostname": "S1", "device_type": "switch", "management_ip": "10.0.0.11"}], 1_000_000_000)
+        store = inventory_store.InventoryStore(path)
+        self.assertEqual(store.hostnames(), ["R1", "S1"])
+        self.assertEqual(len(store.device_rows("R1")), 2)
+        self.assertEqual(store.hostnames_by_type("router"), ["R1"])
+        self.assertEqual(store.hostname_for_ip("10.0.0.11"), "S1")
+        self.assertEqual(store.credentials(), {"R1": {"username": "admin", "password": "pw"}})
+
+    # The file is read again once its mtime changes, and only then
+    def test_reload_on_mtime_change(self):
+        global inventory_count; inventory_count += 1
+        path = tempfile.NamedTemporaryFile(delete=False, suffix=".csv").name
+        self.write_csv(path, [{"hostname": "R1", "device_type": "router", "management_ip": "10.0.0.1"}], 1_000_000_000)
+        store = inventory_store.InventoryStore(path)
+        self.assertEqual(store.management_ips(), {"R1": "10.0.0.1"})
+        # Same size and mtime, the cached copy is still used
+        self.write_csv(path, [{"hostname": "R1", "device_type": "router", "management_ip": "10.0.0.2"}], 1_000_000_000)
+        self.assertEqual(store.management_ip("R1"), "10.0.0.1")
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        self.assertEqual(store.management_ip("R1"), "10.0.0.2")
+
+    # Everything handed out is a copy, changing it doesn't change the store
+    def test_accessors_return_copies(self):
+        global inventory_count; inventory_count += 1
+        path = tempfile.NamedTemporaryFile(delete=False, suffix=".csv").name
+        self.write_csv(path, [{"hostname": "R1", "device_type": "router", "management_ip": "10.0.0.1", "username": "admin", "password": "pw"}],
+                       1_000_000_000)
+        store = inventory_store.InventoryStore(path)
+        store.rows()[0]["hostname"] = "changed"
+        store.devices()[0]["hostname"] = "changed"
+        store.device_rows("R1")[0]["management_ip"] = "changed"
+        store.credentials()["R1"]["password"] = "changed"
+        store.fieldnames().append("changed")
+        self.assertEqual(store.rows()[0]["hostname"], "R1")
+        self.assertEqual(store.devices()[0]["hostname"], "R1")
+        self.assertEqual(store.device_rows("R1")[0]["management_ip"], "10.0.0.1")
+        self.assertEqual(store.credentials()["R1"]["password"], "pw")
+        self.assertEqual(store.fieldnames(), self.fieldnames)
+
+# =============================================================
+#                 Unit Tests for jobs.py
+# =============================================================
+class TestJobs(unittest.TestCase):
+    def wait_done(self, job):
+        for _ in range(200):
+            if job.done:
+                return
+            job.wait(job.progress_count, timeout=0.05)
+        self.fail(f"{job.name} never finished")
+
+    # A job's return value becomes its result, an exception fails it, JobFailed without a traceback
+    def test_status(self):
+        global jobs_count; jobs_count += 1
+        queue = jobs.JobQueue(max_workers=2)
+        def ok(job):
+            job.report("working")
+            return 42
+        def crash(job):
+            raise RuntimeError("boom")
+        def exit_code(job):
+            raise jobs.JobFailed("exited with code 1")
+        done, crashed, failed = queue.submit("ok", ok), queue.submit("crash", crash), queue.submit("failed", exit_code)
+        for job in (done, crashed, failed):
+            self.wait_done(job)
+        self.assertEqual((done.status, done.result, done.progress), ("done", 42, ["working"]))
+        self.assertEqual(crashed.status, "failed")
+        self.assertTrue(crashed.error.startswith("boom\nTraceback"))
+        self.assertEqual((failed.status, failed.error), ("failed", "exited with code 1"))
+        self.assertIs(queue.get(done.id), done)
+
+    # Only the newest messages are kept, progress_since resumes from the oldest one still there
+    def test_progress_since(self):
+        global jobs_count; jobs_count += 1
+        job = jobs.Job("chatty", max_progress=3)
+        for i in range(5):
+            job.report(f"line {i}")
+        self.assertEqual(job.progress_since(0), (["line 2", "line 3", "line 4"], 5))
+        self.assertEqual(job.progress_since(4), (["line 4"], 5))
+        self.assertEqual(job.progress_snapshot(), (["line 2", "line 3", "line 4"], 5, False))
+
+    # Finished jobs are dropped past max_jobs (oldest first) and after retention, running ones never
+    def test_eviction(self):
+        global jobs_count; jobs_count += 1
+        queue = jobs.JobQueue(max_workers=1, max_jobs=2)
+        first = queue.submit("first", lambda job: 1)
+        self.wait_done(first)
+        second = queue.submit("second", lambda job: 2)
+        self.wait_done(second)
+        third = queue.submit("third", lambda job: 3)
+        self.wait_done(third)
+        self.assertIsNone(queue.get(first.id))
+        self.assertEqual([job.name for job in queue.list()], ["third", "second"])
+        queue.retention = 0
+        second.finished -= 1
+        self.assertNotIn(second, queue.list())
+
+# =============================================================
+#                 Unit Tests for capture.py
+# =============================================================
+def v2_trap(request_id, trap_oid, varbinds, uptime=100):
+    # A v2c trap PDU built from the codec's encoders, varbinds are [(oid, integer)]
+    varbinds = [(snmp_codec.SYS_UPTIME_OID, snmp_codec.encode_integer(uptime, snmp_codec.TIMETICKS)),
+                (snmp_codec.SNMP_TRAP_OID, snmp_codec.encode_oid(trap_oid))] + \
+               [(oid, snmp_codec.encode_integer(value)) for oid, value in varbinds]
+    varbind_list = b"".join(snmp_codec.encode_tlv(snmp_codec.SEQUENCE, snmp_codec.encode_oid(oid) + value) for oid, value in varbinds)
+    pdu = (snmp_codec.encode_integer(request_id) + snmp_codec.encode_integer(0) + snmp_codec.encode_integer(0)
+           + snmp_codec.encode_tlv(snmp_codec.SEQUENCE, varbind_list))
+    return snmp_codec.encode_tlv(snmp_codec.SEQUENCE, snmp_codec.encode_integer(1) + snmp_codec.encode_tlv(snmp_codec.OCTET_STRING, b"public")
+                                 + snmp_codec.encode_tlv(snmp_codec.TRAP_V2, pdu))
+
+class TestCapture(unittest.TestCase):
+    link_down = "1.3.6.1.6.3.1.1.5.3"
+    if_index = "1.3.6.1.2.1.2.2.1.1.2"
+
+    # A trap encoded with the codec decodes back to the same OIDs and values
+    def test_trap_round_trip(self):
+        global capture_count; capture_count += 1
+        trap = capture.decode_trap(v2_trap(77, self.link_down, [(self.if_index, 2)], uptime=4321), "10.0.0.1")
+        self.assertEqual(trap["trap_oid"], self.link_down)
+        self.assertEqual((trap["agent"], trap["uptime"], trap["request_id"]), ("10.0.0.1", 4321, 77))
+        self.assertEqual(trap["varbinds"][2], (self.if_index, 2))
+        with self.assertRaises(snmp_codec.SnmpDecodeError):
+            capture.decode_trap(v2_trap(77, self.link_down, [])[:-3], "10.0.0.1")
+
+    # The committed pcapng capture decodes into its 23 traps, R1's link flaps are counted and flagged
+    def test_pcapng_decode(self):
+        global capture_count; capture_count += 1
+        aggregator = capture.TrapAggregator(window=300, dedup_window=2, flap_threshold=5)
+        self.assertEqual(capture.process_pcap(trap_pcapng, aggregator), 23)
+        self.assertEqual((aggregator.received, aggregator.duplicates, aggregator.errors), (23, 0, 0))
+        rows = {(row["device"], row["name"]): row for row in aggregator.counts(1757197210)}
+        self.assertEqual(rows[("10.10.4.1", "linkDown")]["total"], 5)
+        self.assertTrue(rows[("10.10.4.1", "linkUp")]["flapping"])
+
+    # The same frames written as a classic pcap read back identically
+    def test_classic_pcap_decode(self):
+        global capture_count; capture_count += 1
+        with open(trap_pcapng, "rb") as f:
+            frames = list(capture._pcapng_frames(f.read()))
+        path = tempfile.NamedTemporaryFile(delete=False, suffix=".pcap").name
+        with open(path, "wb") as f:
+            f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, frames[0][1]))
+            for timestamp, _, frame in frames:
+                seconds = int(timestamp)
+                f.write(struct.pack("<IIII", seconds, round((timestamp - seconds) * 1e6), len(frame), len(frame)) + frame)
+        classic = list(capture.read_pcap(path))
+        pcapng = list(capture.read_pcap(trap_pcapng))
+        self.assertEqual([(source, payload) for _, source, payload in classic], [(source, payload) for _, source, payload in pcapng])
+        self.assertAlmostEqual(classic[-1][0], pcapng[-1][0], places=5)
+
+    # A retransmitted trap (same varbinds, new uptime) inside dedup_window is a duplicate, not an event
+    def test_duplicates(self):
+        global capture_count; capture_count += 1
+        aggregator = capture.TrapAggregator(window=300, dedup_window=2, flap_threshold=5)
+        aggregator.add_packet(v2_trap(1, self.link_down, [(self.if_index, 2)], uptime=100), "10.0.0.1", 1000.0)
+        aggregator.add_packet(v2_trap(2, self.link_down, [(self.if_index, 2)], uptime=101), "10.0.0.1", 1000.5)
+        aggregator.add_packet(v2_trap(3, self.link_down, [(self.if_index, 2)], uptime=900), "10.0.0.1", 1009.0)
+        aggregator.add_packet(b"not snmp", "10.0.0.1", 1010.0)
+        self.assertEqual((aggregator.received, aggregator.duplicates, aggregator.errors), (3, 1, 1))
+        self.assertEqual(aggregator.counts(1010.0)[0]["total"], 2)
+
+# =============================================================
+#                 Unit Tests for validateIPv4.py
+# =============================================================
+class TestValidateBulk(unittest.TestCase):
+    addresses = ["10.0.0.1", "224.0.0.5", "127.0.0.1", "169.254.1.1", "255.255.255.255",
+                 "240.0.0.1", "10.0.0.256", "192.168.1.0/24", "10.1.1.1/33", "8.8.8.8"]
+
+    def write_addresses(self):
+        path = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt").name
+        with open(path, "w") as f:
+            f.write("\n".join(self.addresses[:5]) + "\n\n" + "\n".join(self.addresses[5:]) + "\n")
+        return path
+
+    # Every class is counted and offenders are reported with the file:line they came from
+    def test_counts_and_offenders(self):
+        global validate_count; validate_count += 1
+        path = self.write_addresses()
+        report = validateIPv4.validate_bulk(validateIPv4.read_addresses(path))
+        self.assertEqual(report["total"], 10)
+        self.assertEqual(report["counts"], {"malformed": 2, "multicast": 1, "loopback": 1, "link-local": 1,
+                                            "broadcast": 1, "experimental": 1, "valid": 3})
+        self.assertEqual(report["offenders"]["malformed"], [(f"{path}:8", "10.0.0.256"), (f"{path}:10", "10.1.1.1/33")])
+        self.assertEqual(report["offenders"]["loopback"], [(f"{path}:3", "127.0.0.1")])
+
+    # The plain integer path classifies the same as the NumPy one
+    def test_without_numpy(self):
+        global validate_count; validate_count += 1
+        pairs = [(str(number), address) for number, address in enumerate(self.addresses, 1)]
+        expected = validateIPv4.validate_bulk(pairs)
+        np, validateIPv4.np = validateIPv4.np, None
+        try:
+            self.assertEqual(validateIPv4.validate_bulk(pairs), expected)
+        finally:
+            validateIPv4.np = np
+
+    # Offenders are capped at max_offenders while counts keep going across chunks
+    def test_offender_cap_and_chunks(self):
+        global validate_count; validate_count += 1
+        chunk_size, validateIPv4.chunk_size = validateIPv4.chunk_size, 4
+        try:
+            report = validateIPv4.validate_bulk(((str(i), "127.0.0.1") for i in range(10)), max_offenders=3)
+        finally:
+            validateIPv4.chunk_size = chunk_size
+        self.assertEqual((report["total"], report["counts"]["loopback"]), (10, 10))
+        self.assertEqual(report["offenders"]["loopback"], [("0", "127.0.0.1"), ("1", "127.0.0.1"), ("2", "127.0.0.1")])
+
+# =============================================================
+#                 Unit Tests for address_plan.py
+# =============================================================
+class TestAddressPlan(unittest.TestCase):
+    def checks(self, rows):
+        return [(i["check"], i["hostname"]) for i in address_plan.validate_rows(rows)]
+
+    # The same host address on two devices is an error, a /24 shared by three routers is a link
+    def test_duplicate_address(self):
+        global address_plan_count; address_plan_count += 1
+        rows = [{"hostname": "R1", "intf_name": "Ethernet1", "intf_ipv4": "10.0.0.1/24"},
+                {"hostname": "R2", "intf_name": "Ethernet1", "intf_ipv4": "10.0.0.1/24"},
+                {"hostname": "R3", "intf_name": "Ethernet1", "intf_ipv4": "10.0.0.2/24"}]
+        issues = address_plan.validate_rows(rows)
+        self.assertEqual([(i["check"], i["hostname"]) for i in issues], [("duplicate-address", "R1")])
+        self.assertIn("R1 Ethernet1, R2 Ethernet1", issues[0]["message"])
+        self.assertEqual(self.checks(rows[::2]), [])
+
+    # A subnet inside a different one is an overlap, as is one subnet twice on a device
+    def test_overlapping_subnets(self):
+        global address_plan_count; address_plan_count += 1
+        rows = [{"hostname": "R1", "intf_name": "Ethernet1", "intf_ipv4": "10.0.0.1/24"},
+                {"hostname": "R2", "intf_name": "Ethernet1", "intf_ipv4": "10.0.0.130/25"},
+                {"hostname": "R3", "intf_name": "Ethernet1", "intf_ipv4": "10.0.1.1/24"},
+                {"hostname": "R3", "intf_name": "Ethernet2", "intf_ipv4": "10.0.1.2/24"},
+                {"hostname": "R4", "intf_name": "Ethernet1", "intf_ipv4": "10.0.2.1/24"}]
+        self.assertEqual(self.checks(rows), [("overlapping-subnet", "R2"), ("overlapping-subnet", "R3")])
+
+    # Routing lists must parse and repeats are warnings, the committed requirements.csv passes
+    def test_routing_lists_and_check_plan(self):
+        global address_plan_count; address_plan_count += 1
+        rows = [{"hostname": "R1", "ospf_networks": "10.1.0.0/24;10.1.0.0/24", "rip_networks": "10.2.0.0/16"},
+                {"hostname": "R1", "ospf_networks": "10.1.0.0/24"}]
+        issues = address_plan.validate_rows(rows)
+        self.assertEqual([(i["severity"], i["check"]) for i in issues], [("error", "malformed"), ("warning", "duplicate-network")])
+        self.assertIn("10.1.0.0/24 3 times", issues[1]["message"])
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            self.assertTrue(address_plan.check_plan(requirements_file))
+
+# =============================================================
+#                 Unit Tests for config_store.py
+# =============================================================
+class TestConfigStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = config_store.ConfigStore(self.root)
+
+    def objects(self):
+        return sum(len(files) for _, _, files in os.walk(os.path.join(self.root, "objects")))
+
+    # Saving an unchanged config only moves last_seen, a change starts a new entry and object
+    def test_put_dedupe(self):
+        global config_store_count; config_store_count += 1
+        first = self.store.put("R1", "hostname R1\n", "2025-10-13_22-21-35")
+        self.assertEqual(self.store.put("R1", "hostname R1\n", "2025-10-14_22-21-35"), first)
+        self.store.put("R2", "hostname R1\n", "2025-10-14_22-21-35")
+        self.store.put("R1", "hostname R1-new\n", "2025-10-15_22-21-35")
+        history = self.store.history("R1")
+        self.assertEqual([(e["timestamp"], e["last_seen"]) for e in history],
+                         [("2025-10-13_22-21-35", "2025-10-14_22-21-35"), ("2025-10-15_22-21-35", "2025-10-15_22-21-35")])
+        self.assertEqual(self.objects(), 2)
+        self.assertEqual(self.store.get(first), "hostname R1\n")
+
+    # An older copy of a known config imported later moves that entry's start back instead of adding one
+    def test_out_of_order_put(self):
+        global config_store_count; config_store_count += 1
+        self.store.put("R1", "a\n", "2025-10-10_00-00-00")
+        self.store.put("R1", "b\n", "2025-10-12_00-00-00")
+        self.store.put("R1", "b\n", "2025-10-11_00-00-00")
+        self.store.put("R1", "c\n", "2025-10-09_00-00-00")
+        self.assertEqual([e["timestamp"] for e in self.store.history("R1")],
+                         ["2025-10-09_00-00-00", "2025-10-10_00-00-00", "2025-10-11_00-00-00"])
+
+    # Two stores on one directory (two processes) merge their entries instead of overwriting each other
+    def test_shared_index(self):
+        global config_store_count; config_store_count += 1
+        other = config_store.ConfigStore(self.root)
+        self.store.put("R1", "a\n", "2025-10-10_00-00-00", save=False)
+        other.put("R2", "b\n", "2025-10-10_00-00-00")
+        self.store.save()
+        self.assertEqual(config_store.ConfigStore(self.root).hosts(), ["R1", "R2"])
+        self.assertEqual(other.hosts(), ["R1", "R2"])
+
+    # at() picks the entry current at a time or a whole date, checkout writes it for Netmiko to push
+    def test_at_and_checkout(self):
+        global config_store_count; config_store_count += 1
+        self.store.put("R1", "a\n", "2025-10-10_08-00-00")
+        self.store.put("R1", "b\n", "2025-10-12_08-00-00")
+        self.assertIsNone(self.store.at("R1", "2025-10-09"))
+        self.assertEqual(self.store.at("R1", "2025-10-12 07:59:59")["timestamp"], "2025-10-10_08-00-00")
+        self.assertEqual(self.store.at("R1", "2025-10-12")["timestamp"], "2025-10-12_08-00-00")
+        self.assertEqual(self.store.at("R1"), self.store.latest("R1"))
+        with self.assertRaises(ValueError):
+            self.store.at("R1", "last tuesday")
+        directory = tempfile.mkdtemp()
+        path = self.store.checkout("R1", "2025-10-11", directory)
+        self.assertEqual(os.path.basename(path), "R1_golden_config_2025-10-10_08-00-00.txt")
+        with open(path) as f:
+            self.assertEqual(f.read(), "a\n")
+        self.assertIsNone(self.store.checkout("R2", None, directory))
+
+    # A stale file left in the checkout directory is rewritten, an intact one is reused
+    def test_checkout_rewrites_stale_file(self):
+        global config_store_count; config_store_count += 1
+        self.store.put("R1", "a\n", "2025-10-10_08-00-00")
+        directory = tempfile.mkdtemp()
+        path = self.store.checkout("R1", None, directory)
+        with open(path, "w") as f:
+            f.write("edited by hand\n")
+        self.assertEqual(self.store.checkout("R1", None, directory), path)
+        with open(path) as f:
+            self.assertEqual(f.read(), "a\n")
+        modified = os.stat(path).st_mtime_ns
+        self.store.checkout("R1", None, directory)
+        self.assertEqual(os.stat(path).st_mtime_ns, modified)
+
+# =============================================================
+#                 Unit Tests for result_cache.py
+# =============================================================
+class TestResultCache(unittest.TestCase):
+    # Runs cache.get(key, compute) in waiters threads while the first call is held inside compute,
+    # returns (results, number of compute calls)
+    def concurrent_gets(self, cache, waiters, result=None, error=None):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            if error:
+                raise error
+            return result
+
+        def call():
+            try:
+                results.append(cache.get("R1 bgp", compute)[0])
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        self.assertTrue(started.wait(5))
+        threads += [threading.Thread(target=call) for _ in range(waiters)]
+        for thread in threads[1:]:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while cache.stats()["coalesced"] < waiters and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return results, len(calls)
+
+    # Identical requests arriving while one is running share its result, later ones are hits
+    def test_coalescing(self):
+        global result_cache_count; result_cache_count += 1
+        cache = result_cache.ResultCache(ttl=30)
+        results, calls = self.concurrent_gets(cache, 4, result={"up": 2})
+        self.assertEqual((calls, results), (1, [{"up": 2}] * 5))
+        self.assertEqual(cache.get("R1 bgp", lambda: self.fail("computed again"))[0], {"up": 2})
+        self.assertEqual(cache.stats(), {"entries": 1, "hits": 1, "misses": 1, "coalesced": 4})
+
+    # A failure reaches every waiting caller and nothing is cached
+    def test_coalesced_failure(self):
+        global result_cache_count; result_cache_count += 1
+        cache = result_cache.ResultCache(ttl=30)
+        results, calls = self.concurrent_gets(cache, 2, error=TimeoutError("R1 unreachable"))
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(isinstance(r, TimeoutError) for r in results) and len(results) == 3)
+        self.assertEqual(cache.get("R1 bgp", lambda: "ok"), ("ok", 0.0))
+
+    # Expired, bypassed, uncacheable and least recently used results are computed again
+    def test_expiry_bypass_and_eviction(self):
+        global result_cache_count; result_cache_count += 1
+        cache = result_cache.ResultCache(ttl=0, max_entries=2, cacheable=lambda result: result != "error")
+        cache.get("a", lambda: 1)
+        time.sleep(0.01)
+        self.assertEqual(cache.get("a", lambda: 2), (2, 0.0))
+        cache.ttl = 30
+        self.assertEqual(cache.get("a", lambda: 3, bypass=True)[0], 3)
+        cache.get("b", lambda: "error")
+        self.assertEqual(cache.get("b", lambda: 4)[0], 4)
+        cache.get("a", lambda: 5)
+        cache.get("c", lambda: 6)
+        self.assertEqual(cache.get("b", lambda: 7)[0], 7)
+        self.assertEqual(cache.get("c", lambda: 8)[0], 6)
+
 # =============================================================
 #       Running and CC Calculation
 # =============================================================
@@ -238,19 +911,62 @@ if __name__ == "__main__":
     func_funcs_total = 11    # functions.py
     config_funcs_total = 7   # main.py
     frontend_funcs_total = 6 # app.py routes + helpers
+    eos_funcs_total = 4      # eos_config.py
+    monitoring_funcs_total = 2  # monitoring.py + snmp_codec.py
+    influx_funcs_total = 2   # influx_writer.py
+    render_funcs_total = 2   # render.py
+    scheduler_funcs_total = 4 # scheduler.py
+    inventory_funcs_total = 3 # inventory_store.py
+    jobs_funcs_total = 3     # jobs.py
+    capture_funcs_total = 4  # capture.py + snmp_codec.py
+    validate_funcs_total = 3 # validateIPv4.py
+    address_plan_funcs_total = 3 # address_plan.py
+    config_store_funcs_total = 5 # config_store.py
+    result_cache_funcs_total = 3 # result_cache.py
 
     mk_cov = round((mk_count / mk_funcs_total) * 100, 2)
     func_cov = round((func_count / func_funcs_total) * 100, 2)
     config_cov = round((config_count / config_funcs_total) * 100, 2)
     frontend_cov = round((frontend_count / frontend_funcs_total) * 100, 2)
-    total_cov = round(((mk_count + func_count + config_count + frontend_count) /
-                      (mk_funcs_total + func_funcs_total + config_funcs_total + frontend_funcs_total)) * 100, 2)
+    eos_cov = round((eos_count / eos_funcs_total) * 100, 2)
+    monitoring_cov = round((monitoring_count / monitoring_funcs_total) * 100, 2)
+    influx_cov = round((influx_count / influx_funcs_total) * 100, 2)
+    render_cov = round((render_count / render_funcs_total) * 100, 2)
+    scheduler_cov = round((scheduler_count / scheduler_funcs_total) * 100, 2)
+    inventory_cov = round((inventory_count / inventory_funcs_total) * 100, 2)
+    jobs_cov = round((jobs_count / jobs_funcs_total) * 100, 2)
+    capture_cov = round((capture_count / capture_funcs_total) * 100, 2)
+    validate_cov = round((validate_count / validate_funcs_total) * 100, 2)
+    address_plan_cov = round((address_plan_count / address_plan_funcs_total) * 100, 2)
+    config_store_cov = round((config_store_count / config_store_funcs_total) * 100, 2)
+    result_cache_cov = round((result_cache_count / result_cache_funcs_total) * 100, 2)
+    total_cov = round(((mk_count + func_count + config_count + frontend_count + eos_count + monitoring_count
+                        + influx_count + render_count + scheduler_count + inventory_count + jobs_count
+                        + capture_count + validate_count + address_plan_count + config_store_count
+                        + result_cache_count) /
+                      (mk_funcs_total + func_funcs_total + config_funcs_total + frontend_funcs_total + eos_funcs_total
+                       + monitoring_funcs_total + influx_funcs_total + render_funcs_total
+                       + scheduler_funcs_total + inventory_funcs_total + jobs_funcs_total
+                       + capture_funcs_total + validate_funcs_total + address_plan_funcs_total
+                       + config_store_funcs_total + result_cache_funcs_total)) * 100, 2)
 
     print("\n========== COVERAGE SUMMARY ==========")
     print(f"mk_new_play.py: {mk_cov}% ({mk_count}/{mk_funcs_total})")
     print(f"functions.py  : {func_cov}% ({func_count}/{func_funcs_total})")
     print(f"main.py       : {config_cov}% ({config_count}/{config_funcs_total})")
     print(f"app.py        : {frontend_cov}% ({frontend_count}/{frontend_funcs_total})")
+    print(f"eos_config.py : {eos_cov}% ({eos_count}/{eos_funcs_total})")
+    print(f"monitoring.py : {monitoring_cov}% ({monitoring_count}/{monitoring_funcs_total})")
+    print(f"influx_writer : {influx_cov}% ({influx_count}/{influx_funcs_total})")
+    print(f"render.py     : {render_cov}% ({render_count}/{render_funcs_total})")
+    print(f"scheduler.py  : {scheduler_cov}% ({scheduler_count}/{scheduler_funcs_total})")
+    print(f"jobs.py       : {jobs_cov}% ({jobs_count}/{jobs_funcs_total})")
+    print(f"capture.py    : {capture_cov}% ({capture_count}/{capture_funcs_total})")
+    print(f"inventory     : {inventory_cov}% ({inventory_count}/{inventory_funcs_total})")
+    print(f"validateIPv4  : {validate_cov}% ({validate_count}/{validate_funcs_total})")
+    print(f"address_plan  : {address_plan_cov}% ({address_plan_count}/{address_plan_funcs_total})")
+    print(f"config_store  : {config_store_cov}% ({config_store_count}/{config_store_funcs_total})")
+    print(f"result_cache  : {result_cache_cov}% ({result_cache_count}/{result_cache_funcs_total})")
     print(f"-------------------------------------")
     print(f"TOTAL COVERAGE: {total_cov}%")
 
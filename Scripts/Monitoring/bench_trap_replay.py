@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import time
+import socket
+import argparse
+import resource
+import threading
+import tracemalloc
+import multiprocessing
+import capture
+import snmp_codec
+
+# Replays the udp/162 traffic of a capture into capture.listen() on loopback and reports how much of it
+# the trap collector kept up with, e.g.
+# ./bench_trap_replay.py --pcap packet_capture.pcap --loops 200 --speeds 1000,10000,0
+
+pcap_file = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/packet_capture.pcap"
+
+
+def with_request_id(payload, request_id):
+    # Rewrites a v2 trap's request-id so every replayed packet can be matched to its send time.
+    # v1 traps have no request-id and are sent unchanged (they count, but have no latency)
+    _, body, _ = snmp_codec.decode_tlv(payload)
+    items = snmp_codec.decode_sequence(body)
+    pdu_type, pdu = items[2]
+    if pdu_type == snmp_codec.TRAP_V1:
+        return payload
+    fields = snmp_codec.decode_sequence(pdu)
+    pdu = snmp_codec.encode_integer(request_id) + b"".join(snmp_codec.encode_tlv(t, v) for t, v in fields[1:])
+    message = b"".join(snmp_codec.encode_tlv(t, v) for t, v in items[:2]) + snmp_codec.encode_tlv(pdu_type, pdu)
+    return snmp_codec.encode_tlv(snmp_codec.SEQUENCE, message)
+
+
+def replay_schedule(packets, loops, speed):
+    # [(offset in seconds, payload)] with the capture repeated loops times back to back, the gaps
+    # between packets divided by speed (0 = no gaps, as fast as possible)
+    start, end = packets[0][0], packets[-1][0]
+    period = end - start
+    schedule = []
+    for loop in range(loops):
+        for timestamp, _, payload in packets:
+            offset = 0.0 if speed == 0 else (timestamp - start + loop * period) / speed
+            schedule.append((offset, with_request_id(payload, len(schedule) + 1)))
+    return schedule
+
+
+def send_schedule(schedule, address, conn):
+    # Runs in its own process so the sender doesn't compete with the listener for the GIL.
+    # Send times use perf_counter, which is the same monotonic clock in both processes
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    send_times = []
+    start = time.perf_counter()
+    for offset, payload in schedule:
+        delay = start + offset - time.perf_counter()
+        if delay > 0.0005:
+            time.sleep(delay)
+        send_times.append(time.perf_counter())
+        try:
+            sock.sendto(payload, address)
+        except OSError:
+            send_times[-1] = None
+    sock.close()
+    conn.send(send_times)
+    conn.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(schedule, port, drain, trace):
+    aggregator = capture.TrapAggregator(window=3600, dedup_window=0, csv_file="")
+    receive_times = {}
+    stop = threading.Event()
+
+    def on_trap(trap):
+        receive_times[trap["request_id"]] = time.perf_counter()
+
+    if trace:
+        tracemalloc.start()
+    listener = threading.Thread(target=capture.listen, args=(aggregator, "127.0.0.1", port, stop, on_trap))
+    listener.start()
+    time.sleep(0.2)
+
+    parent, child = multiprocessing.Pipe(duplex=False)
+    sender = multiprocessing.Process(target=send_schedule, args=(schedule, ("127.0.0.1", port), child))
+    sender.start()
+    send_times = parent.recv()
+    sender.join()
+    first_sent = next(t for t in send_times if t is not None)
+    last_sent = max(t for t in send_times if t is not None)
+
+    # Wait until the listener goes quiet (or the drain limit) so late packets still count
+    deadline = time.perf_counter() + drain
+    seen = -1
+    while time.perf_counter() < deadline and seen != aggregator.received:
+        seen = aggregator.received
+        time.sleep(0.2)
+    stop.set()
+    listener.join()
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace else None
+    if trace:
+        tracemalloc.stop()
+
+    latencies = sorted(receive_times[i + 1] - sent for i, sent in enumerate(send_times)
+                       if sent is not None and i + 1 in receive_times)
+    last_received = max(receive_times.values(), default=last_sent)
+    sent = sum(1 for t in send_times if t is not None)
+    return {
+        "sent": sent,
+        "captured": aggregator.received,
+        "errors": aggregator.errors,
+        "send_rate": sent / max(last_sent - first_sent, 1e-9),
+        "capture_rate": aggregator.received / max(last_received - first_sent, 1e-9),
+        "p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99), "max": latencies[-1] if latencies else 0.0,
+        "traced_peak": traced_peak,
+        "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,   # KiB on Linux
+    }
+
+
+def print_result(speed, result):
+    label = "max" if speed == 0 else f"{speed:g}x"
+    lost = result["sent"] - result["captured"]
+    print(f"{label:>8}{result['sent']:>9}{result['captured']:>10}{lost:>7}"
+          f"{result['send_rate']:>11.0f}{result['capture_rate']:>11.0f}"
+          f"{result['p50'] * 1000:>9.2f}{result['p90'] * 1000:>9.2f}{result['p99'] * 1000:>9.2f}{result['max'] * 1000:>9.2f}"
+          f"{result['max_rss'] / 1024:>10.1f}"
+          + (f"{result['traced_peak'] / 1024 / 1024:>10.2f}" if result["traced_peak"] is not None else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a trap capture into the trap collector and measure it")
+    parser.add_argument("--pcap", default=pcap_file)
+    parser.add_argument("--loops", type=int, default=100, help="times the capture is repeated per run")
+    parser.add_argument("--speeds", default="1000,10000,0", help="comma separated speed multipliers, 0 = as fast as possible")
+    parser.add_argument("--port", type=int, default=16200, help="loopback port the listener binds")
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for the listener to catch up")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the traced Python heap peak (slows the listener)")
+    args = parser.parse_args()
+
+    packets = list(capture.read_pcap(args.pcap))
+    if not packets:
+        print(f"No udp/162 packets in {args.pcap}")
+        return
+    print(f"{len(packets)} trap packets in {args.pcap}, replayed {args.loops} times per run")
+    print(f"{'speed':>8}{'sent':>9}{'captured':>10}{'lost':>7}{'sent/s':>11}{'capt/s':>11}"
+          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rss MiB':>10}"
+          + (f"{'heap MiB':>10}" if args.tracemalloc else ""))
+    for speed in (float(s) for s in args.speeds.split(",")):
+        schedule = replay_schedule(packets, args.loops, speed)
+        print_result(speed, run(schedule, args.port, args.drain, args.tracemalloc))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,419 @@
 #!/usr/bin/env python3
 
-import pyshark
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import threading
+import collections
+import snmp_codec
+sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Ansible")
+import inventory_store
+
+# Receives SNMP traps (live on udp/162 or from a pcap/pcapng capture), decodes them in process
+# and keeps per device / trap OID counts over a sliding window. The counts are written to a
+# JSON snapshot that the portal's /traps page reads
+
+requirements = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+snapshot_file = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/trap_counts.json"
+# Raw copy of every trap received live. Not the old pyshark capture's /root/packet_capture.pcap,
+# that one is pcapng and can't be appended to
+pcap_file = "/home/student/CSCI5840-Advanced-Network-Automation/Scripts/Monitoring/trap_capture.pcap"
+# Linux's IP_PKTINFO, older Pythons don't export it. Gives the local address each datagram was sent to
+IP_PKTINFO = getattr(socket, "IP_PKTINFO", 8 if sys.platform.startswith("linux") else None)
+# Destination recorded when the local address isn't known (bound to 0.0.0.0 without IP_PKTINFO)
+unknown_destination = "0.0.0.0"
+
+# RFC 3584 mapping of the v1 generic trap numbers to their v2 snmpTrapOID
+generic_trap_oids = ["1.3.6.1.6.3.1.1.5.1", "1.3.6.1.6.3.1.1.5.2", "1.3.6.1.6.3.1.1.5.3",
+                     "1.3.6.1.6.3.1.1.5.4", "1.3.6.1.6.3.1.1.5.5", "1.3.6.1.6.3.1.1.5.6"]
+trap_names = {
+    "1.3.6.1.6.3.1.1.5.1": "coldStart",
+    "1.3.6.1.6.3.1.1.5.2": "warmStart",
+    "1.3.6.1.6.3.1.1.5.3": "linkDown",
+    "1.3.6.1.6.3.1.1.5.4": "linkUp",
+    "1.3.6.1.6.3.1.1.5.5": "authenticationFailure",
+    "1.3.6.1.6.3.1.1.5.6": "egpNeighborLoss",
+    "1.3.6.1.2.1.15.0.1": "bgpEstablished",
+    "1.3.6.1.2.1.15.0.2": "bgpBackwardTransition",
+    "1.3.6.1.2.1.15.7.1": "bgpEstablished",
+    "1.3.6.1.2.1.15.7.2": "bgpBackwardTransition",
+    "1.3.6.1.2.1.14.16.2.2": "ospfNbrStateChange",
+    "1.3.6.1.2.1.14.16.2.16": "ospfIfStateChange",
+}
+
+
+# Capture file reading, classic pcap and pcapng without tshark
+def read_pcap(path, port=162):
+    # Yields (timestamp, source ip, udp payload) for every UDP packet to the given port
+    with open(path, "rb") as file:
+        data = file.read()
+    magic = data[:4]
+    if magic == b"\x0a\x0d\x0d\x0a":
+        frames = _pcapng_frames(data)
+    elif magic in (b"\xd4\xc3\xb2\xa1", b"\xa1\xb2\xc3\xd4", b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d"):
+        frames = _pcap_frames(data)
+    else:
+        raise ValueError(f"{path} is not a pcap or pcapng file")
+    for timestamp, linktype, frame in frames:
+        packet = udp_payload(linktype, frame)
+        if packet and packet[1] == port:
+            yield timestamp, packet[0], packet[2]
+
+
+def _pcap_frames(data):
+    endian = "<" if data[:4] in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1") else ">"
+    divisor = 1e9 if data[:4] in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d") else 1e6
+    linktype = struct.unpack_from(endian + "I", data, 20)[0] & 0x0FFFFFFF
+    offset = 24
+    while offset + 16 <= len(data):
+        seconds, fraction, captured, _ = struct.unpack_from(endian + "IIII", data, offset)
+        offset += 16
+        yield seconds + fraction / divisor, linktype, data[offset:offset + captured]
+        offset += captured
+
+
+def _pcapng_frames(data):
+    endian = "<"
+    interfaces = []     # (linktype, timestamp divisor) per interface id of the current section
+    offset = 0
+    while offset + 12 <= len(data):
+        block_type = struct.unpack_from(endian + "I", data, offset)[0]
+        if block_type == 0x0A0D0D0A:
+            # Section header, its byte order magic decides how the rest of the section is read
+            endian = "<" if data[offset + 8:offset + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_length = struct.unpack_from(endian + "I", data, offset + 4)[0]
+        if block_length < 12:
+            break
+        body = data[offset + 8:offset + block_length - 4]
+        if block_type == 1:
+            interfaces.append((struct.unpack_from(endian + "H", body, 0)[0], _pcapng_resolution(body[8:], endian)))
+        elif block_type == 6:
+            interface_id, high, low, captured = struct.unpack_from(endian + "IIII", body, 0)
+            linktype, divisor = interfaces[interface_id] if interface_id < len(interfaces) else (1, 1e6)
+            yield ((high << 32) | low) / divisor, linktype, body[20:20 + captured]
+        elif block_type == 3 and interfaces:
+            # Simple packet block, no timestamp
+            yield 0.0, interfaces[0][0], body[4:]
+        offset += block_length
+
+
+def _pcapng_resolution(options, endian):
+    # if_tsresol option (code 9), microseconds when absent
+    offset = 0
+    while offset + 4 <= len(options):
+        code, length = struct.unpack_from(endian + "HH", options, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = options[offset + 4]
+            return float(2 ** (value & 0x7F)) if value & 0x80 else 10.0 ** value
+        offset += 4 + (length + 3) // 4 * 4
+    return 1e6
+
+
+def udp_payload(linktype, frame):
+    # Returns (source ip, destination port, payload) for UDP over IPv4/IPv6, None for anything else
+    if linktype == 1:           # Ethernet, with any 802.1Q tags
+        ethertype, offset = struct.unpack_from("!H", frame, 12)[0], 14
+        while ethertype in (0x8100, 0x88A8) and len(frame) >= offset + 4:
+            ethertype, offset = struct.unpack_from("!H", frame, offset + 2)[0], offset + 4
+    elif linktype == 113:       # Linux cooked capture
+        ethertype, offset = struct.unpack_from("!H", frame, 14)[0], 16
+    elif linktype in (101, 228, 229):   # Raw IP
+        ethertype = 0x0800 if frame[:1] and frame[0] >> 4 == 4 else 0x86DD
+        offset = 0
+    else:
+        return None
+    if ethertype == 0x0800 and len(frame) >= offset + 20:
+        header_length = (frame[offset] & 0x0F) * 4
+        if frame[offset + 9] != 17:
+            return None
+        source = socket.inet_ntoa(frame[offset + 12:offset + 16])
+        offset += header_length
+    elif ethertype == 0x86DD and len(frame) >= offset + 40:
+        if frame[offset + 6] != 17:
+            return None
+        source = socket.inet_ntop(socket.AF_INET6, frame[offset + 8:offset + 24])
+        offset += 40
+    else:
+        return None
+    if len(frame) < offset + 8:
+        return None
+    destination_port, length = struct.unpack_from("!HH", frame, offset + 2)
+    return source, destination_port, frame[offset + 8:offset + length]
+
+
+class PcapWriter:
+    # Appends received datagrams to a classic pcap as raw IPv4/UDP frames (linktype 101), so the file
+    # opens in Wireshark and reads back with --pcap. Only the payload is real, the IP/UDP headers are
+    # rebuilt from the socket's addresses. An existing file in any other format (pcapng, another link
+    # type) is renamed to <path>.<time>.old and a new capture is started
+    def __init__(self, path, port):
+        self.path = path
+        self.port = port
+        self.rotated = None     # where an incompatible file was moved to
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                header = file.read(24)
+            if len(header) < 24 or header[:4] != b"\xd4\xc3\xb2\xa1" or struct.unpack_from("<I", header, 20)[0] != 101:
+                self.rotated = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}.old"
+                os.replace(path, self.rotated)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 101))
+
+    def write(self, payload, source, source_port, destination, timestamp):
+        udp = struct.pack("!HHHH", source_port, self.port, 8 + len(payload), 0)
+        ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 28 + len(payload), 0, 0, 64, 17, 0,
+                         socket.inet_aton(source), socket.inet_aton(destination))
+        frame = ip + udp + payload
+        seconds = int(timestamp)
+        self.file.write(struct.pack("<IIII", seconds, int((timestamp - seconds) * 1e6), len(frame), len(frame)))
+        self.file.write(frame)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+# Trap decoding
+def decode_trap(payload, source_ip):
+    # Returns {"source", "agent", "trap_oid", "uptime", "request_id", "varbinds"} or raises snmp_codec.SnmpDecodeError
+    message = snmp_codec.decode_message(payload)
+    if message["pdu_type"] == snmp_codec.TRAP_V1:
+        generic = message["generic_trap"]
+        if 0 <= generic < len(generic_trap_oids):
+            trap_oid = generic_trap_oids[generic]
+        else:
+            trap_oid = f"{message['enterprise']}.0.{message['specific_trap']}"
+        return {"source": source_ip, "agent": message["agent_addr"], "trap_oid": trap_oid,
+                "uptime": message["uptime"], "request_id": None, "varbinds": message["varbinds"]}
+    if message["pdu_type"] not in (snmp_codec.TRAP_V2, snmp_codec.INFORM_REQUEST):
+        raise snmp_codec.SnmpDecodeError(f"PDU type {message['pdu_type']:#x} is not a trap")
+    varbinds = dict(message["varbinds"])
+    return {"source": source_ip, "agent": source_ip, "trap_oid": varbinds.get(snmp_codec.SNMP_TRAP_OID, ""),
+            "uptime": varbinds.get(snmp_codec.SYS_UPTIME_OID), "request_id": message["request_id"],
+            "varbinds": message["varbinds"]}
+
+
+class TrapAggregator:
+    # Counts traps per (device, trap OID). A trap with the same varbinds (other than sysUpTime) as the
+    # previous one from that device within dedup_window seconds is a duplicate (retransmits, storms of
+    # copies) and isn't counted as a new event. Events older than window seconds fall out of the
+    # window count, a device/OID with flap_threshold or more events in the window is flagged as flapping
+    def __init__(self, window=300.0, dedup_window=2.0, flap_threshold=5, csv_file=requirements):
+        self.window = window
+        self.dedup_window = dedup_window
+        self.flap_threshold = flap_threshold
+        self.received = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.clock = 0.0            # newest trap time seen, the window is measured back from it
+        self._events = {}           # key -> deque of event timestamps
+        self._stats = {}            # key -> totals and last trap details
+        self._lock = threading.Lock()
+        self._store = inventory_store.get_store(csv_file) if os.path.exists(csv_file) else None
+
+    def device_name(self, ip):
+        hostname = self._store.hostname_for_ip(ip) if self._store else None
+        return hostname or ip
+
+    def add(self, trap, timestamp):
+        # Returns False when the trap was counted as a duplicate
+        device = self.device_name(trap["agent"] or trap["source"])
+        key = (device, trap["trap_oid"])
+        fingerprint = tuple(vb for vb in trap["varbinds"] if vb[0] != snmp_codec.SYS_UPTIME_OID)
+        with self._lock:
+            self.received += 1
+            self.clock = max(self.clock, timestamp)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"device": device, "trap_oid": trap["trap_oid"],
+                                            "name": trap_names.get(trap["trap_oid"], ""), "total": 0,
+                                            "duplicates": 0, "first_seen": timestamp, "last_seen": 0.0,
+                                            "fingerprint": None}
+                self._events[key] = collections.deque()
+            duplicate = stats["fingerprint"] == fingerprint and timestamp - stats["last_seen"] <= self.dedup_window
+            stats["last_seen"] = timestamp
+            stats["fingerprint"] = fingerprint
+            if duplicate:
+                stats["duplicates"] += 1
+                self.duplicates += 1
+                return False
+            stats["total"] += 1
+            events = self._events[key]
+            events.append(timestamp)
+            self._expire(events, self.clock)
+            return True
+
+    def add_packet(self, payload, source_ip, timestamp):
+        try:
+            trap = decode_trap(payload, source_ip)
+        except snmp_codec.SnmpDecodeError:
+            with self._lock:
+                self.errors += 1
+            return None
+        self.add(trap, timestamp)
+        return trap
+
+    def _expire(self, events, now):
+        while events and events[0] < now - self.window:
+            events.popleft()
+
+    def counts(self, now=None):
+        # One row per device/OID, busiest first
+        with self._lock:
+            now = self.clock if now is None else now
+            rows = []
+            for key, stats in self._stats.items():
+                events = self._events[key]
+                self._expire(events, now)
+                row = {k: v for k, v in stats.items() if k != "fingerprint"}
+                row["in_window"] = len(events)
+                row["flapping"] = len(events) >= self.flap_threshold
+                rows.append(row)
+        rows.sort(key=lambda r: (-r["in_window"], -r["total"], r["device"], r["trap_oid"]))
+        return rows
+
+    def snapshot(self, now=None):
+        rows = self.counts(now)
+        return {"generated": time.time(), "window": self.window, "received": self.received,
+                "duplicates": self.duplicates, "errors": self.errors, "traps": rows}
+
+
+def write_snapshot(aggregator, path=snapshot_file, now=None):
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w") as file:
+        json.dump(aggregator.snapshot(now), file, indent=2)
+    os.replace(tmp_file, path)
+
+
+def process_pcap(path, aggregator, port=162):
+    count = 0
+    for timestamp, source, payload in read_pcap(path, port):
+        aggregator.add_packet(payload, source, timestamp)
+        count += 1
+    return count
+
+
+def listen(aggregator, bind="0.0.0.0", port=162, stop=None, on_trap=None, snapshot=None, snapshot_interval=5.0,
+           pcap=None):
+    # Blocking receive loop, one recvfrom per trap straight into the aggregator. Runs until stop is set.
+    # pcap is an optional PcapWriter every datagram is also recorded to, flushed with each snapshot
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sock.bind((bind, port))
+    sock.settimeout(0.5)
+    # The pcap records need the address each trap was sent to, which 0.0.0.0 doesn't say
+    destination = bind if bind != "0.0.0.0" else unknown_destination
+    pktinfo = pcap is not None and bind == "0.0.0.0" and IP_PKTINFO is not None
+    if pktinfo:
+        sock.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
+    next_snapshot = time.monotonic() + snapshot_interval
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                if pktinfo:
+                    payload, ancillary, _, (source, source_port) = sock.recvmsg(65535, socket.CMSG_SPACE(12))
+                    destination = _pktinfo_destination(ancillary) or unknown_destination
+                else:
+                    payload, (source, source_port) = sock.recvfrom(65535)
+            except socket.timeout:
+                payload = None
+            if payload is not None:
+                received = time.time()
+                if pcap:
+                    pcap.write(payload, source, source_port, destination, received)
+                trap = aggregator.add_packet(payload, source, received)
+                if trap and on_trap:
+                    on_trap(trap)
+            if snapshot and time.monotonic() >= next_snapshot:
+                write_snapshot(aggregator, snapshot, time.time())
+                next_snapshot = time.monotonic() + snapshot_interval
+                if pcap:
+                    pcap.flush()
+    finally:
+        sock.close()
+        if pcap:
+            pcap.close()
+        if snapshot:
+            write_snapshot(aggregator, snapshot, time.time())
+
+
+def _pktinfo_destination(ancillary):
+    # struct in_pktinfo {int ipi_ifindex; struct in_addr ipi_spec_dst; struct in_addr ipi_addr;},
+    # ipi_addr is the destination address from the IP header
+    for level, kind, data in ancillary:
+        if level == socket.IPPROTO_IP and kind == IP_PKTINFO and len(data) >= 12:
+            return socket.inet_ntoa(data[8:12])
+    return None
+
+
+def print_counts(aggregator, now=None):
+    print(f"{aggregator.received} traps received, {aggregator.duplicates} duplicates, {aggregator.errors} undecodable")
+    for row in aggregator.counts(now):
+        name = row["name"] or row["trap_oid"]
+        flag = "  FLAPPING" if row["flapping"] else ""
+        print(f"{row['device']:<16}{name:<28}{row['in_window']:>6} in window{row['total']:>8} total{flag}")
+
+
+def ArgParse_Helper():
+    parser = argparse.ArgumentParser(description="Decode and aggregate SNMP traps, live or from a capture file")
+    parser.add_argument("--pcap", help="read traps from this pcap/pcapng file instead of listening")
+    parser.add_argument("--bind", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=162)
+    parser.add_argument("--window", type=float, default=300.0, help="sliding window for trap counts, seconds")
+    parser.add_argument("--dedup-window", type=float, default=2.0, help="identical traps this close together are duplicates")
+    parser.add_argument("--flap-threshold", type=int, default=5, help="events in the window that mark a trap as flapping")
+    parser.add_argument("--snapshot", default=snapshot_file, help="JSON file the portal reads the counts from")
+    parser.add_argument("--snapshot-interval", type=float, default=5.0)
+    parser.add_argument("--write-pcap", default=pcap_file, help="live mode: append every received trap to this pcap, '' to turn off")
+    parser.add_argument("--verbose", action="store_true", help="print every decoded trap")
+    return parser.parse_args()
+
+
+def print_trap(trap):
+    print(f"{trap['agent']} {trap_names.get(trap['trap_oid'], trap['trap_oid'])} {trap['varbinds']}")
+
 
 def trap_monitor():
-    interface = "eth1"
-    pcap_file = "/root/packet_capture.pcap"
-    capture = pyshark.LiveCapture(interface=interface, bpf_filter="udp port 162", output_file=pcap_file)
+    args = ArgParse_Helper()
+    aggregator = TrapAggregator(args.window, args.dedup_window, args.flap_threshold)
+    if args.pcap:
+        count = process_pcap(args.pcap, aggregator, args.port)
+        print(f"Read {count} packets to udp/{args.port} from {args.pcap}")
+        write_snapshot(aggregator, args.snapshot)
+        print_counts(aggregator)
+        return
+    stop = threading.Event()
+    pcap = None
+    try:
+        pcap = PcapWriter(args.write_pcap, args.port) if args.write_pcap else None
+    except OSError as e:
+        # Counting traps matters more than the raw copy, keep going without it
+        print(f"Can't record traps to {args.write_pcap}: {e}")
     try:
-        capture.sniff(timeout=None)
+        print(f"Listening for traps on {args.bind}:{args.port}")
+        if pcap and pcap.rotated:
+            print(f"{args.write_pcap} wasn't a capture this script writes, moved it to {pcap.rotated}")
+        if pcap:
+            print(f"Recording traps to {args.write_pcap}")
+        listen(aggregator, args.bind, args.port, stop, print_trap if args.verbose else None,
+               args.snapshot, args.snapshot_interval, pcap)
     except KeyboardInterrupt:
         print("Exiting...")
     finally:
-        capture.close()
-        print(f"Capture saved to {pcap_file}")
+        print_counts(aggregator, time.time())
+        print(f"Trap counts saved to {args.snapshot}")
 
 
 if __name__ == "__main__":
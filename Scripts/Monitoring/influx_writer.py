@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+import collections
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Buffers monitoring samples as InfluxDB line protocol and writes them out in batches,
+# either to InfluxDB's /write endpoint (what Chronograf/Grafana read from) or to a local file
+
+
+def escape_key(value):
+    # Measurement names, tag keys/values and field keys escape commas, spaces and equals signs
+    return str(value).replace("\\", "\\\\").replace(",", "\\,").replace(" ", "\\ ").replace("=", "\\=")
+
+
+def format_field(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value)
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def format_point(measurement, tags, fields, timestamp_ns=None):
+    # measurement,tag=value field=value timestamp
+    line = escape_key(measurement)
+    for key in sorted(tags):
+        if tags[key] not in (None, ""):
+            line += f",{escape_key(key)}={escape_key(tags[key])}"
+    field_set = ",".join(f"{escape_key(k)}={format_field(v)}" for k, v in fields.items() if v is not None)
+    if not field_set:
+        return None
+    line += f" {field_set}"
+    if timestamp_ns is not None:
+        line += f" {timestamp_ns}"
+    return line
+
+
+def sample_to_point(sample, measurement="device"):
+    # Turns one monitoring.poll_device() sample into a line, failed polls are written as up=false
+    fields = {"up": not sample["error"]}
+    for name in ("cpu", "cpu_count", "uptime"):
+        if name in sample:
+            fields[name] = sample[name]
+    tags = {"hostname": sample["hostname"], "ip": sample["ip"]}
+    return format_point(measurement, tags, fields, int(sample["time"] * 1e9))
+
+
+class FileSink:
+    # Appends each batch to a file, a stand-in for InfluxDB when it isn't running
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, lines):
+        with open(self.path, "a") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def __str__(self):
+        return self.path
+
+
+class HttpSink:
+    # InfluxDB 1.x write API, e.g. http://localhost:8086/write?db=monitoring&precision=ns
+    def __init__(self, url="http://localhost:8086", database="monitoring", timeout=5.0):
+        query = urllib.parse.urlencode({"db": database, "precision": "ns"})
+        self.url = f"{url.rstrip('/')}/write?{query}"
+        self.timeout = timeout
+
+    def write(self, lines):
+        body = ("\n".join(lines) + "\n").encode()
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "text/plain; charset=utf-8"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise OSError(f"InfluxDB write returned HTTP {response.status}")
+
+    def __str__(self):
+        return self.url
+
+
+class LineProtocolWriter:
+    # Points are buffered in memory and flushed once batch_size points are waiting or
+    # flush_interval seconds have passed since the last flush, whichever comes first. Both happen
+    # on the background thread so a slow InfluxDB never holds up the poll loop calling add().
+    # A failed write keeps the points for the next try, up to max_buffer points (oldest dropped),
+    # except a batch InfluxDB rejects with a 4xx, which would only be rejected again
+    def __init__(self, sink, batch_size=5000, flush_interval=10.0, max_buffer=100000):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = collections.deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._wake = threading.Event()      # set by add() when a full batch is waiting
+        self._failed = False                # last flush put points back, back off before the next
+        self._thread = threading.Thread(target=self._flush_loop, name="influx-flush", daemon=True)
+        self._thread.start()
+
+    def add(self, line):
+        if line is None:
+            return
+        with self._lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def write_samples(self, samples):
+        # Used as monitoring.run_poller(on_samples=...)
+        for sample in samples:
+            self.add(sample_to_point(sample))
+
+    def flush(self):
+        with self._lock:
+            lines = list(self._buffer)
+            self._buffer.clear()
+            self._last_flush = time.monotonic()
+            self._failed = False
+        if not lines:
+            return 0
+        written = 0
+        for start in range(0, len(lines), self.batch_size):
+            batch = lines[start:start + self.batch_size]
+            try:
+                self.sink.write(batch)
+            except urllib.error.HTTPError as e:
+                if e.code >= 500:
+                    self._requeue(lines[start:], e)
+                    return written
+                # Bad points or a missing database, retrying the same lines can't succeed
+                print(f"Dropped {len(batch)} points rejected by {self.sink}: HTTP {e.code} {e.reason}")
+                continue
+            except (OSError, urllib.error.URLError) as e:
+                self._requeue(lines[start:], e)
+                return written
+            written += len(batch)
+        return written
+
+    def _requeue(self, lines, error):
+        # Puts unwritten lines back in front of anything added since, for the next flush
+        print(f"Failed to write {len(lines)} points to {self.sink}: {error}")
+        with self._lock:
+            self._buffer = collections.deque(lines + list(self._buffer), maxlen=self._buffer.maxlen)
+            self._failed = True
+
+    def _flush_loop(self):
+        # Flushes when add() signals a full batch, and on time so a slow poll interval still
+        # reaches the dashboards
+        while True:
+            due = self._last_flush + self.flush_interval - time.monotonic()
+            woken = self._wake.wait(max(due, 0.05))
+            if self._stop.is_set():
+                return
+            if woken or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._wake.clear()
+                self.flush()
+                # A full buffer signals on every add(), don't hammer a failing InfluxDB with it
+                if self._failed and self._stop.wait(self.flush_interval):
+                    return
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
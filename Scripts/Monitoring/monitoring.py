@@ -1,21 +1,178 @@
 #!/usr/bin/env python3
 
-import pyshark
-import os
-import re
-import subprocess
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import snmp_codec
+import influx_writer
+sys.path.append("/home/student/CSCI5840-Advanced-Network-Automation/Ansible")
+import inventory_store
+
+# Polls every device in requirements.csv over SNMP at the same time from one UDP socket,
+# instead of launching one snmpget process per device one after the other
+
+requirements = "/home/student/CSCI5840-Advanced-Network-Automation/Ansible/requirements.csv"
+
+# Fetched once per request (GETBULK non-repeaters). A non-repeater answers with the OID after the one
+# asked for, like GETNEXT, so the object is requested and its .0 instance is what comes back
+scalar_oids = {"uptime": "1.3.6.1.2.1.1.3"}
+# hrProcessorLoad column, walked with GETBULK so multi-CPU devices still take one request
+cpu_column_oid = "1.3.6.1.2.1.25.3.3.1.2"
+
+
+def get_targets(csv_file=requirements):
+    # {hostname: management ip} from requirements.csv
+    return inventory_store.get_store(csv_file).management_ips()
+
+
+class SnmpClient(asyncio.DatagramProtocol):
+    # One socket for the whole sweep, responses are matched to requests by request-id
+    def __init__(self):
+        self.transport = None
+        self.pending = {}
+        self.next_id = random.randint(1, 2**30)
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # Room for a whole fleet's worth of responses arriving in the same instant
+        sock = transport.get_extra_info("socket")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+
+    def datagram_received(self, data, addr):
+        try:
+            message = snmp_codec.decode_message(data)
+        except snmp_codec.SnmpDecodeError:
+            return
+        future = self.pending.pop(message.get("request_id"), None)
+        if future and not future.done():
+            future.set_result(message)
+
+    async def request(self, ip, packet_builder, timeout=2.0, retries=1, port=161):
+        # Sends the request (with a fresh request-id per try) and waits for the matching response
+        loop = asyncio.get_running_loop()
+        for attempt in range(retries + 1):
+            request_id = self.next_id
+            self.next_id = (self.next_id + 1) % 2**31
+            future = loop.create_future()
+            self.pending[request_id] = future
+            self.transport.sendto(packet_builder(request_id), (ip, port))
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.pending.pop(request_id, None)
+        raise TimeoutError(f"no SNMP response from {ip}")
+
+
+async def poll_device(client, hostname, ip, community="public", timeout=2.0, retries=1):
+    # One GETBULK per device: the scalars once plus up to 16 rows of the CPU load column
+    scalars = list(scalar_oids.values())
+    builder = lambda request_id: snmp_codec.encode_request(community, request_id, scalars + [cpu_column_oid],
+                                                           snmp_codec.GET_BULK_REQUEST, len(scalars), 16)
+    sample = {"hostname": hostname, "ip": ip, "time": time.time(), "error": ""}
+    try:
+        response = await client.request(ip, builder, timeout, retries)
+        if response["error_status"]:
+            raise ValueError(f"SNMP error status {response['error_status']}")
+        loads = []
+        for oid, value in response["varbinds"]:
+            for name, scalar in scalar_oids.items():
+                if oid == scalar + ".0":
+                    sample[name] = value
+            if oid.startswith(cpu_column_oid + ".") and isinstance(value, int):
+                loads.append(value)
+        if loads:
+            sample["cpu"] = round(sum(loads) / len(loads), 2)
+            sample["cpu_count"] = len(loads)
+    except Exception as e:
+        sample["error"] = str(e)
+    return sample
+
+
+async def poll_all(targets, community="public", timeout=2.0, retries=1):
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(SnmpClient, local_addr=("0.0.0.0", 0))
+    try:
+        return await asyncio.gather(*(poll_device(client, hostname, ip, community, timeout, retries)
+                                      for hostname, ip in targets.items()))
+    finally:
+        transport.close()
+
+
+def print_sample(sample):
+    if sample["error"]:
+        print(f"{sample['hostname']} CPU Utilization: unavailable ({sample['error']})")
+    else:
+        print(f"{sample['hostname']} CPU Utilization: {sample.get('cpu')}")
+
+
+async def run_poller(interval=10.0, jitter=1.0, community="public", timeout=2.0, retries=1, once=False, on_samples=None):
+    # Polls on a fixed interval, each cycle starts up to +/- jitter seconds off the schedule
+    # so a big fleet isn't hit at exactly the same moment every time
+    next_run = time.monotonic()
+    while True:
+        targets = get_targets()  # cheap, the csv is only re-read after it changes
+        start = time.monotonic()
+        samples = await poll_all(targets, community, timeout, retries)
+        elapsed = time.monotonic() - start
+        for sample in samples:
+            print_sample(sample)
+        if on_samples:
+            on_samples(samples)
+        ok = sum(1 for s in samples if not s["error"])
+        print(f"Polled {ok}/{len(samples)} devices in {elapsed:.2f}s")
+        if once:
+            return samples
+        next_run += interval
+        delay = next_run - time.monotonic() + random.uniform(-jitter, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            next_run = time.monotonic()
+
+
+def ArgParse_Helper():
+    parser = argparse.ArgumentParser(description="Concurrent SNMP CPU poller for the devices in requirements.csv")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between polls")
+    parser.add_argument("--jitter", type=float, default=1.0, help="random +/- offset added to each poll start")
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--once", action="store_true", help="poll a single time and exit")
+    parser.add_argument("--influx-url", help="InfluxDB to write samples to, e.g. http://localhost:8086")
+    parser.add_argument("--influx-db", default="monitoring")
+    parser.add_argument("--influx-file", help="append line protocol to this file instead of InfluxDB")
+    parser.add_argument("--batch-size", type=int, default=5000, help="points buffered before a write")
+    parser.add_argument("--flush-interval", type=float, default=10.0, help="seconds between writes at most")
+    return parser.parse_args()
+
+
+def get_writer(args):
+    # Line protocol writer for --influx-url/--influx-file, None when samples are only printed
+    if args.influx_file:
+        sink = influx_writer.FileSink(args.influx_file)
+    elif args.influx_url:
+        sink = influx_writer.HttpSink(args.influx_url, args.influx_db)
+    else:
+        return None
+    return influx_writer.LineProtocolWriter(sink, args.batch_size, args.flush_interval)
 
-devices = {"R1": "10.10.4.1","R2": "10.10.4.2","R3": "10.10.4.3","R4": "10.10.4.4","S1": "10.10.40.3","S2": "10.10.40.4","S3": "10.10.4.7","S4": "10.10.4.8"}
 
 def cpu_monitor():
-    for device in devices.items():
-        hostname = device[0]
-        ip = device[1]
-        cpu_oid = "iso.3.6.1.2.1.25.3.3.1.2.1"
-        cpu = subprocess.run(["snmpget", "-v2c", "-c", "public", ip, cpu_oid], capture_output=True, text=True)
-        cpu_output = cpu.stdout.strip()
-        match = re.search(r'INTEGER: (\d+)', cpu_output)
-        value = match.group(1)
-        print(hostname+" CPU Utilization: "+value)
-
-cpu_monitor()
+    args = ArgParse_Helper()
+    writer = get_writer(args)
+    on_samples = writer.write_samples if writer else None
+    try:
+        asyncio.run(run_poller(args.interval, args.jitter, args.community, args.timeout, args.retries, args.once,
+                               on_samples))
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        if writer:
+            writer.close()
+
+
+if __name__ == "__main__":
+    cpu_monitor()
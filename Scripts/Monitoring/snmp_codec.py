@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+# Minimal BER encoder/decoder for SNMP v1/v2c messages, enough to build GET/GETBULK requests
+# and read responses and traps without calling out to net-snmp or tshark
+
+# ASN.1 / SNMP tags
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+GET_REQUEST = 0xA0
+GET_NEXT_REQUEST = 0xA1
+GET_RESPONSE = 0xA2
+SET_REQUEST = 0xA3
+TRAP_V1 = 0xA4
+GET_BULK_REQUEST = 0xA5
+INFORM_REQUEST = 0xA6
+TRAP_V2 = 0xA7
+
+# Standard varbinds in every v2c trap
+SYS_UPTIME_OID = "1.3.6.1.2.1.1.3.0"
+SNMP_TRAP_OID = "1.3.6.1.6.3.1.1.4.1.0"
+
+
+class SnmpDecodeError(Exception):
+    '''Raised when a packet isn't a well formed SNMP message'''
+    pass
+
+
+def encode_length(length):
+    if length < 0x80:
+        return bytes([length])
+    body = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(body)]) + body
+
+
+def encode_tlv(tag, value):
+    return bytes([tag]) + encode_length(len(value)) + value
+
+
+def encode_integer(value, tag=INTEGER):
+    length = max(1, (value.bit_length() + 8) // 8)
+    return encode_tlv(tag, value.to_bytes(length, "big", signed=True))
+
+
+def encode_oid(oid):
+    parts = [int(p) for p in oid.strip(".").split(".")]
+    body = bytearray([parts[0] * 40 + parts[1]])
+    for part in parts[2:]:
+        chunk = [part & 0x7F]
+        part >>= 7
+        while part:
+            chunk.append(0x80 | (part & 0x7F))
+            part >>= 7
+        body.extend(reversed(chunk))
+    return encode_tlv(OBJECT_IDENTIFIER, bytes(body))
+
+
+def encode_request(community, request_id, oids, pdu_type=GET_REQUEST, non_repeaters=0, max_repetitions=10, version=1):
+    # version 1 is SNMPv2c on the wire (0 is v1). For GETBULK the two error fields carry
+    # non-repeaters and max-repetitions, the first non_repeaters oids are fetched once
+    varbinds = b"".join(encode_tlv(SEQUENCE, encode_oid(oid) + encode_tlv(NULL, b"")) for oid in oids)
+    if pdu_type == GET_BULK_REQUEST:
+        fields = encode_integer(non_repeaters) + encode_integer(max_repetitions)
+    else:
+        fields = encode_integer(0) + encode_integer(0)
+    pdu = encode_tlv(pdu_type, encode_integer(request_id) + fields + encode_tlv(SEQUENCE, varbinds))
+    return encode_tlv(SEQUENCE, encode_integer(version) + encode_tlv(OCTET_STRING, community.encode()) + pdu)
+
+
+def decode_tlv(data, offset=0):
+    # Returns (tag, value bytes, offset just past the value)
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+        offset += 2
+        if length & 0x80:
+            count = length & 0x7F
+            length = int.from_bytes(data[offset:offset + count], "big")
+            offset += count
+    except IndexError:
+        raise SnmpDecodeError("truncated TLV header")
+    end = offset + length
+    if end > len(data):
+        raise SnmpDecodeError("TLV runs past the end of the packet")
+    return tag, data[offset:end], end
+
+
+def decode_sequence(data):
+    # Splits the body of a constructed type into its (tag, value) items
+    items = []
+    offset = 0
+    while offset < len(data):
+        tag, value, offset = decode_tlv(data, offset)
+        items.append((tag, value))
+    return items
+
+
+def decode_integer(value, signed=True):
+    return int.from_bytes(value, "big", signed=signed)
+
+
+def decode_oid(value):
+    if not value:
+        return ""
+    parts = [value[0] // 40, value[0] % 40] if value[0] < 80 else [2, value[0] - 80]
+    current = 0
+    for byte in value[1:]:
+        current = (current << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            parts.append(current)
+            current = 0
+    return ".".join(str(p) for p in parts)
+
+
+def decode_value(tag, value):
+    if tag == INTEGER:
+        return decode_integer(value)
+    if tag in (COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+        return decode_integer(value, signed=False)
+    if tag == OBJECT_IDENTIFIER:
+        return decode_oid(value)
+    if tag == IP_ADDRESS:
+        return ".".join(str(b) for b in value)
+    if tag == OCTET_STRING:
+        try:
+            return value.decode()
+        except UnicodeDecodeError:
+            return value.hex()
+    if tag in (NULL, NO_SUCH_OBJECT, NO_SUCH_INSTANCE, END_OF_MIB_VIEW):
+        return None
+    return value
+
+
+def decode_varbinds(data):
+    varbinds = []
+    for tag, varbind in decode_sequence(data):
+        (oid_tag, oid), (value_tag, value) = decode_sequence(varbind)[:2]
+        varbinds.append((decode_oid(oid), decode_value(value_tag, value)))
+    return varbinds
+
+
+def decode_message(data):
+    # Decodes any v1/v2c message into a dict:
+    # {"version", "community", "pdu_type", "request_id", "error_status", "error_index", "varbinds": [(oid, value)]}
+    # v1 traps carry "enterprise", "agent_addr", "generic_trap", "specific_trap" and "uptime" instead of the ids
+    try:
+        tag, body, _ = decode_tlv(data)
+        if tag != SEQUENCE:
+            raise SnmpDecodeError("not an SNMP message")
+        items = decode_sequence(body)
+        version = decode_integer(items[0][1])
+        community = items[1][1].decode(errors="replace")
+        pdu_type, pdu = items[2]
+        fields = decode_sequence(pdu)
+        message = {"version": version, "community": community, "pdu_type": pdu_type}
+        if pdu_type == TRAP_V1:
+            message.update({
+                "enterprise": decode_oid(fields[0][1]),
+                "agent_addr": decode_value(fields[1][0], fields[1][1]),
+                "generic_trap": decode_integer(fields[2][1]),
+                "specific_trap": decode_integer(fields[3][1]),
+                "uptime": decode_integer(fields[4][1], signed=False),
+                "varbinds": decode_varbinds(fields[5][1]),
+            })
+        else:
+            message.update({
+                "request_id": decode_integer(fields[0][1]),
+                "error_status": decode_integer(fields[1][1]),
+                "error_index": decode_integer(fields[2][1]),
+                "varbinds": decode_varbinds(fields[3][1]),
+            })
+        return message
+    except SnmpDecodeError:
+        raise
+    except (IndexError, ValueError) as e:
+        raise SnmpDecodeError(f"malformed SNMP message: {e}")
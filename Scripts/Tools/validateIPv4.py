@@ -1,55 +1,186 @@
 #!/usr/bin/env python3
 
 import argparse
+import csv
 import re
+import socket
 import sys
 
+# NumPy makes the range checks on big batches vectorised, plain integer compares are used without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Address classes, in the order they are reported
+classes = ["malformed", "multicast", "loopback", "link-local", "broadcast", "experimental", "valid"]
+messages = {
+    "malformed": "An IP address with an octet that either is not a number between 0 and 255 or doesn't exist was found",
+    "multicast": "A multicast address was found",
+    "loopback": "A loopback address was found",
+    "link-local": "A link local address was found",
+    "broadcast": "The broadcast address was found",
+    "experimental": "An IP address in the experimental range was found",
+}
+
+octet = r"(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])"
+address_pattern = re.compile(rf"{octet}\.{octet}\.{octet}\.{octet}")
+prefix_pattern = re.compile(r"/(?:3[0-2]|[12]?[0-9])")
+
+# Indexes into classes
+MALFORMED, MULTICAST, LOOPBACK, LINK_LOCAL, BROADCAST, EXPERIMENTAL, VALID = range(len(classes))
+chunk_size = 1000000
+
+
 def ArgParse_Helper():
     parser = argparse.ArgumentParser(description="This is a program that will help you make sure you have a valid IP address")
-    parser.add_argument("address",action='store', help="IP address")
-    parser.add_argument("--version",action='version',version='Version1.0')
+    parser.add_argument("address",action='store', nargs="?", help="IP address")
+    parser.add_argument("--file",action='append', help="file of addresses, one per line ('-' for stdin), can be repeated")
+    parser.add_argument("--column",help="read addresses from this column of a CSV file (e.g. requirements.csv intf_ipv4)")
+    parser.add_argument("--max-offenders",type=int,default=20,help="offending addresses listed per class")
+    parser.add_argument("--version",action='version',version='Version2.0')
     args=parser.parse_args()
     return(args)
 
-def check(address):
-    octet_list = address.split(".")
-    is_valid = 1
-    if len(octet_list) != 4:
-        is_valid = 0
-        print("An IP address that doesn't have four octets was found")
-    
+
+# Packs a dotted quad (optionally with a /prefix) into an int, None if it isn't one
+def parse_address(address):
+    address = address.strip()
+    host, slash, prefix = address.partition("/")
+    if not address_pattern.fullmatch(host) or (slash and not prefix_pattern.fullmatch(slash + prefix)):
+        return None
+    return int.from_bytes(socket.inet_aton(host), "big")
+
+
+# Class index (into classes) for each packed address, None meaning malformed
+def classify_packed(packed):
+    if np is not None:
+        return _classify_numpy(packed)
+    return [_classify_int(value) for value in packed]
+
+
+def _classify_int(value):
+    if value is None:
+        return MALFORMED
+    first = value >> 24
+    if 224 <= first <= 239:
+        return MULTICAST
+    if first == 127:
+        return LOOPBACK
+    if value >> 16 == 0xA9FE:
+        return LINK_LOCAL
+    if value == 0xFFFFFFFF:
+        return BROADCAST
+    if first >= 240:
+        return EXPERIMENTAL
+    return VALID
+
+
+def _classify_numpy(packed):
+    values = np.fromiter((-1 if value is None else value for value in packed), dtype=np.int64, count=len(packed))
+    malformed = values < 0
+    first = values >> 24
+    # Later assignments win, so the order matches _classify_int's precedence
+    result = np.full(len(packed), VALID, dtype=np.uint8)
+    result[first >= 240] = EXPERIMENTAL
+    result[values == 0xFFFFFFFF] = BROADCAST
+    result[(values >> 16) == 0xA9FE] = LINK_LOCAL
+    result[first == 127] = LOOPBACK
+    result[(first >= 224) & (first <= 239)] = MULTICAST
+    result[malformed] = MALFORMED
+    return result
+
+
+# Validates any number of (where, address) pairs, a chunk at a time so huge files don't sit in memory.
+# where is what offenders are reported with, read_addresses gives "file:line".
+# Returns {"total": n, "counts": {class: n}, "offenders": {class: [(where, address)]}}
+def validate_bulk(addresses, max_offenders=20):
+    counts = dict.fromkeys(classes, 0)
+    offenders = {name: [] for name in classes if name != "valid"}
+    total = 0
+    chunk = []
+    for address in addresses:
+        chunk.append(address)
+        if len(chunk) >= chunk_size:
+            _validate_chunk(chunk, counts, offenders, max_offenders)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        _validate_chunk(chunk, counts, offenders, max_offenders)
+        total += len(chunk)
+    return {"total": total, "counts": counts, "offenders": offenders}
+
+
+def _validate_chunk(chunk, counts, offenders, max_offenders):
+    results = classify_packed([parse_address(address) for _, address in chunk])
+    if np is not None:
+        tallies = np.bincount(results, minlength=len(classes))
+        bad = np.flatnonzero(results != VALID)
+    else:
+        tallies = [0] * len(classes)
+        for index in results:
+            tallies[index] += 1
+        bad = [i for i, index in enumerate(results) if index != VALID]
+    for index, name in enumerate(classes):
+        counts[name] += int(tallies[index])
+    for i in bad:
+        listed = offenders[classes[results[i]]]
+        if len(listed) < max_offenders:
+            where, address = chunk[i]
+            listed.append((where, address.strip()))
+
+
+# Yields ("file:line", address) from a file (or stdin for '-'), from one CSV column if column is given.
+# CSV cells holding several addresses separated by ';' are split
+def read_addresses(path, column=None):
+    file = sys.stdin if path == "-" else open(path, newline="")
+    name = "<stdin>" if path == "-" else path
     try:
-        for octet in octet_list:
-            if int(octet) > 255 or int(octet) < 0:
-                is_valid = 0
-                print("An IP address with one or more octets that is not a number between 0 and 255 was found")
-    except: 
-        is_valid = 0
-        print("An IP address with an octet that either is not a number or doesn't exist was found")
-        sys.exit()
-    if int(octet_list[0]) >= 224 and int(octet_list[0]) <= 239:
-        is_valid = 0
-        print("A multicast address was found")
-    if int(octet_list[0]) == 127:
-        is_valid = 0
-        print("A loopback address was found")
-    if int(octet_list[0]) == 169 and int(octet_list[1]) == 254:
-        is_valid = 0
-        print("A link local address was found")
-    if int(octet_list[0]) == 255 and int(octet_list[1]) == 255 and int(octet_list[2]) == 255 and int(octet_list[3]) == 255:
-        is_valid = 0
-        print("The broadcast address was found")
-    if int(octet_list[0]) >= 240 and int(octet_list[0]) <= 255:
-        is_valid = 0
-        print("An IP address in the experimental range was found")
-    if is_valid == 1:
-        return("Good")
-    
+        if column:
+            reader = csv.DictReader(file)
+            for row in reader:
+                for address in (row.get(column) or "").split(";"):
+                    if address.strip():
+                        yield f"{name}:{reader.line_num}", address
+        else:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    yield f"{name}:{number}", line
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def print_report(report):
+    print(f"{report['total']} addresses checked")
+    for name in classes:
+        print(f"  {name:<14}{report['counts'][name]:>12}")
+    for name, listed in report["offenders"].items():
+        if listed:
+            print(f"{name}:")
+            for where, address in listed:
+                print(f"  {where}: {address}")
+
+
+def check(address):
+    index = classify_packed([parse_address(address)])[0]
+    if index != VALID:
+        print(messages[classes[index]])
+        return None
+    return("Good")
+
 
 def main():
     args = ArgParse_Helper()
-    address = args.address
-    check(address)
+    if args.address and not args.file:
+        check(args.address)
+        return
+    paths = args.file or ["-"]
+    addresses = (address for path in paths for address in read_addresses(path, args.column))
+    report = validate_bulk(addresses, args.max_offenders)
+    print_report(report)
+    if report["counts"]["valid"] != report["total"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()